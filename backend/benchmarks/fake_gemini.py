@@ -0,0 +1,134 @@
+"""
+Stand-in for `genai.GenerativeModel` that answers with canned JSON after a
+configurable delay, so the backend can be load-tested without Gemini
+"""
+import asyncio
+import json
+import random
+import re
+from collections import Counter
+from typing import Dict, List, Optional
+
+INSTRUMENTS = {
+    "equity": [["SPY", "QQQ"], ["IWM"], ["XLF", "KRE"], ["XLE"], ["SMH", "NVDA"]],
+    "commodity": [["GLD"], ["USO"], ["SLV", "GLD"], ["DBA"], ["CPER"]],
+    "fixed_income": [["TLT"], ["IEF", "SHY"], ["HYG"], ["LQD"], ["TIP"]],
+}
+
+ALERT_MESSAGES = [
+    ("Volatility is rising across the sector", "warning"),
+    ("New data supports the play thesis", "info"),
+    ("Sharp move against the position", "critical"),
+    ("Central bank commentary may affect rates", "info"),
+    ("Liquidity is thinning ahead of the release", "warning"),
+]
+
+
+class FakeResponse:
+    def __init__(self, text: str):
+        self.text = text
+
+
+class FakeGenerativeModel:
+    """
+    Answers every prompt kind GeminiService sends, after `latency` seconds
+    (+/- `jitter` as a fraction). Streamed calls spread the same latency
+    across `stream_chunks` chunks.
+
+    A `malformed_rate` share of answers is cut off mid-JSON; a repair prompt
+    quoting one of them gets the complete answer back.
+    """
+
+    def __init__(self, latency: float = 0.5, jitter: float = 0.2, stream_chunks: int = 8,
+                 modify_rate: float = 0.3, alert_rate: float = 0.5, malformed_rate: float = 0.0,
+                 seed: Optional[int] = 7):
+        self.latency = latency
+        self.jitter = jitter
+        self.stream_chunks = stream_chunks
+        self.modify_rate = modify_rate
+        self.alert_rate = alert_rate
+        self.malformed_rate = malformed_rate
+        self._malformed: Dict[str, str] = {}
+        self.random = random.Random(seed)
+        self.calls: Counter = Counter()
+
+    async def generate_content_async(self, prompt: str, stream: bool = False, **kwargs):
+        kind, text = self._answer(prompt)
+        self.calls[kind] += 1
+        if not stream and kind != "repair" and self.random.random() < self.malformed_rate:
+            text = self._truncate(text)
+        delay = self._delay()
+
+        if not stream:
+            await asyncio.sleep(delay)
+            return FakeResponse(f"```json\n{text}\n```")
+
+        # The first chunk arrives after a share of the delay, like a real stream
+        await asyncio.sleep(delay / (self.stream_chunks + 1))
+        return self._stream(text, delay)
+
+    async def _stream(self, text: str, delay: float):
+        size = max(1, len(text) // self.stream_chunks + 1)
+        for start in range(0, len(text), size):
+            yield FakeResponse(text[start:start + size])
+            await asyncio.sleep(delay / (self.stream_chunks + 1))
+
+    def _delay(self) -> float:
+        return max(0.0, self.latency * (1 + self.random.uniform(-self.jitter, self.jitter)))
+
+    def _truncate(self, text: str) -> str:
+        broken = text[:len(text) // 2]
+        self._malformed[broken] = text
+        return broken
+
+    def _answer(self, prompt: str):
+        if prompt.startswith("Your previous response"):
+            previous = prompt.split("Previous response:\n", 1)[1]
+            broken = next((broken for broken in self._malformed if broken in previous), None)
+            return "repair", self._malformed.pop(broken, "{}")
+        if "Analyze each of the following market scenarios" in prompt:
+            scenarios = re.findall(r"^(\d+)\. (.+)$", prompt.split("Scenarios:\n", 1)[1].split("\n\n", 1)[0], re.M)
+            return "scenario_batch", json.dumps([
+                {"scenario_index": int(index), **self._analysis(description)} for index, description in scenarios
+            ])
+        if "Analyze the following market scenario" in prompt:
+            description = re.search(r"^Scenario: (.+)$", prompt, re.M).group(1)
+            return "scenario", json.dumps(self._analysis(description))
+        if "Analyze if any alerts should be triggered" in prompt:
+            return "alerts", json.dumps(self._alerts())
+        if "raise any alerts" in prompt:
+            return "refresh", json.dumps({**self._play_update(), "alerts": self._alerts()})
+        return "play_update", json.dumps({**self._play_update(), "alerts": []})
+
+    def _analysis(self, description: str) -> Dict:
+        return {
+            "interpreted_scenario": f"Benchmark interpretation of: {description}",
+            "plays": [
+                {
+                    "asset_class": asset_class,
+                    "title": f"{asset_class.replace('_', ' ').title()} play for {description[:40]}",
+                    "description": "Position for the scenario with defined risk. " * 3,
+                    "action": self.random.choice(["Buy", "Sell", "Short", "Long"]),
+                    "instruments": self.random.choice(INSTRUMENTS[asset_class]),
+                    "rationale": "The scenario shifts expected returns for this asset class. " * 4,
+                    "risk_level": self.random.choice(["Low", "Medium", "High"]),
+                    "time_horizon": self.random.choice(["Short-term", "Medium-term", "Long-term"]),
+                    "confidence_score": round(self.random.uniform(0.4, 0.9), 2),
+                }
+                for asset_class in INSTRUMENTS
+            ],
+        }
+
+    def _play_update(self) -> Dict:
+        should_modify = self.random.random() < self.modify_rate
+        return {
+            "should_modify": should_modify,
+            "modifications": "Tighten the stop and trim the position" if should_modify else "",
+            "updated_confidence_score": round(self.random.uniform(0.4, 0.9), 2),
+        }
+
+    def _alerts(self) -> List[Dict]:
+        if self.random.random() >= self.alert_rate:
+            return []
+        message, severity = self.random.choice(ALERT_MESSAGES)
+        return [{"message": message, "severity": severity}]
@@ -0,0 +1,391 @@
+"""
+Offline load test for the backend
+
+Runs the FastAPI app in-process against FakeGenerativeModel and the local
+news stub, then reports latency percentiles, throughput, event-loop lag
+and memory for each scenario:
+
+- create:    POST /scenarios (descriptions repeat, so the analysis cache is exercised)
+- track:     POST /tracking/start for every play of fresh scenarios
+- refresh:   POST /tracking/{sid}/{pid}/refresh for hundreds of tracked plays at once
+             (with --fresh-news every refresh sees new headlines, so none skip Gemini)
+- scheduler: one background scheduler pass over every tracked play
+- mixed:     POST /scenarios with new descriptions while a scheduler pass runs, to
+             check interactive latency holds up behind background LLM work
+
+Run from backend/:
+
+    python -m benchmarks.load_test --scenario all --json results.json
+    python -m benchmarks.load_test --baseline results.json   # exit 1 on regressions
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Optional
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from benchmarks.fake_gemini import FakeGenerativeModel
+from benchmarks.news_stub import NewsStub
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+SCENARIOS = ("create", "track", "refresh", "scheduler", "mixed")
+
+DESCRIPTIONS = [
+    "S&P 500 down {n}% over the next month",
+    "Fed cuts rates by {n}0 basis points",
+    "Oil spikes {n}% on supply disruption",
+    "Ten-year yield rises to {n}%",
+    "Gold rallies {n}% as the dollar weakens",
+    "Tech earnings miss by {n}%",
+]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, max(0, round(q / 100 * len(sorted_values) + 0.5) - 1))
+    return sorted_values[index]
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except (OSError, ValueError, AttributeError):
+        return peak_rss_mb()
+
+
+def peak_rss_mb() -> float:
+    if resource is None:
+        return 0.0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 1024
+
+
+class LoopLagMonitor:
+    """
+    Measures how late a periodic timer fires; large values mean something blocked the event loop
+    """
+
+    def __init__(self, interval: float = 0.01):
+        self.interval = interval
+        self.max_lag = 0.0
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.max_lag = max(self.max_lag, loop.time() - expected)
+
+    def start(self):
+        self.max_lag = 0.0
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> float:
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+        return self.max_lag
+
+
+class LoadTest:
+    def __init__(self, args):
+        self.args = args
+        rotate_seconds = 1.0 if args.fresh_news else args.rotate_seconds
+        self.stub = NewsStub(feeds=args.feeds, latency=args.news_latency, rotate_seconds=rotate_seconds)
+        self.fake_model = FakeGenerativeModel(
+            latency=args.gemini_latency, jitter=args.gemini_jitter, malformed_rate=args.gemini_malformed_rate
+        )
+        self.lag = LoopLagMonitor()
+        self.results: Dict[str, Dict] = {}
+        self.created = 0
+        self.client = None
+        self.main = None
+
+    async def setup(self):
+        base_url = await self.stub.start()
+
+        # The app reads its configuration at import time
+        os.environ["GEMINI_API_KEY"] = "benchmark"
+        os.environ["TRACKING_SCHEDULER_ENABLED"] = "false"
+        os.environ["NEWS_RSS_FEEDS"] = ",".join(self.stub.feed_urls(base_url))
+        os.environ["NEWS_API_URL"] = f"{base_url}/v2/everything"
+        os.environ["NEWS_API_KEY"] = "benchmark" if self.args.newsapi else ""
+        os.environ["STORAGE_BACKEND"] = self.args.storage
+        if self.args.storage == "sqlite":
+            os.environ["STORAGE_PATH"] = os.path.join(tempfile.mkdtemp(), "benchmark.db")
+        os.environ.setdefault("LOG_LEVEL", "WARNING")
+        # The fake model has no quota; pass --env LLM_RATE_LIMIT_PER_MINUTE N to test one
+        os.environ.setdefault("LLM_RATE_LIMIT_PER_MINUTE", "0")
+        # Scheduler passes refresh every play; pass --env TRACKING_NEWS_FANOUT true to only refresh touched ones
+        os.environ.setdefault("TRACKING_NEWS_FANOUT", "false")
+        if self.args.fresh_news:
+            os.environ["RSS_CACHE_TTL_SECONDS"] = "0"
+        for name, value in self.args.env:
+            os.environ[name] = value
+
+        import httpx
+        import main
+
+        self.main = main
+        main.gemini_service.model = self.fake_model
+        # The lifespan's warm-up doesn't run under ASGITransport; load the SDK like it would
+        await main.gemini_service.warm_up()
+        self.client = httpx.AsyncClient(
+            transport=httpx.ASGITransport(app=main.app),
+            base_url="http://benchmark",
+            timeout=None,
+        )
+
+    async def teardown(self):
+        await self.client.aclose()
+        await self.main.news_service.close()
+        await self.stub.stop()
+
+    async def run_requests(self, name: str, requests: List[Callable], concurrency: int):
+        """
+        Issue the requests `concurrency` at a time and record their latencies
+        """
+        latencies: List[float] = []
+        errors: Dict[str, int] = {}
+        queue = list(reversed(requests))
+        gemini_before = sum(self.fake_model.calls.values())
+        news_before = dict(self.stub.requests)
+
+        async def worker():
+            while queue:
+                request = queue.pop()
+                started = time.perf_counter()
+                try:
+                    response = await request()
+                    if response.status_code >= 400:
+                        errors[str(response.status_code)] = errors.get(str(response.status_code), 0) + 1
+                except Exception as e:
+                    errors[type(e).__name__] = errors.get(type(e).__name__, 0) + 1
+                latencies.append(time.perf_counter() - started)
+
+        self.lag.start()
+        started = time.perf_counter()
+        await asyncio.gather(*[worker() for _ in range(min(concurrency, len(requests)))])
+        duration = time.perf_counter() - started
+        max_lag = await self.lag.stop()
+
+        latencies.sort()
+        self.results[name] = {
+            "requests": len(latencies),
+            "errors": errors,
+            "duration_s": round(duration, 3),
+            "rps": round(len(latencies) / duration, 2) if duration else 0.0,
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "max_ms": round(latencies[-1] * 1000, 1) if latencies else 0.0,
+            "max_loop_lag_ms": round(max_lag * 1000, 1),
+            "gemini_calls": sum(self.fake_model.calls.values()) - gemini_before,
+            "news_requests": {
+                key: count - news_before.get(key, 0) for key, count in self.stub.requests.items()
+            },
+            "rss_mb": round(rss_mb(), 1),
+        }
+
+    async def create_scenarios(self, count: int) -> List[Dict]:
+        first, self.created = self.created, self.created + count
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def create(i: int):
+            async with semaphore:
+                return await self.client.post("/scenarios", json={"description": self._description(i, unique=True)})
+
+        responses = await asyncio.gather(*[create(i) for i in range(first, first + count)])
+        return [response.json() for response in responses]
+
+    async def scenario_create(self):
+        distinct = self.args.distinct
+        await self.run_requests("create", [
+            (lambda i=i: self.client.post("/scenarios", json={"description": self._description(i % distinct)}))
+            for i in range(self.args.requests)
+        ], self.args.concurrency)
+
+    async def scenario_track(self):
+        scenarios = await self.create_scenarios(max(1, self.args.requests // 3))
+        await self.run_requests("track", [
+            (lambda s=s, p=p: self.client.post("/tracking/start", json={"scenario_id": s["id"], "play_id": p["id"]}))
+            for s in scenarios for p in s["plays"]
+        ][:self.args.requests], self.args.concurrency)
+
+    async def ensure_tracked(self):
+        missing = self.args.tracked - len(self.main.tracked_scenarios_db)
+        if missing <= 0:
+            return
+        scenarios = await self.create_scenarios((missing + 2) // 3)
+        pairs = [(s["id"], p["id"]) for s in scenarios for p in s["plays"]][:missing]
+        semaphore = asyncio.Semaphore(self.args.concurrency)
+
+        async def track(scenario_id: str, play_id: str):
+            async with semaphore:
+                await self.client.post("/tracking/start", json={"scenario_id": scenario_id, "play_id": play_id})
+
+        await asyncio.gather(*[track(*pair) for pair in pairs])
+
+    async def scenario_refresh(self):
+        await self.ensure_tracked()
+        await self.run_requests("refresh", [
+            (lambda key=key: self.client.post(f"/tracking/{key[0]}/{key[1]}/refresh"))
+            for key in [
+                (tracked.scenario.id, tracked.play.id) for tracked in list(self.main.tracked_scenarios_db.values())
+            ]
+        ], self.args.concurrency)
+
+    async def scenario_scheduler(self):
+        await self.ensure_tracked()
+
+        async def run_once():
+            await self.main.tracking_scheduler.run_once()
+            return _Status(200)
+
+        await self.run_requests("scheduler", [run_once], 1)
+        status = self.main.tracking_scheduler.status()
+        self.results["scheduler"]["tracked_plays"] = status["tracked_plays"]
+        self.results["scheduler"]["groups"] = status["last_run"].get("groups")
+        self.results["scheduler"]["skipped"] = status["last_run"].get("skipped")
+
+    async def scenario_mixed(self):
+        await self.ensure_tracked()
+        gemini_before = sum(self.fake_model.calls.values())
+        background = asyncio.create_task(self.main.tracking_scheduler.run_once())
+
+        first, self.created = self.created, self.created + self.args.requests
+        await self.run_requests("mixed", [
+            (lambda i=i: self.client.post("/scenarios", json={"description": self._description(i, unique=True)}))
+            for i in range(first, first + self.args.requests)
+        ], self.args.concurrency)
+
+        started = time.perf_counter()
+        await background
+        self.results["mixed"]["scheduler_tail_s"] = round(time.perf_counter() - started, 3)
+        self.results["mixed"]["gemini_calls"] = sum(self.fake_model.calls.values()) - gemini_before
+
+    def _description(self, i: int, unique: bool = False) -> str:
+        text = DESCRIPTIONS[i % len(DESCRIPTIONS)].format(n=i // len(DESCRIPTIONS) % 9 + 1)
+        return f"{text} (run {i})" if unique else text
+
+    async def run(self, scenarios: List[str]):
+        await self.setup()
+        try:
+            for scenario in scenarios:
+                await getattr(self, f"scenario_{scenario}")()
+        finally:
+            await self.teardown()
+
+        self.results["memory"] = {"rss_mb": round(rss_mb(), 1), "peak_rss_mb": round(peak_rss_mb(), 1)}
+        self.results["gemini_calls_by_kind"] = dict(self.fake_model.calls)
+        return self.results
+
+
+class _Status:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+
+def print_report(results: Dict):
+    header = f"{'scenario':<10} {'reqs':>6} {'errors':>6} {'rps':>8} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9} {'loop lag':>9} {'gemini':>7}"
+    print(header)
+    print("-" * len(header))
+    for name in SCENARIOS:
+        if name not in results:
+            continue
+        r = results[name]
+        print(
+            f"{name:<10} {r['requests']:>6} {sum(r['errors'].values()):>6} {r['rps']:>8} {r['p50_ms']:>9} "
+            f"{r['p95_ms']:>9} {r['p99_ms']:>9} {r['max_ms']:>9} {r['max_loop_lag_ms']:>9} {r['gemini_calls']:>7}"
+        )
+    print(f"\nMemory: {results['memory']['rss_mb']} MB RSS, {results['memory']['peak_rss_mb']} MB peak")
+    print(f"Gemini calls by kind: {results['gemini_calls_by_kind']}")
+    if "scheduler" in results:
+        print(
+            f"Scheduler pass: {results['scheduler'].get('tracked_plays')} plays in {results['scheduler'].get('groups')} groups, "
+            f"{results['scheduler'].get('skipped') or 0} skipped"
+        )
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Scenarios whose p95 latency rose or throughput fell by more than `tolerance`
+    """
+    regressions = []
+    for name in SCENARIOS:
+        if name not in results or name not in baseline:
+            continue
+        current, previous = results[name], baseline[name]
+        if previous["p95_ms"] and current["p95_ms"] > previous["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {previous['p95_ms']} -> {current['p95_ms']} ms")
+        if previous["rps"] and current["rps"] < previous["rps"] * (1 - tolerance):
+            regressions.append(f"{name}: rps {previous['rps']} -> {current['rps']}")
+        if sum(current["errors"].values()) > sum(previous["errors"].values()):
+            regressions.append(f"{name}: errors {previous['errors']} -> {current['errors']}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Offline load test with fake Gemini and news stand-ins")
+    parser.add_argument("--scenario", choices=SCENARIOS + ("all",), default="all")
+    parser.add_argument("--requests", type=int, default=200, help="Requests per create/track scenario")
+    parser.add_argument("--concurrency", type=int, default=20)
+    parser.add_argument("--tracked", type=int, default=300, help="Tracked plays for refresh/scheduler")
+    parser.add_argument("--distinct", type=int, default=20, help="Distinct descriptions in the create scenario")
+    parser.add_argument("--gemini-latency", type=float, default=0.5)
+    parser.add_argument("--gemini-jitter", type=float, default=0.2)
+    parser.add_argument("--gemini-malformed-rate", type=float, default=0.0,
+                        help="Share of Gemini answers cut off mid-JSON, to exercise repair prompts")
+    parser.add_argument("--news-latency", type=float, default=0.05)
+    parser.add_argument("--feeds", type=int, default=3)
+    parser.add_argument("--rotate-seconds", type=float, default=60.0)
+    parser.add_argument("--fresh-news", action="store_true",
+                        help="Rotate headlines every second and disable the feed cache, so refreshes see new articles")
+    parser.add_argument("--newsapi", action="store_true", help="Also query the stub NewsAPI")
+    parser.add_argument("--storage", choices=("memory", "sqlite"), default="memory")
+    parser.add_argument("--env", nargs=2, action="append", default=[], metavar=("NAME", "VALUE"),
+                        help="Extra environment variable for the app, e.g. --env GEMINI_MAX_CONCURRENCY 16")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare with results from an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative change vs. the baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+    scenarios = list(SCENARIOS) if args.scenario == "all" else [args.scenario]
+
+    results = asyncio.run(LoadTest(args).run(scenarios))
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:\n" + "\n".join(f"- {regression}" for regression in regressions))
+            return 1
+        print("\nNo regressions against the baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,143 @@
+"""
+Local stand-in for the RSS feeds and NewsAPI
+
+Serves generated financial headlines with ETags (so conditional GETs get
+304s) and a configurable delay. The content rotates every `rotate_seconds`,
+so refreshes keep seeing some new articles.
+
+Run standalone with `python -m benchmarks.news_stub --port 8081`.
+"""
+import argparse
+import asyncio
+import hashlib
+import random
+import time
+from collections import Counter
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, List
+from xml.sax.saxutils import escape
+
+from aiohttp import web
+
+SUBJECTS = ["SPY", "QQQ", "Treasuries", "TLT", "Gold", "GLD", "Oil", "USO", "The Fed", "Bank stocks",
+            "Chip makers", "High yield bonds", "The dollar", "Copper", "Small caps", "S&P 500"]
+MOVES = ["rally as", "slump after", "rise despite", "fall on", "surge after", "drop as", "edge higher on",
+         "tumble on", "recover after", "hold steady ahead of"]
+CAUSES = ["inflation data", "strong earnings", "a hawkish Fed", "recession fears", "rate cut bets",
+          "weak jobs data", "supply concerns", "an upgrade", "trade tensions", "record demand"]
+
+
+class NewsStub:
+    def __init__(self, feeds: int = 3, items: int = 20, latency: float = 0.05,
+                 rotate_seconds: float = 60.0, seed: int = 11):
+        self.feeds = feeds
+        self.items = items
+        self.latency = latency
+        self.rotate_seconds = rotate_seconds
+        self.seed = seed
+        self.requests: Counter = Counter()
+        self._runner = None
+        self.port = None
+
+    def app(self) -> web.Application:
+        app = web.Application()
+        app.router.add_get("/rss/{feed}", self.rss)
+        app.router.add_get("/v2/everything", self.newsapi)
+        return app
+
+    async def start(self, host: str = "127.0.0.1", port: int = 0) -> str:
+        self._runner = web.AppRunner(self.app(), access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, host, port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return f"http://{host}:{self.port}"
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+    def feed_urls(self, base_url: str) -> List[str]:
+        return [f"{base_url}/rss/{feed}" for feed in range(self.feeds)]
+
+    def _version(self) -> int:
+        return int(time.time() // self.rotate_seconds)
+
+    def _articles(self, key: str, count: int) -> List[Dict]:
+        version = self._version()
+        now = datetime.now(timezone.utc)
+        articles = []
+        # Half of each feed carries over from the previous version, half is new
+        for i in range(count):
+            generation = version - (i % 2)
+            rng = random.Random(f"{self.seed}:{key}:{generation}:{i}")
+            title = f"{rng.choice(SUBJECTS)} {rng.choice(MOVES)} {rng.choice(CAUSES)}"
+            articles.append({
+                "title": title,
+                "url": f"https://news.example/{key}/{generation}/{i}",
+                "summary": f"<p>{title}. Analysts said positioning in {rng.choice(SUBJECTS)} "
+                           f"reflects {rng.choice(CAUSES)} and {rng.choice(CAUSES)}.</p>",
+                "published_at": now - timedelta(minutes=rng.randint(0, 600)),
+            })
+        return articles
+
+    async def rss(self, request: web.Request) -> web.Response:
+        feed = request.match_info["feed"]
+        self.requests["rss"] += 1
+        await asyncio.sleep(self.latency)
+
+        etag = '"' + hashlib.sha1(f"{feed}:{self._version()}".encode()).hexdigest()[:16] + '"'
+        if request.headers.get("If-None-Match") == etag:
+            self.requests["rss_not_modified"] += 1
+            return web.Response(status=304, headers={"ETag": etag})
+
+        items = "".join(
+            f"<item><title>{escape(article['title'])}</title><link>{article['url']}</link>"
+            f"<description>{escape(article['summary'])}</description>"
+            f"<pubDate>{format_datetime(article['published_at'])}</pubDate></item>"
+            for article in self._articles(f"feed{feed}", self.items)
+        )
+        body = (
+            f'<?xml version="1.0"?><rss version="2.0"><channel><title>Stub Feed {feed}</title>'
+            f"{items}</channel></rss>"
+        )
+        return web.Response(text=body, content_type="application/rss+xml", headers={"ETag": etag})
+
+    async def newsapi(self, request: web.Request) -> web.Response:
+        self.requests["newsapi"] += 1
+        await asyncio.sleep(self.latency)
+
+        page_size = int(request.query.get("pageSize", "10"))
+        return web.json_response({
+            "status": "ok",
+            "articles": [
+                {
+                    "title": article["title"],
+                    "url": article["url"],
+                    "source": {"name": "Stub Wire"},
+                    "publishedAt": article["published_at"].isoformat().replace("+00:00", "Z"),
+                    "description": article["summary"],
+                }
+                for article in self._articles("newsapi", page_size)
+            ],
+        })
+
+
+async def _serve(args):
+    stub = NewsStub(feeds=args.feeds, items=args.items, latency=args.latency, rotate_seconds=args.rotate_seconds)
+    base_url = await stub.start(args.host, args.port)
+    print(f"NEWS_API_URL={base_url}/v2/everything")
+    print(f"NEWS_RSS_FEEDS={','.join(stub.feed_urls(base_url))}")
+    await asyncio.Event().wait()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Local RSS/NewsAPI stub server")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--feeds", type=int, default=3)
+    parser.add_argument("--items", type=int, default=20)
+    parser.add_argument("--latency", type=float, default=0.05, help="Seconds before each response")
+    parser.add_argument("--rotate-seconds", type=float, default=60.0, help="How often the headlines change")
+    asyncio.run(_serve(parser.parse_args()))
@@ -0,0 +1,240 @@
+"""
+Cold-start benchmark for the backend
+
+Starts the app under uvicorn in a fresh process several times and measures:
+
+- import:  how long `import main` takes, and which slow optional modules it pulls in
+- healthy: time from spawning the server to its first 200 from /health
+- warm:    time until the background warm-up has created the Gemini client
+           (only with --api-key, since the client needs a key)
+
+Warm-up fetches its feeds from the local news stub, so no network is needed.
+Gemini is never called. By default the server starts without GEMINI_API_KEY,
+which /health has to tolerate.
+
+Run from backend/:
+
+    python -m benchmarks.startup_benchmark --runs 5 --json startup.json
+    python -m benchmarks.startup_benchmark --baseline startup.json   # exit 1 on regressions
+"""
+import argparse
+import asyncio
+import json
+import os
+import socket
+import statistics
+import sys
+import tempfile
+import time
+from typing import Dict, List
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import httpx
+
+from benchmarks.news_stub import NewsStub
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Modules that used to be imported with the app and shouldn't be anymore
+HEAVY_MODULES = ("google.generativeai", "feedparser", "aiohttp")
+
+IMPORT_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import main
+elapsed = time.perf_counter() - started
+print(json.dumps({"import_ms": elapsed * 1000, "heavy_imports": [m for m in %r if m in sys.modules]}))
+""" % (HEAVY_MODULES,)
+
+METRICS = ("import_ms", "healthy_ms", "warm_ms")
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class StartupBenchmark:
+    def __init__(self, args):
+        self.args = args
+        self.stub = NewsStub(feeds=args.feeds, latency=args.news_latency)
+        self.env: Dict[str, str] = {}
+
+    async def setup(self):
+        base_url = await self.stub.start()
+
+        env = dict(os.environ)
+        # An empty key (rather than none) also keeps a local .env from supplying one
+        env["GEMINI_API_KEY"] = self.args.api_key or ""
+        env["NEWS_RSS_FEEDS"] = ",".join(self.stub.feed_urls(base_url))
+        env["NEWS_API_URL"] = f"{base_url}/v2/everything"
+        env["NEWS_API_KEY"] = ""
+        env["STARTUP_WARMUP"] = "false" if self.args.no_warmup else "true"
+        env["STORAGE_BACKEND"] = self.args.storage
+        env["LOG_LEVEL"] = "WARNING"
+        env["PYTHONDONTWRITEBYTECODE"] = "1"
+        for name, value in self.args.env:
+            env[name] = value
+        self.env = env
+
+    async def measure_import(self) -> Dict:
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-c", IMPORT_PROBE,
+            cwd=BACKEND_DIR, env=self.env_for_run(), stdout=asyncio.subprocess.PIPE
+        )
+        stdout, _ = await process.communicate()
+        if process.returncode != 0:
+            raise RuntimeError("importing main failed")
+        return json.loads(stdout.decode().strip().splitlines()[-1])
+
+    async def measure_server(self) -> Dict:
+        port = free_port()
+        log = tempfile.TemporaryFile()
+        started = time.perf_counter()
+        process = await asyncio.create_subprocess_exec(
+            sys.executable, "-m", "uvicorn", "main:app", "--host", "127.0.0.1", "--port", str(port),
+            "--log-level", "warning",
+            cwd=BACKEND_DIR, env=self.env_for_run(), stdout=asyncio.subprocess.DEVNULL, stderr=log
+        )
+
+        result = {"healthy_ms": None, "warm_ms": None}
+        try:
+            async with httpx.AsyncClient(base_url=f"http://127.0.0.1:{port}", timeout=1.0) as client:
+                health = await self._poll(client, process, started, lambda body: True)
+                result["healthy_ms"] = (time.perf_counter() - started) * 1000
+                result["health_status"] = health.get("status")
+
+                if self.args.api_key and not self.args.no_warmup:
+                    await self._poll(client, process, started, lambda body: body["llm_client"]["loaded"])
+                    result["warm_ms"] = (time.perf_counter() - started) * 1000
+        except Exception:
+            log.seek(0)
+            sys.stderr.write(log.read().decode(errors="replace"))
+            raise
+        finally:
+            if process.returncode is None:
+                process.terminate()
+                await process.wait()
+            log.close()
+
+        return result
+
+    async def _poll(self, client: httpx.AsyncClient, process, started: float, ready) -> Dict:
+        """
+        GET /health until it answers 200 and `ready(body)` holds
+        """
+        while time.perf_counter() - started < self.args.timeout:
+            if process.returncode is not None:
+                raise RuntimeError(f"server exited with code {process.returncode}")
+            try:
+                response = await client.get("/health")
+                if response.status_code == 200 and ready(response.json()):
+                    return response.json()
+            except httpx.TransportError:
+                pass
+            await asyncio.sleep(self.args.poll_interval)
+        raise TimeoutError(f"server not ready after {self.args.timeout:g}s")
+
+    def env_for_run(self) -> Dict[str, str]:
+        # A fresh database per run, so every start is a cold one
+        env = dict(self.env)
+        if self.args.storage == "sqlite":
+            env["STORAGE_PATH"] = os.path.join(tempfile.mkdtemp(), "startup.db")
+        return env
+
+    async def run(self) -> Dict:
+        await self.setup()
+        runs: List[Dict] = []
+        try:
+            for _ in range(self.args.runs):
+                run = await self.measure_import()
+                run.update(await self.measure_server())
+                runs.append(run)
+        finally:
+            await self.stub.stop()
+
+        results = {"runs": runs, "heavy_imports": sorted({m for run in runs for m in run["heavy_imports"]})}
+        for metric in METRICS:
+            values = sorted(run[metric] for run in runs if run.get(metric) is not None)
+            if values:
+                results[metric] = {
+                    "min": round(values[0], 1),
+                    "median": round(statistics.median(values), 1),
+                    "max": round(values[-1], 1),
+                }
+        return results
+
+
+def print_report(results: Dict):
+    header = f"{'metric':<12} {'min ms':>9} {'median ms':>10} {'max ms':>9}"
+    print(header)
+    print("-" * len(header))
+    for metric in METRICS:
+        if metric not in results:
+            continue
+        r = results[metric]
+        print(f"{metric[:-3]:<12} {r['min']:>9} {r['median']:>10} {r['max']:>9}")
+    print(f"\nRuns: {len(results['runs'])}, /health status: {results['runs'][0].get('health_status')}")
+    print(f"Slow modules imported with the app: {', '.join(results['heavy_imports']) or 'none'}")
+
+
+def compare(results: Dict, baseline: Dict, tolerance: float) -> List[str]:
+    """
+    Metrics whose median rose by more than `tolerance`, and newly eager imports
+    """
+    regressions = []
+    for metric in METRICS:
+        if metric not in results or metric not in baseline:
+            continue
+        current, previous = results[metric]["median"], baseline[metric]["median"]
+        if previous and current > previous * (1 + tolerance):
+            regressions.append(f"{metric}: median {previous} -> {current} ms")
+    added = set(results["heavy_imports"]) - set(baseline.get("heavy_imports", []))
+    if added:
+        regressions.append(f"imported at startup: {', '.join(sorted(added))}")
+    return regressions
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Cold-start benchmark: import time and time to first healthy response")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--api-key", default="", help="GEMINI_API_KEY for the server; also measures the warm-up")
+    parser.add_argument("--no-warmup", action="store_true", help="Start with STARTUP_WARMUP=false")
+    parser.add_argument("--storage", choices=("memory", "sqlite"), default="sqlite")
+    parser.add_argument("--feeds", type=int, default=3)
+    parser.add_argument("--news-latency", type=float, default=0.05)
+    parser.add_argument("--poll-interval", type=float, default=0.01)
+    parser.add_argument("--timeout", type=float, default=60.0, help="Seconds to wait for the server per run")
+    parser.add_argument("--env", nargs=2, action="append", default=[], metavar=("NAME", "VALUE"),
+                        help="Extra environment variable for the app")
+    parser.add_argument("--json", help="Write results to this file")
+    parser.add_argument("--baseline", help="Compare with results from an earlier --json run")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative change vs. the baseline")
+    return parser.parse_args(argv)
+
+
+def main(argv=None) -> int:
+    args = parse_args(argv)
+
+    results = asyncio.run(StartupBenchmark(args).run())
+    print_report(results)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(results, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        if regressions:
+            print("\nRegressions:\n" + "\n".join(f"- {regression}" for regression in regressions))
+            return 1
+        print("\nNo regressions against the baseline")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,20 +1,77 @@
-from fastapi import FastAPI, HTTPException
+from fastapi import FastAPI, HTTPException, Query, Request
 from fastapi.middleware.cors import CORSMiddleware
-from datetime import datetime
-from typing import Dict, List
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+from contextlib import asynccontextmanager
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+import asyncio
+import json
+import logging
+import math
+import os
 import uuid
 
 from models.schemas import (
-    ScenarioRequest, Scenario, Play, TrackingRequest,
-    TrackedScenario, NewsArticle, Alert, AssetClass
+    ScenarioRequest, BatchScenarioRequest, Scenario, Play, TrackingRequest,
+    TrackedScenario, NewsArticle, Alert, AssetClass, SentimentRequest
 )
 from services.gemini_service import GeminiService
 from services.news_service import NewsService
+from services.tracking_scheduler import TrackingScheduler
+from services.event_bus import TrackingEventBus
+from services.alert_history import AlertHistory
+from services.change_detection import ChangeDetector
+from services.exposure_index import ExposureIndex
+from services.llm_scheduler import LLMOverloadedError, Priority, llm_priority
+from services.metrics import METRICS_CONTENT_TYPE, ServerTimingMiddleware, render_metrics, timed
+from services.snapshots import Snapshot, etag_matches, list_etag, version_etag
+from services.storage import open_storage, storage_info, worker_count, encode_cursor, decode_cursor
+
+logging.basicConfig(
+    level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    format="%(asctime)s %(levelname)s %(name)s: %(message)s"
+)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """
+    Run background work for as long as the app is up
+    
+    Nothing here holds up the first request: the LLM client and the news
+    pool are warmed up in the background when STARTUP_WARMUP is on.
+    """
+    tracking_scheduler.start()
+    if storage_sync is not None:
+        storage_sync.start(STORAGE_SYNC_INTERVAL_SECONDS)
+    warm_up = asyncio.create_task(_warm_up()) if STARTUP_WARMUP else None
+    
+    try:
+        yield
+    finally:
+        if warm_up is not None:
+            warm_up.cancel()
+        await tracking_scheduler.stop()
+        if storage_sync is not None:
+            await storage_sync.stop()
+        await news_service.close()
+
+
+async def _warm_up():
+    """
+    Create the Gemini client and fill the feed cache before the first request needs them
+    """
+    try:
+        await asyncio.gather(gemini_service.warm_up(), news_service.warm_up())
+    except Exception as e:
+        print(f"Error warming up services: {e}")
+
 
 app = FastAPI(
     title="Hedge Fund Agent API",
     description="AI-powered trading guidance and scenario analysis",
-    version="1.0.0"
+    version="1.0.0",
+    lifespan=lifespan
 )
 
 # CORS middleware
@@ -24,15 +81,70 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["X-Next-Cursor", "Server-Timing", "X-Profile-File", "Retry-After", "ETag"],
 )
 
-# Services
+# Per-stage Server-Timing header, request latency histograms and optional profiling
+app.add_middleware(ServerTimingMiddleware)
+
+# Services; both are cheap to construct and load their clients on first use
 gemini_service = GeminiService()
 news_service = NewsService()
+STARTUP_WARMUP = os.getenv("STARTUP_WARMUP", "true").lower() != "false"
+
+# Storage: SQLite (WAL) behind a write-through in-memory cache, or plain dicts.
+# With several workers the caches are synced through the database and leases
+# keep two workers from refreshing the same play.
+scenarios_db, tracked_scenarios_db, history_archive, leases, storage_sync = open_storage()
+STORAGE_SYNC_INTERVAL_SECONDS = float(os.getenv("STORAGE_SYNC_INTERVAL_SECONDS", "0.5"))
+REFRESH_LEASE_SECONDS = float(os.getenv("TRACKING_REFRESH_LEASE_SECONDS", "300"))
+LEASE_POLL_SECONDS = 0.2
+alert_history = AlertHistory(history_archive)
+change_detector = ChangeDetector()
+
+# Instrument -> plays, kept current by the tables on create, track and stop
+exposure_index = ExposureIndex()
+for scenario_id, scenario in scenarios_db.items():
+    exposure_index.scenario_changed(scenario_id, scenario)
+for tracking_key, tracked in tracked_scenarios_db.items():
+    exposure_index.tracked_changed(tracking_key, tracked)
+scenarios_db.listeners.append(exposure_index.scenario_changed)
+tracked_scenarios_db.listeners.append(exposure_index.tracked_changed)
+
+# Page sizes for the list endpoints
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 500
+
+# Push channel for tracking updates (server-sent events)
+tracking_events = TrackingEventBus()
+SSE_KEEPALIVE_SECONDS = 15
+if storage_sync is not None:
+    tracking_events.relay = storage_sync.publish_event
+    storage_sync.on_event = tracking_events.deliver
+
+# Background refresh of tracked plays; with news fan-out a pass only refreshes
+# the plays whose instruments new articles mention, plus idle ones
+TRACKING_NEWS_FANOUT = os.getenv("TRACKING_NEWS_FANOUT", "true").lower() != "false"
+TRACKING_MAX_IDLE_SECONDS = float(os.getenv("TRACKING_MAX_IDLE_SECONDS", "3600"))
+# Plays new articles touched, and when, until a refresh (on any worker) gets past that time
+touched_pending: Dict[str, datetime] = {}
+tracking_scheduler = TrackingScheduler(
+    list_tracked=lambda: dict(tracked_scenarios_db),
+    refresh_group=lambda tracking_keys: _refresh_tracked_group(tracking_keys),
+    select_tracked=(lambda tracked: _select_touched(tracked)) if TRACKING_NEWS_FANOUT else None
+)
+
 
-# In-memory storage (in production, use a database)
-scenarios_db: Dict[str, Scenario] = {}
-tracked_scenarios_db: Dict[str, TrackedScenario] = {}
+@app.exception_handler(LLMOverloadedError)
+async def llm_overloaded(request: Request, exc: LLMOverloadedError):
+    """
+    Shed LLM work as 429/503 with Retry-After instead of a 500
+    """
+    return JSONResponse(
+        {"detail": str(exc)},
+        status_code=exc.status_code,
+        headers={"Retry-After": str(math.ceil(exc.retry_after))}
+    )
 
 
 @app.get("/")
@@ -57,62 +169,167 @@ async def create_scenario(request: ScenarioRequest):
         # Use Gemini to analyze the scenario
         analysis = await gemini_service.analyze_scenario(request.description)
         
-        # Generate unique IDs
-        scenario_id = str(uuid.uuid4())
-        
-        # Create Play objects
-        plays = []
-        for play_data in analysis["plays"]:
-            play = Play(
-                id=str(uuid.uuid4()),
-                asset_class=AssetClass(play_data["asset_class"]),
-                title=play_data["title"],
-                description=play_data["description"],
-                action=play_data["action"],
-                instruments=play_data["instruments"],
-                rationale=play_data["rationale"],
-                risk_level=play_data["risk_level"],
-                time_horizon=play_data["time_horizon"],
-                confidence_score=play_data["confidence_score"]
-            )
-            plays.append(play)
-        
-        # Create Scenario object
-        scenario = Scenario(
-            id=scenario_id,
-            description=request.description,
-            interpreted_scenario=analysis["interpreted_scenario"],
-            plays=plays,
-            created_at=datetime.now(),
-            is_tracking=False
-        )
+        scenario = _build_scenario(request.description, analysis)
         
         # Store in database
-        scenarios_db[scenario_id] = scenario
+        with timed("persist"):
+            scenarios_db[scenario.id] = scenario
         
-        return scenario
+        return _snapshot_response(_scenario_snapshot(scenario.id))
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error analyzing scenario: {str(e)}")
 
 
+@app.post("/scenarios/batch")
+async def create_scenarios_batch(request: BatchScenarioRequest):
+    """
+    Create many scenarios at once, streaming each one back as NDJSON as soon as it's analyzed
+    """
+    async def results():
+        async for index, analysis in gemini_service.analyze_scenarios(request.descriptions):
+            description = request.descriptions[index]
+            
+            try:
+                if isinstance(analysis, Exception):
+                    raise analysis
+                
+                scenario = _build_scenario(description, analysis)
+                scenarios_db[scenario.id] = scenario
+                
+                line = {"index": index, "scenario": scenario.model_dump(mode="json")}
+            except Exception as e:
+                line = {"index": index, "description": description, "error": f"Error analyzing scenario: {str(e)}"}
+            
+            yield json.dumps(line) + "\n"
+    
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+@app.post("/scenarios/stream")
+async def create_scenario_stream(request: ScenarioRequest):
+    """
+    Create a new scenario, streaming the interpretation and each play as NDJSON as soon as they're generated
+    """
+    async def events():
+        scenario_id = str(uuid.uuid4())
+        interpreted_scenario = None
+        plays = []
+        
+        try:
+            async for kind, data in gemini_service.analyze_scenario_stream(request.description):
+                if kind == "interpreted_scenario":
+                    interpreted_scenario = data["interpreted_scenario"]
+                    yield json.dumps({
+                        "type": "interpreted_scenario",
+                        "scenario_id": scenario_id,
+                        "interpreted_scenario": interpreted_scenario
+                    }) + "\n"
+                elif kind == "play":
+                    play = _build_play(data)
+                    plays.append(play)
+                    yield json.dumps({"type": "play", "play": play.model_dump(mode="json")}) + "\n"
+            
+            scenario = Scenario(
+                id=scenario_id,
+                description=request.description,
+                interpreted_scenario=interpreted_scenario,
+                plays=plays,
+                created_at=datetime.now(),
+                is_tracking=False
+            )
+            
+            # Store in database
+            scenarios_db[scenario.id] = scenario
+            
+            yield json.dumps({"type": "scenario", "scenario": scenario.model_dump(mode="json")}) + "\n"
+            
+        except Exception as e:
+            yield json.dumps({"type": "error", "detail": f"Error analyzing scenario: {str(e)}"}) + "\n"
+    
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+def _build_play(play_data: Dict) -> Play:
+    """
+    Turn one play from a Gemini analysis into a Play
+    """
+    return Play(
+        id=str(uuid.uuid4()),
+        asset_class=AssetClass(play_data["asset_class"]),
+        title=play_data["title"],
+        description=play_data["description"],
+        action=play_data["action"],
+        instruments=play_data["instruments"],
+        rationale=play_data["rationale"],
+        risk_level=play_data["risk_level"],
+        time_horizon=play_data["time_horizon"],
+        confidence_score=play_data["confidence_score"]
+    )
+
+
+def _build_scenario(description: str, analysis: Dict) -> Scenario:
+    """
+    Turn a Gemini scenario analysis into a Scenario with its plays
+    """
+    # Generate unique IDs
+    scenario_id = str(uuid.uuid4())
+    
+    # Create Play objects
+    plays = [_build_play(play_data) for play_data in analysis["plays"]]
+    
+    # Create Scenario object
+    return Scenario(
+        id=scenario_id,
+        description=description,
+        interpreted_scenario=analysis["interpreted_scenario"],
+        plays=plays,
+        created_at=datetime.now(),
+        is_tracking=False
+    )
+
+
 @app.get("/scenarios", response_model=List[Scenario])
-async def list_scenarios():
+async def list_scenarios(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    asset_class: Optional[AssetClass] = None,
+    is_tracking: Optional[bool] = None,
+    fields: Optional[str] = None
+):
     """
-    Get all created scenarios
+    Get created scenarios, newest first
+    
+    Pass the `X-Next-Cursor` response header back as `cursor` to get the next page.
+    `fields` is an optional comma-separated list of top-level fields to return.
     """
-    return list(scenarios_db.values())
+    filters = {}
+    if asset_class is not None:
+        filters["asset_classes"] = asset_class.value
+    if is_tracking is not None:
+        filters["is_tracking"] = int(is_tracking)
+    
+    return _page_response(
+        request, scenarios_db, Scenario, "created_at", limit, cursor, filters, fields,
+        lambda scenario: _scenario_snapshot(scenario.id),
+        lambda scenario: (scenario.id, _scenario_version(scenario.id))
+    )
 
 
 @app.get("/scenarios/{scenario_id}", response_model=Scenario)
-async def get_scenario(scenario_id: str):
+async def get_scenario(request: Request, scenario_id: str):
     """
     Get a specific scenario by ID
+    
+    Answers 304 Not Modified when `If-None-Match` has the current ETag.
     """
     if scenario_id not in scenarios_db:
         raise HTTPException(status_code=404, detail="Scenario not found")
     
-    return scenarios_db[scenario_id]
+    return _snapshot_response(_scenario_snapshot(scenario_id), request)
 
 
 @app.post("/tracking/start", response_model=TrackedScenario)
@@ -138,21 +355,23 @@ async def start_tracking(request: TrackingRequest):
     
     # Fetch initial news
     try:
-        news_articles_data = await news_service.fetch_news_for_scenario(
-            scenario.description,
-            play.instruments
-        )
+        with timed("news_fetch"):
+            news_articles_data = await news_service.fetch_news_for_scenario(
+                scenario.description,
+                play.instruments
+            )
         
         news_articles = [
             NewsArticle(**article) for article in news_articles_data
         ]
         
         # Generate initial alerts
-        alerts_data = await gemini_service.generate_alerts(
-            scenario.interpreted_scenario,
-            play.dict(),
-            news_articles_data
-        )
+        with timed("llm_alerts"):
+            alerts_data = await gemini_service.generate_alerts(
+                scenario.interpreted_scenario,
+                play.dict(),
+                news_articles_data
+            )
         
         alerts = [
             Alert(
@@ -167,47 +386,273 @@ async def start_tracking(request: TrackingRequest):
         ]
         
         # Create tracked scenario
+        tracking_key = f"{request.scenario_id}_{request.play_id}"
         tracked_scenario = TrackedScenario(
             scenario=scenario,
             play=play,
             news_articles=news_articles,
-            alerts=alerts,
+            alerts=[],
             last_updated=datetime.now(),
             play_updates=[]
         )
+        alert_history.delete(tracking_key)
+        alert_history.add_alerts(tracking_key, tracked_scenario, alerts)
+        change_detector.mark_seen(tracked_scenario, news_articles_data)
+        
+        # Mark scenario as tracking
+        scenario.is_tracking = True
+        scenarios_db.save(scenario.id)
         
         # Store in database
-        tracking_key = f"{request.scenario_id}_{request.play_id}"
         tracked_scenarios_db[tracking_key] = tracked_scenario
         
-        # Mark scenario as tracking
-        scenario.is_tracking = True
+        tracking_events.publish(tracking_key, {
+            "type": "started",
+            "scenario_id": scenario.id,
+            "play_id": play.id,
+            "tracked_scenario": tracked_scenario.model_dump(mode="json")
+        })
         
-        return tracked_scenario
+        return _snapshot_response(_tracked_snapshot(tracking_key))
         
+    except LLMOverloadedError:
+        raise
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error starting tracking: {str(e)}")
 
 
 @app.get("/tracking", response_model=List[TrackedScenario])
-async def list_tracked_scenarios():
+async def list_tracked_scenarios(
+    request: Request,
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: Optional[str] = None,
+    asset_class: Optional[AssetClass] = None,
+    severity: Optional[str] = Query(None, pattern="^(info|warning|critical)$"),
+    fields: Optional[str] = None
+):
+    """
+    Get tracked scenarios, most recently updated first
+    
+    Pass the `X-Next-Cursor` response header back as `cursor` to get the next page.
+    `severity` keeps plays with at least one alert of that severity. `fields` is an
+    optional comma-separated list of top-level fields to return, e.g.
+    `scenario,play,last_updated` to skip news articles and alerts.
+    """
+    filters = {}
+    if asset_class is not None:
+        filters["asset_class"] = asset_class.value
+    if severity is not None:
+        filters["severities"] = severity
+    
+    return _page_response(
+        request, tracked_scenarios_db, TrackedScenario, "last_updated", limit, cursor, filters, fields,
+        lambda tracked: _tracked_snapshot(f"{tracked.scenario.id}_{tracked.play.id}"),
+        lambda tracked: (f"{tracked.scenario.id}_{tracked.play.id}", _tracked_version(tracked))
+    )
+
+
+def _page_response(request: Request, table, model, order_by: str, limit: int, cursor: Optional[str],
+                   filters: Dict, fields: Optional[str], snapshot: Callable[[Any], Snapshot],
+                   version: Callable[[Any], Any]) -> Response:
+    """
+    Serialize one page of a table, with the next page's cursor in `X-Next-Cursor`
+    
+    Full records are joined from their cached snapshots, and the page's ETag
+    is derived from theirs. A `fields` projection serializes only those fields
+    and takes its ETag from the records' versions instead, so it never builds
+    full snapshots. Either way an unchanged page answers 304 Not Modified.
+    """
+    include = None
+    if fields:
+        include = {field.strip() for field in fields.split(",") if field.strip()}
+        unknown = include - set(model.model_fields)
+        if unknown:
+            raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(sorted(unknown))}")
+    
+    try:
+        records, next_cursor = table.page(
+            order_by, limit, decode_cursor(cursor) if cursor else None, filters
+        )
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    headers = {"X-Next-Cursor": encode_cursor(next_cursor)} if next_cursor else {}
+    
+    if include is not None:
+        headers["ETag"] = version_etag((version(record) for record in records), sorted(include), next_cursor)
+    else:
+        snapshots = [snapshot(record) for record in records]
+        headers["ETag"] = list_etag((s.etag for s in snapshots), None, next_cursor)
+    headers["Cache-Control"] = "no-cache"
+    if etag_matches(request.headers.get("if-none-match"), headers["ETag"]):
+        return Response(status_code=304, headers=headers)
+    
+    if include is not None:
+        with timed("serialize"):
+            return JSONResponse(
+                [record.model_dump(mode="json", include=include) for record in records],
+                headers=headers
+            )
+    return Response(b"[" + b",".join(s.body for s in snapshots) + b"]", media_type="application/json", headers=headers)
+
+
+def _json_response(record) -> JSONResponse:
+    """
+    Serialize a model explicitly so the time it takes shows up as its own stage
+    """
+    with timed("serialize"):
+        return JSONResponse(record.model_dump(mode="json"))
+
+
+def _scenario_version(scenario_id: str) -> int:
+    return scenarios_db.snapshots.version(scenario_id)
+
+
+def _tracked_version(tracked: TrackedScenario) -> tuple:
+    # The tracked play embeds its scenario (the shared object), so it changes with it too
+    return (
+        tracked_scenarios_db.snapshots.version(f"{tracked.scenario.id}_{tracked.play.id}"),
+        scenarios_db.snapshots.version(tracked.scenario.id)
+    )
+
+
+def _scenario_snapshot(scenario_id: str) -> Snapshot:
+    with timed("serialize"):
+        return scenarios_db.snapshots.get(scenario_id, scenarios_db[scenario_id], _scenario_version(scenario_id))
+
+
+def _tracked_snapshot(tracking_key: str) -> Snapshot:
+    tracked = tracked_scenarios_db[tracking_key]
+    with timed("serialize"):
+        return tracked_scenarios_db.snapshots.get(tracking_key, tracked, _tracked_version(tracked))
+
+
+def _snapshot_response(snapshot: Snapshot, request: Optional[Request] = None) -> Response:
     """
-    Get all tracked scenarios
+    Send a record's cached JSON, or 304 Not Modified if the client already has this version
     """
-    return list(tracked_scenarios_db.values())
+    headers = {"ETag": snapshot.etag, "Cache-Control": "no-cache"}
+    if request is not None and etag_matches(request.headers.get("if-none-match"), snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(snapshot.body, media_type="application/json", headers=headers)
+
+
+@app.get("/tracking/scheduler")
+async def get_tracking_scheduler_status():
+    """
+    Get the state of the background tracking scheduler
+    """
+    return tracking_scheduler.status()
+
+
+@app.get("/tracking/events")
+async def stream_all_tracking_events(request: Request):
+    """
+    Server-sent events with updates for every tracked play
+    """
+    return _tracking_event_stream(request, None)
 
 
 @app.get("/tracking/{scenario_id}/{play_id}", response_model=TrackedScenario)
-async def get_tracked_scenario(scenario_id: str, play_id: str):
+async def get_tracked_scenario(request: Request, scenario_id: str, play_id: str):
     """
     Get a specific tracked scenario
+    
+    Answers 304 Not Modified when `If-None-Match` has the current ETag.
     """
     tracking_key = f"{scenario_id}_{play_id}"
     
     if tracking_key not in tracked_scenarios_db:
         raise HTTPException(status_code=404, detail="Tracked scenario not found")
     
-    return tracked_scenarios_db[tracking_key]
+    return _snapshot_response(_tracked_snapshot(tracking_key), request)
+
+
+@app.get("/tracking/{scenario_id}/{play_id}/alerts", response_model=List[Alert])
+async def get_alert_history(
+    scenario_id: str,
+    play_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    severity: Optional[str] = Query(None, pattern="^(info|warning|critical)$"),
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Alert history of a tracked play, newest first, including alerts that were
+    archived out of the tracked scenario's recent list
+    """
+    tracking_key = f"{scenario_id}_{play_id}"
+    
+    if tracking_key not in tracked_scenarios_db:
+        raise HTTPException(status_code=404, detail="Tracked scenario not found")
+    
+    return alert_history.alerts(
+        tracking_key, tracked_scenarios_db[tracking_key], since, until, severity, limit
+    )
+
+
+@app.get("/tracking/{scenario_id}/{play_id}/play-updates", response_model=List[str])
+async def get_play_update_history(
+    scenario_id: str,
+    play_id: str,
+    since: Optional[datetime] = None,
+    until: Optional[datetime] = None,
+    limit: int = Query(100, ge=1, le=1000)
+):
+    """
+    Play update history of a tracked play, newest first
+    """
+    tracking_key = f"{scenario_id}_{play_id}"
+    
+    if tracking_key not in tracked_scenarios_db:
+        raise HTTPException(status_code=404, detail="Tracked scenario not found")
+    
+    return alert_history.play_updates(
+        tracking_key, tracked_scenarios_db[tracking_key], since, until, limit
+    )
+
+
+@app.get("/tracking/{scenario_id}/{play_id}/events")
+async def stream_tracking_events(request: Request, scenario_id: str, play_id: str):
+    """
+    Server-sent events with updates for one tracked play
+    """
+    tracking_key = f"{scenario_id}_{play_id}"
+    
+    if tracking_key not in tracked_scenarios_db:
+        raise HTTPException(status_code=404, detail="Tracked scenario not found")
+    
+    return _tracking_event_stream(request, tracking_key)
+
+
+def _tracking_event_stream(request: Request, tracking_key: Optional[str]) -> StreamingResponse:
+    """
+    Stream tracking events to a client until it disconnects
+    """
+    queue = tracking_events.subscribe(tracking_key)
+    
+    async def events():
+        try:
+            while not await request.is_disconnected():
+                try:
+                    event = await asyncio.wait_for(queue.get(), timeout=SSE_KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    # Comment line keeps proxies from closing an idle connection
+                    yield ": keep-alive\n\n"
+                    continue
+                
+                yield f"event: {event['type']}\ndata: {json.dumps(event)}\n\n"
+                
+                if tracking_key is not None and event["type"] == "stopped":
+                    break
+        finally:
+            tracking_events.unsubscribe(queue)
+    
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+    )
 
 
 @app.post("/tracking/{scenario_id}/{play_id}/refresh", response_model=TrackedScenario)
@@ -220,61 +665,219 @@ async def refresh_tracked_scenario(scenario_id: str, play_id: str):
     if tracking_key not in tracked_scenarios_db:
         raise HTTPException(status_code=404, detail="Tracked scenario not found")
     
+    lease_name = f"refresh:{tracking_key}"
+    lease = leases.acquire(lease_name, REFRESH_LEASE_SECONDS)
+    if lease is None:
+        # Another request or worker is refreshing this play; return its result instead of repeating it
+        await _wait_for_lease(lease_name)
+        if tracking_key not in tracked_scenarios_db:
+            raise HTTPException(status_code=404, detail="Tracked scenario not found")
+        return _snapshot_response(_tracked_snapshot(tracking_key))
+    
     tracked = tracked_scenarios_db[tracking_key]
     
     try:
         # Fetch latest news
-        news_articles_data = await news_service.fetch_news_for_scenario(
-            tracked.scenario.description,
-            tracked.play.instruments
-        )
+        with timed("news_fetch"):
+            news_articles_data = await news_service.fetch_news_for_scenario(
+                tracked.scenario.description,
+                tracked.play.instruments
+            )
         
-        news_articles = [
-            NewsArticle(**article) for article in news_articles_data
-        ]
+        tracked = await _refresh_tracked(tracked, news_articles_data)
+        if tracking_key not in tracked_scenarios_db:
+            # Tracking was stopped meanwhile; there's no stored version to cache
+            return _json_response(tracked)
+        return _snapshot_response(_tracked_snapshot(tracking_key))
         
-        # Check for play updates
-        play_update = await gemini_service.update_play_with_news(
-            tracked.play.dict(),
-            news_articles_data
+    except LLMOverloadedError:
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error refreshing tracked scenario: {str(e)}")
+    finally:
+        leases.release(lease_name, lease)
+
+
+async def _wait_for_lease(lease_name: str):
+    """
+    Wait until a lease is released or expires
+    """
+    loop = asyncio.get_running_loop()
+    deadline = loop.time() + REFRESH_LEASE_SECONDS
+    with timed("lease_wait"):
+        while leases.held(lease_name) and loop.time() < deadline:
+            await asyncio.sleep(LEASE_POLL_SECONDS)
+
+
+async def _refresh_tracked(tracked: TrackedScenario, news_articles_data: List[Dict]) -> TrackedScenario:
+    """
+    Apply the latest news to a tracked scenario: play updates and new alerts
+    """
+    news_articles = [
+        NewsArticle(**article) for article in news_articles_data
+    ]
+    
+    # Check for play updates and generate new alerts, unless nothing material is new
+    with timed("change_detection"):
+        material = change_detector.material_changes(tracked, news_articles_data)
+    if material:
+        with timed("llm_refresh"):
+            play_update = await gemini_service.refresh_play(
+                tracked.scenario.interpreted_scenario,
+                tracked.play.dict(),
+                news_articles_data
+            )
+    else:
+        change_detector.record_skip(1 if gemini_service.fused_refresh else 2)
+        play_update = {}
+    change_detector.mark_seen(tracked, news_articles_data)
+    alerts_data = play_update.get("alerts", [])
+    
+    new_alerts = [
+        Alert(
+            id=str(uuid.uuid4()),
+            scenario_id=tracked.scenario.id,
+            play_id=tracked.play.id,
+            message=alert["message"],
+            severity=alert["severity"],
+            created_at=datetime.now()
         )
-        
-        # Generate new alerts
-        alerts_data = await gemini_service.generate_alerts(
-            tracked.scenario.interpreted_scenario,
-            tracked.play.dict(),
-            news_articles_data
+        for alert in alerts_data
+    ]
+    
+    tracking_key = f"{tracked.scenario.id}_{tracked.play.id}"
+    seen_urls = {article.url for article in tracked.news_articles}
+    previous_confidence = tracked.play.confidence_score
+    new_play_updates = []
+    
+    # Update the tracked scenario; repeated alerts only bump their occurrence count
+    tracked.news_articles = news_articles
+    new_alerts, repeated_alerts = alert_history.add_alerts(tracking_key, tracked, new_alerts)
+    tracked.last_updated = datetime.now()
+    
+    # Add play updates if any
+    if play_update.get("should_modify") and play_update.get("modifications"):
+        new_play_updates.append(
+            alert_history.add_play_update(tracking_key, tracked, play_update["modifications"])
         )
-        
-        new_alerts = [
-            Alert(
-                id=str(uuid.uuid4()),
-                scenario_id=scenario_id,
-                play_id=play_id,
-                message=alert["message"],
-                severity=alert["severity"],
-                created_at=datetime.now()
+        # Update confidence score
+        tracked.play.confidence_score = play_update.get("updated_confidence_score", tracked.play.confidence_score)
+    
+    # Persist the changes (the play is shared with its scenario)
+    with timed("persist"):
+        if tracking_key in tracked_scenarios_db:
+            tracked_scenarios_db.save(tracking_key)
+        if tracked.play.confidence_score != previous_confidence and tracked.scenario.id in scenarios_db:
+            scenarios_db.save(tracked.scenario.id)
+    
+    # Push only what changed to subscribers
+    delta = {
+        "type": "delta",
+        "scenario_id": tracked.scenario.id,
+        "play_id": tracked.play.id,
+        "last_updated": tracked.last_updated.isoformat(),
+        "new_alerts": [alert.model_dump(mode="json") for alert in new_alerts],
+        "repeated_alerts": [
+            {"id": alert.id, "occurrences": alert.occurrences, "last_seen_at": alert.last_seen_at.isoformat()}
+            for alert in repeated_alerts
+        ],
+        "max_alerts": alert_history.max_alerts,
+        "new_articles": [
+            article.model_dump(mode="json") for article in news_articles if article.url not in seen_urls
+        ],
+        "news_article_urls": [article.url for article in news_articles],
+        "play_updates": new_play_updates,
+        "max_play_updates": alert_history.max_play_updates,
+    }
+    if tracked.play.confidence_score != previous_confidence:
+        delta["confidence_score"] = tracked.play.confidence_score
+    
+    with timed("publish"):
+        tracking_events.publish(tracking_key, delta)
+    
+    return tracked
+
+
+async def _refresh_tracked_group(tracking_keys: List[str]):
+    """
+    Refresh tracked plays that share instruments with a single news pull
+    """
+    # Background work: its LLM calls queue behind interactive requests
+    with llm_priority(Priority.REFRESH):
+        refresh_leases = _claim_scheduled_refreshes(tracking_keys)
+        try:
+            tracked_list = [tracked_scenarios_db[key] for key in refresh_leases]
+            if not tracked_list:
+                return
+            
+            news_per_play = await news_service.fetch_news_for_scenarios(
+                [tracked.scenario.description for tracked in tracked_list],
+                tracked_list[0].play.instruments
             )
-            for alert in alerts_data
-        ]
-        
-        # Update the tracked scenario
-        tracked.news_articles = news_articles
-        tracked.alerts.extend(new_alerts)
-        tracked.last_updated = datetime.now()
-        
-        # Add play updates if any
-        if play_update.get("should_modify") and play_update.get("modifications"):
-            tracked.play_updates.append(
-                f"[{datetime.now().isoformat()}] {play_update['modifications']}"
+            
+            results = await asyncio.gather(
+                *[
+                    _refresh_tracked(tracked, news_articles_data)
+                    for tracked, news_articles_data in zip(tracked_list, news_per_play)
+                ],
+                return_exceptions=True
             )
-            # Update confidence score
-            tracked.play.confidence_score = play_update.get("updated_confidence_score", tracked.play.confidence_score)
+        finally:
+            for key, lease in refresh_leases.items():
+                leases.release(f"refresh:{key}", lease)
         
-        return tracked
-        
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=f"Error refreshing tracked scenario: {str(e)}")
+        errors = [result for result in results if isinstance(result, Exception)]
+        if errors:
+            raise errors[0]
+
+
+async def _select_touched(tracked: Dict[str, TrackedScenario]) -> Dict[str, TrackedScenario]:
+    """
+    Fan new articles out to the tracked plays whose instruments they mention
+    
+    Plays no new article touches are left alone, unless they haven't been
+    refreshed for TRACKING_MAX_IDLE_SECONDS: news about a scenario that names
+    none of its instruments still gets through that way.
+    
+    Articles are only handed out once, so a touched play stays selected until
+    a refresh succeeds; one whose lease was taken, whose LLM call was shed or
+    whose refresh failed gets another go on the next pass.
+    """
+    with timed("news_fanout"):
+        touched = set().union(*exposure_index.touched(await news_service.new_articles()).values())
+    
+    for key, touched_at in list(touched_pending.items()):
+        if key not in tracked or tracked[key].last_updated >= touched_at:
+            del touched_pending[key]
+    now = datetime.now()
+    for key in touched:
+        touched_pending.setdefault(key, now)
+    
+    idle_since = now - timedelta(seconds=TRACKING_MAX_IDLE_SECONDS)
+    return {
+        key: tracked_scenario for key, tracked_scenario in tracked.items()
+        if key in touched_pending or tracked_scenario.last_updated <= idle_since
+    }
+
+
+def _claim_scheduled_refreshes(tracking_keys: List[str]) -> Dict[str, str]:
+    """
+    Take the refresh lease of each tracked play that no one else is refreshing
+    
+    With several workers, each running the scheduler, a play is also claimed
+    for (most of) the refresh interval, so only one worker's pass refreshes it.
+    """
+    claim_seconds = tracking_scheduler.interval_seconds * (1 - tracking_scheduler.jitter)
+    refresh_leases = {}
+    for key in tracking_keys:
+        if key not in tracked_scenarios_db:
+            continue
+        if storage_sync is not None and not leases.acquire(f"scheduled:{key}", claim_seconds):
+            continue
+        lease = leases.acquire(f"refresh:{key}", REFRESH_LEASE_SECONDS)
+        if lease is not None:
+            refresh_leases[key] = lease
+    return refresh_leases
 
 
 @app.delete("/tracking/{scenario_id}/{play_id}")
@@ -289,14 +892,89 @@ async def stop_tracking(scenario_id: str, play_id: str):
     
     # Remove from tracking
     del tracked_scenarios_db[tracking_key]
+    alert_history.delete(tracking_key)
+    
+    tracking_events.publish(tracking_key, {
+        "type": "stopped",
+        "scenario_id": scenario_id,
+        "play_id": play_id
+    })
     
     # Update scenario tracking status
     if scenario_id in scenarios_db:
         scenarios_db[scenario_id].is_tracking = False
+        scenarios_db.save(scenario_id)
     
     return {"message": "Tracking stopped successfully"}
 
 
+@app.get("/exposure")
+async def get_exposure():
+    """
+    Aggregated exposure per instrument across tracked plays, most-tracked first
+    
+    `net_exposure` is the confidence-weighted direction of the plays, from -1
+    (all short at full confidence) to +1 (all long).
+    """
+    return exposure_index.exposure()
+
+
+@app.get("/exposure/{instrument}")
+async def get_instrument_exposure(instrument: str):
+    """
+    Exposure to one instrument, with the tracked plays that reference it
+    """
+    exposure = exposure_index.instrument_exposure(instrument)
+    if exposure is None:
+        raise HTTPException(status_code=404, detail="No play references this instrument")
+    
+    return exposure
+
+
+@app.get("/sentiment")
+async def get_sentiment(
+    instruments: str = Query(..., description="Comma-separated symbols, e.g. SPY,GLD,TLT"),
+    bucket_minutes: int = Query(60, ge=1, le=10080),
+    window: int = Query(6, ge=1, le=500)
+):
+    """
+    Overall, per-instrument and rolling sentiment of the latest news for instruments
+    """
+    symbols = [symbol.strip().upper() for symbol in instruments.split(",") if symbol.strip()]
+    if not symbols:
+        raise HTTPException(status_code=400, detail="No instruments given")
+    
+    try:
+        return await news_service.get_market_sentiment(symbols, bucket_minutes, window)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error computing sentiment: {str(e)}")
+
+
+@app.post("/sentiment/score")
+async def score_sentiment(request: SentimentRequest):
+    """
+    Score a batch of supplied articles, e.g. for dashboard backfills
+    """
+    articles = [article.model_dump() for article in request.articles]
+    
+    # Large batches are CPU-bound; keep them off the event loop
+    return await asyncio.to_thread(
+        news_service.sentiment_engine.analyze,
+        articles,
+        request.instruments,
+        request.bucket_minutes,
+        request.window
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Prometheus metrics: per-stage and per-endpoint latency histograms
+    """
+    return Response(render_metrics(), media_type=METRICS_CONTENT_TYPE)
+
+
 @app.get("/health")
 async def health_check():
     """
@@ -306,10 +984,25 @@ async def health_check():
         "status": "healthy",
         "timestamp": datetime.now().isoformat(),
         "scenarios_count": len(scenarios_db),
-        "tracked_scenarios_count": len(tracked_scenarios_db)
+        "tracked_scenarios_count": len(tracked_scenarios_db),
+        "storage": storage_info(scenarios_db),
+        "snapshot_cache": {
+            "scenarios": scenarios_db.snapshots.info(),
+            "tracked_scenarios": tracked_scenarios_db.snapshots.info()
+        },
+        "alert_history": alert_history.stats(),
+        "change_detection": change_detector.stats(),
+        "exposure_index": exposure_index.stats(),
+        "analysis_cache": gemini_service.analysis_cache.stats(),
+        "llm_client": {"configured": bool(gemini_service.api_key), "loaded": gemini_service.loaded},
+        "llm_token_usage": gemini_service.token_usage,
+        "llm_json_repairs": gemini_service.repairs,
+        "llm_scheduler": gemini_service.scheduler.stats(),
+        "tracking_events": tracking_events.stats()
     }
 
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=8000)
+    # Several workers need the app as an import string; set WEB_CONCURRENCY to scale out
+    uvicorn.run("main:app", host="0.0.0.0", port=8000, workers=worker_count())
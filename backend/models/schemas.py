@@ -1,4 +1,4 @@
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, field_validator
 from typing import List, Optional
 from datetime import datetime
 from enum import Enum
@@ -21,6 +21,25 @@ class ScenarioRequest(BaseModel):
         }
 
 
+class BatchScenarioRequest(BaseModel):
+    descriptions: List[str] = Field(
+        ...,
+        min_length=1,
+        max_length=500,
+        description="Natural language descriptions of the market scenarios to analyze"
+    )
+    
+    class Config:
+        json_schema_extra = {
+            "example": {
+                "descriptions": [
+                    "S&P 500 down 5% over the next month",
+                    "Fed delays rate cuts until next year"
+                ]
+            }
+        }
+
+
 class Play(BaseModel):
     id: str
     asset_class: AssetClass
@@ -55,6 +74,27 @@ class NewsArticle(BaseModel):
     published_at: datetime
     summary: str
     relevance_score: float = Field(..., ge=0.0, le=1.0)
+    source_count: int = 1  # Sources that carried the same story
+
+
+class SentimentArticle(BaseModel):
+    title: str
+    summary: str = ""
+    published_at: Optional[datetime] = None
+
+    @field_validator("published_at")
+    @classmethod
+    def _plausible_date(cls, value: Optional[datetime]) -> Optional[datetime]:
+        if value is not None and not 1970 <= value.year <= datetime.now().year + 1:
+            raise ValueError("published_at must be between 1970 and next year")
+        return value
+
+
+class SentimentRequest(BaseModel):
+    articles: List[SentimentArticle] = Field(..., max_length=50000)
+    instruments: List[str] = Field(default_factory=list, description="Symbols to score separately")
+    bucket_minutes: int = Field(60, ge=1, le=10080)
+    window: int = Field(6, ge=1, le=500)
 
 
 class Alert(BaseModel):
@@ -64,6 +104,8 @@ class Alert(BaseModel):
     message: str
     severity: str  # "info", "warning", "critical"
     created_at: datetime
+    occurrences: int = 1  # Times the same alert was raised
+    last_seen_at: Optional[datetime] = None
 
 
 class TrackedScenario(BaseModel):
@@ -73,6 +115,8 @@ class TrackedScenario(BaseModel):
     alerts: List[Alert]
     last_updated: datetime
     play_updates: List[str]  # List of modifications to the play
+    # Articles already sent to the LLM, oldest first; internal, so never serialized (storage keeps it apart)
+    seen_article_fingerprints: List[str] = Field(default_factory=list, exclude=True)
 
 
 class PlayUpdate(BaseModel):
@@ -0,0 +1,154 @@
+import hashlib
+import json
+import os
+import re
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from models.schemas import Alert, TrackedScenario
+
+
+def alert_fingerprint(message: str, severity: str) -> str:
+    """
+    Content hash of an alert, ignoring case, whitespace and trailing punctuation
+
+    The LLM tends to repeat the same alert on every refresh while the news
+    hasn't moved; those repeats share a fingerprint.
+    """
+    text = re.sub(r"\s+", " ", message.lower()).strip(" .!?")
+    return hashlib.sha1(f"{severity.lower()}|{text}".encode("utf-8")).hexdigest()
+
+
+def _naive(value: Optional[datetime]) -> Optional[datetime]:
+    # Stored timestamps are naive local time; compare query bounds the same way
+    if value is not None and value.tzinfo is not None:
+        return value.astimezone().replace(tzinfo=None)
+    return value
+
+
+class AlertHistory:
+    """
+    Bounded, de-duplicated alert and play-update history for tracked plays
+
+    Each tracked play keeps only its most recent alerts and play updates
+    inline; older entries are moved to the archive, where they stay queryable
+    by time range. A repeated alert bumps the occurrence count of the existing
+    one instead of being appended again.
+    """
+
+    def __init__(self, archive):
+        self.archive = archive
+        self.max_alerts = int(os.getenv("ALERT_HISTORY_SIZE", "50"))
+        self.max_play_updates = int(os.getenv("PLAY_UPDATE_HISTORY_SIZE", "20"))
+        self.archived = 0
+        self.deduplicated = 0
+
+    def add_alerts(self, tracking_key: str, tracked: TrackedScenario, alerts: List[Alert]) -> Tuple[List[Alert], List[Alert]]:
+        """
+        Record alerts on a tracked play; returns the new alerts and the
+        existing ones whose occurrence count was bumped
+        """
+        by_fingerprint = {
+            alert_fingerprint(alert.message, alert.severity): alert for alert in tracked.alerts
+        }
+        new_alerts: List[Alert] = []
+        repeated: List[Alert] = []
+
+        for alert in alerts:
+            fingerprint = alert_fingerprint(alert.message, alert.severity)
+            existing = by_fingerprint.get(fingerprint)
+            if existing is not None:
+                existing.occurrences += 1
+                existing.last_seen_at = alert.created_at
+                if existing not in repeated:
+                    repeated.append(existing)
+                self.deduplicated += 1
+                continue
+
+            by_fingerprint[fingerprint] = alert
+            tracked.alerts.append(alert)
+            new_alerts.append(alert)
+
+        overflow = len(tracked.alerts) - self.max_alerts
+        if overflow > 0:
+            for alert in tracked.alerts[:overflow]:
+                self.archive.add(tracking_key, "alert", alert.created_at, alert.model_dump_json())
+            del tracked.alerts[:overflow]
+            self.archived += overflow
+
+        return new_alerts, repeated
+
+    def add_play_update(self, tracking_key: str, tracked: TrackedScenario, modifications: str) -> str:
+        """
+        Record a play update on a tracked play; returns the stored entry
+        """
+        now = datetime.now()
+        entry = f"[{now.isoformat()}] {modifications}"
+        tracked.play_updates.append(entry)
+
+        overflow = len(tracked.play_updates) - self.max_play_updates
+        if overflow > 0:
+            for old_entry in tracked.play_updates[:overflow]:
+                self.archive.add(tracking_key, "play_update", self._play_update_time(old_entry, now), json.dumps(old_entry))
+            del tracked.play_updates[:overflow]
+            self.archived += overflow
+
+        return entry
+
+    def alerts(self, tracking_key: str, tracked: TrackedScenario, since: Optional[datetime] = None,
+               until: Optional[datetime] = None, severity: Optional[str] = None, limit: int = 100) -> List[Alert]:
+        """
+        Inline and archived alerts created within [since, until], newest first
+        """
+        since, until = _naive(since), _naive(until)
+        results = [
+            alert for alert in tracked.alerts
+            if (since is None or alert.created_at >= since) and (until is None or alert.created_at <= until)
+        ]
+        results.sort(key=lambda alert: alert.created_at, reverse=True)
+
+        if len(results) < limit:
+            # The archive only holds alerts older than anything inline
+            archived = self.archive.query(tracking_key, "alert", since, until, limit if severity is None else None)
+            results.extend(Alert.model_validate_json(data) for data in archived)
+
+        if severity is not None:
+            results = [alert for alert in results if alert.severity == severity]
+        return results[:limit]
+
+    def play_updates(self, tracking_key: str, tracked: TrackedScenario, since: Optional[datetime] = None,
+                     until: Optional[datetime] = None, limit: int = 100) -> List[str]:
+        """
+        Inline and archived play updates made within [since, until], newest first
+        """
+        since, until = _naive(since), _naive(until)
+        results = [
+            entry for entry in reversed(tracked.play_updates)
+            if (since is None or self._play_update_time(entry) >= since)
+            and (until is None or self._play_update_time(entry) <= until)
+        ]
+
+        if len(results) < limit:
+            archived = self.archive.query(tracking_key, "play_update", since, until, limit)
+            results.extend(json.loads(data) for data in archived)
+
+        return results[:limit]
+
+    def delete(self, tracking_key: str):
+        self.archive.delete(tracking_key)
+
+    def stats(self):
+        return {
+            "max_alerts": self.max_alerts,
+            "max_play_updates": self.max_play_updates,
+            "archived": self.archived,
+            "deduplicated": self.deduplicated,
+        }
+
+    @staticmethod
+    def _play_update_time(entry: str, default: Optional[datetime] = None) -> datetime:
+        # Play updates are stored as "[<iso timestamp>] <modifications>"
+        try:
+            return datetime.fromisoformat(entry[1:entry.index("]")])
+        except ValueError:
+            return default or datetime.min
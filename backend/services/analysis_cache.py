@@ -0,0 +1,109 @@
+import asyncio
+import copy
+import re
+import time
+from collections import OrderedDict
+from typing import Awaitable, Callable, Dict, Tuple
+
+# Spellings of the S&P 500 that users type interchangeably
+SP500_PATTERN = re.compile(r"\b(?:s\s*&\s*p|s\s+and\s+p|sp|spx)(?:\s*-?\s*500)?\b")
+
+
+def normalize_scenario(description: str) -> str:
+    """
+    Normalize scenario text so trivially different phrasings share a cache key
+
+    e.g. "S&P down 5%" and "s&p 500 down 5 %" both become "s&p down 5%"
+    """
+    text = description.lower()
+    text = SP500_PATTERN.sub("s&p", text)
+    text = re.sub(r"(\d)\s+%", r"\1%", text)
+    text = re.sub(r"(\d)\s*percent\b", r"\1%", text)
+    text = re.sub(r"\s+", " ", text)
+    return text.strip(" .!?")
+
+
+class AnalysisCache:
+    """
+    LRU + TTL cache of scenario analyses keyed by normalized description
+
+    Concurrent requests for the same scenario share one in-flight LLM call.
+    """
+
+    def __init__(self, max_size: int = 256, ttl_seconds: float = 3600.0):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, Dict]]" = OrderedDict()
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self.evictions = 0
+
+    def get(self, description: str):
+        """
+        Get a cached analysis without computing it, or None
+        """
+        key = normalize_scenario(description)
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+
+        stored_at, value = entry
+        if time.monotonic() - stored_at >= self.ttl_seconds:
+            del self._entries[key]
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return copy.deepcopy(value)
+
+    def put(self, description: str, value: Dict):
+        key = normalize_scenario(description)
+        self._entries[key] = (time.monotonic(), copy.deepcopy(value))
+        self._entries.move_to_end(key)
+
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    async def get_or_compute(self, description: str, compute: Callable[[], Awaitable[Dict]]) -> Dict:
+        """
+        Return the cached analysis, or compute it once for all concurrent callers
+        """
+        cached = self.get(description)
+        if cached is not None:
+            return cached
+
+        key = normalize_scenario(description)
+        task = self._inflight.get(key)
+        if task is None:
+            self.misses += 1
+            task = asyncio.ensure_future(compute())
+            self._inflight[key] = task
+
+            def on_done(done: asyncio.Future):
+                self._inflight.pop(key, None)
+                if not done.cancelled() and done.exception() is None:
+                    self.put(description, done.result())
+
+            task.add_done_callback(on_done)
+        else:
+            self.coalesced += 1
+
+        # Shield the shared call so one cancelled request doesn't cancel it for the rest
+        return copy.deepcopy(await asyncio.shield(task))
+
+    def stats(self) -> Dict:
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "ttl_seconds": self.ttl_seconds,
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "evictions": self.evictions,
+            "in_flight": len(self._inflight),
+            "hit_rate": round((self.hits + self.coalesced) / lookups, 4) if lookups else 0.0,
+        }
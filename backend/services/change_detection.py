@@ -0,0 +1,75 @@
+import hashlib
+import os
+import re
+from typing import Dict, List
+
+from models.schemas import TrackedScenario
+
+
+def article_fingerprint(article: Dict) -> str:
+    """
+    Short content hash of a news article (URL and normalized title)
+
+    A story republished under a new headline counts as a new article.
+    """
+    title = re.sub(r"\s+", " ", (article.get("title") or "").lower()).strip()
+    key = f"{(article.get('url') or '').strip()}|{title}"
+    return hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+
+
+class ChangeDetector:
+    """
+    Decides whether a refresh has news worth sending to the LLM
+
+    Each tracked play remembers fingerprints of the articles it has already
+    seen. A refresh only needs an LLM call when at least one unseen article is
+    relevant enough to matter; otherwise the play just gets a fresh
+    `last_updated`.
+    """
+
+    def __init__(self):
+        self.max_seen = int(os.getenv("TRACKING_SEEN_ARTICLES_SIZE", "200"))
+        self.min_relevance = float(os.getenv("TRACKING_MIN_NEW_ARTICLE_RELEVANCE", "0.1"))
+        self.checked = 0
+        self.skipped = 0
+        self.llm_calls_skipped = 0
+
+    def material_changes(self, tracked: TrackedScenario, articles: List[Dict]) -> List[Dict]:
+        """
+        Unseen articles above the relevance threshold
+        """
+        self.checked += 1
+        seen = set(tracked.seen_article_fingerprints)
+        return [
+            article for article in articles
+            if article_fingerprint(article) not in seen
+            and article.get("relevance_score", 0.0) >= self.min_relevance
+        ]
+
+    def mark_seen(self, tracked: TrackedScenario, articles: List[Dict]):
+        """
+        Remember articles once the LLM has seen them (or they were judged immaterial)
+        """
+        seen = tracked.seen_article_fingerprints
+        known = set(seen)
+        for fingerprint in map(article_fingerprint, articles):
+            if fingerprint not in known:
+                seen.append(fingerprint)
+                known.add(fingerprint)
+
+        # Oldest fingerprints go first; articles that old have left the feeds anyway
+        if len(seen) > self.max_seen:
+            del seen[:len(seen) - self.max_seen]
+
+    def record_skip(self, llm_calls: int):
+        self.skipped += 1
+        self.llm_calls_skipped += llm_calls
+
+    def stats(self) -> Dict:
+        return {
+            "checked": self.checked,
+            "skipped": self.skipped,
+            "llm_calls_skipped": self.llm_calls_skipped,
+            "skip_rate": round(self.skipped / self.checked, 4) if self.checked else 0.0,
+            "min_relevance": self.min_relevance,
+        }
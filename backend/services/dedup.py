@@ -0,0 +1,124 @@
+import zlib
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from services.relevance_index import tokenize
+
+# 32 MinHash values in 16 bands of 2: pairs with ~25% token overlap become
+# candidates, and candidates are then checked against the real threshold
+SIGNATURE_SIZE = 32
+BANDS = 16
+
+
+class UnionFind:
+    def __init__(self, size: int):
+        self.parent = list(range(size))
+
+    def find(self, item: int) -> int:
+        while self.parent[item] != item:
+            self.parent[item] = self.parent[self.parent[item]]
+            item = self.parent[item]
+        return item
+
+    def union(self, a: int, b: int):
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a != root_b:
+            # The lower index (the better-ranked article) stays the root
+            self.parent[max(root_a, root_b)] = min(root_a, root_b)
+
+
+class NearDuplicateDetector:
+    """
+    Clusters near-identical news articles (the same wire story under
+    slightly different headlines) with MinHash and LSH banding
+
+    Each article's title and summary tokens are reduced to a MinHash
+    signature, which estimates the Jaccard overlap of two token sets by the
+    share of equal positions. Articles that agree on a whole band land in
+    the same bucket; only those pairs are compared, so clustering stays
+    roughly linear in the number of articles. Signatures are memoized by
+    URL, since the same feed entries come back on every refresh.
+    """
+
+    def __init__(self, similarity: float = 0.5, cache_size: int = 4096, seed: int = 20240601):
+        self.similarity = similarity
+        self.cache_size = cache_size
+        rng = np.random.default_rng(seed)
+        # Multiply-shift hashing: odd 64-bit multipliers, overflow wraps mod 2**64
+        self._multipliers = rng.integers(1, 2**63, SIGNATURE_SIZE, dtype=np.uint64) | np.uint64(1)
+        self._offsets = rng.integers(0, 2**63, SIGNATURE_SIZE, dtype=np.uint64)
+        self._signatures: "OrderedDict[str, Optional[np.ndarray]]" = OrderedDict()
+
+    def signature(self, tokens: List[str]) -> Optional[np.ndarray]:
+        if not tokens:
+            return None
+        hashes = np.fromiter((zlib.crc32(token.encode()) for token in set(tokens)), dtype=np.uint64)
+        with np.errstate(over="ignore"):
+            return ((hashes[:, None] * self._multipliers + self._offsets) >> np.uint64(32)).min(axis=0)
+
+    def article_signature(self, article: Dict) -> Optional[np.ndarray]:
+        key = article.get("url") or article.get("title", "")
+        if key in self._signatures:
+            self._signatures.move_to_end(key)
+            return self._signatures[key]
+
+        signature = self.signature(tokenize(f"{article.get('title', '')} {article.get('summary', '')}"))
+        self._signatures[key] = signature
+        if len(self._signatures) > self.cache_size:
+            self._signatures.popitem(last=False)
+        return signature
+
+    def clusters(self, signatures: List[Optional[np.ndarray]]) -> List[List[int]]:
+        """
+        Group indexes of near-duplicate signatures; each cluster is in index order
+
+        An article joins a story when it's similar to the story's first
+        article in some bucket, which avoids chaining loosely related ones.
+        """
+        union_find = UnionFind(len(signatures))
+        rows = SIGNATURE_SIZE // BANDS
+        buckets: Dict[tuple, List[int]] = {}
+
+        for index, signature in enumerate(signatures):
+            if signature is None:
+                continue
+            for band in range(BANDS):
+                key = (band, signature[band * rows:(band + 1) * rows].tobytes())
+                bucket = buckets.setdefault(key, [])
+                # Buckets only hold the first article of each story, so a story
+                # repeated many times doesn't make every newcomer compare against all copies
+                matched = False
+                for other in bucket:
+                    if union_find.find(other) == union_find.find(index):
+                        matched = True
+                    elif self._similar(signatures[other], signature):
+                        union_find.union(other, index)
+                        matched = True
+                if not matched:
+                    bucket.append(index)
+
+        clusters: Dict[int, List[int]] = {}
+        for index in range(len(signatures)):
+            clusters.setdefault(union_find.find(index), []).append(index)
+        return list(clusters.values())
+
+    def _similar(self, a: np.ndarray, b: np.ndarray) -> bool:
+        return float(np.count_nonzero(a == b)) / SIGNATURE_SIZE >= self.similarity
+
+    def dedupe(self, articles: List[Dict]) -> List[Dict]:
+        """
+        Keep the first (best-ranked) article of each cluster, with the number
+        of distinct sources that carried the story as `source_count`
+        """
+        signatures = [self.article_signature(article) for article in articles]
+
+        representatives = []
+        for cluster in self.clusters(signatures):
+            representative = dict(articles[cluster[0]])
+            representative["source_count"] = len({articles[index].get("source") for index in cluster})
+            representatives.append((cluster[0], representative))
+
+        representatives.sort(key=lambda item: item[0])
+        return [article for _, article in representatives]
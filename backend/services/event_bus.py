@@ -0,0 +1,56 @@
+import asyncio
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+class TrackingEventBus:
+    """
+    Fan-out of tracking updates to server-push subscribers
+
+    Subscribers either follow one tracked play (by tracking key) or all of
+    them. Each subscriber has a bounded queue; if a client falls behind, its
+    oldest undelivered events are dropped rather than buffering without limit.
+
+    With several workers, `relay` forwards published events to the other
+    processes, which hand them to `deliver()`.
+    """
+
+    def __init__(self, queue_size: int = 100):
+        self.queue_size = queue_size
+        self._subscribers: List[Tuple[Optional[str], asyncio.Queue]] = []
+        self.relay: Optional[Callable[[str, Dict], None]] = None
+        self.published = 0
+        self.dropped = 0
+
+    def subscribe(self, tracking_key: Optional[str] = None) -> asyncio.Queue:
+        queue: asyncio.Queue = asyncio.Queue(maxsize=self.queue_size)
+        self._subscribers.append((tracking_key, queue))
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue):
+        self._subscribers = [(key, q) for key, q in self._subscribers if q is not queue]
+
+    def publish(self, tracking_key: str, event: Dict):
+        self.published += 1
+        self.deliver(tracking_key, event)
+        if self.relay is not None:
+            self.relay(tracking_key, event)
+
+    def deliver(self, tracking_key: str, event: Dict):
+        """
+        Hand an event to this process's subscribers
+        """
+        for key, queue in self._subscribers:
+            if key is not None and key != tracking_key:
+                continue
+
+            if queue.full():
+                queue.get_nowait()
+                self.dropped += 1
+            queue.put_nowait(event)
+
+    def stats(self) -> Dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
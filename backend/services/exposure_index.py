@@ -0,0 +1,191 @@
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+from models.schemas import Play, Scenario, TrackedScenario
+from services.relevance_index import tokenize
+
+PlayKey = Tuple[str, str]  # (scenario_id, play_id)
+
+LONG_ACTIONS = ("buy", "long", "overweight")
+SHORT_ACTIONS = ("sell", "short", "underweight")
+
+
+def normalize_instrument(instrument: str) -> str:
+    return instrument.strip().upper()
+
+
+def direction(action: str) -> int:
+    """
+    +1 for long actions, -1 for short ones, 0 when the action doesn't say
+    """
+    action = action.lower()
+    if any(word in action for word in SHORT_ACTIONS):
+        return -1
+    if any(word in action for word in LONG_ACTIONS):
+        return 1
+    return 0
+
+
+class ExposureIndex:
+    """
+    Reverse index from instrument to the plays that reference it
+
+    Every play of every scenario is indexed, and tracked plays separately,
+    so finding the plays a headline affects is a lookup per instrument
+    instead of a scan over every tracked scenario. The storage tables feed
+    it through their change listeners (create, track, stop, and records
+    reloaded from other workers).
+
+    Instruments are matched in articles by their tokens: a ticker ("TLT")
+    or every word of a name ("S&P 500") has to appear in the article.
+    Stopwords are kept on both sides, since tickers like ALL, ON or IT are
+    stopwords too.
+    """
+
+    def __init__(self):
+        self._plays: Dict[str, Set[PlayKey]] = {}
+        self._scenario_plays: Dict[str, Dict[str, List[str]]] = {}
+        self._tracked: Dict[str, Set[str]] = {}
+        self._tracked_plays: Dict[str, Tuple[str, Play]] = {}
+
+        # Tokens of tracked instruments, and those instruments by their first token, for matching articles
+        self._terms: Dict[str, Tuple[str, ...]] = {}
+        self._by_first_term: Dict[str, Set[str]] = {}
+
+    def scenario_changed(self, scenario_id: str, scenario: Optional[Scenario]):
+        for play_id, instruments in self._scenario_plays.pop(scenario_id, {}).items():
+            for instrument in instruments:
+                self._discard(self._plays, instrument, (scenario_id, play_id))
+
+        if scenario is None:
+            return
+        plays = {}
+        for play in scenario.plays:
+            plays[play.id] = self._instruments(play)
+            for instrument in plays[play.id]:
+                self._plays.setdefault(instrument, set()).add((scenario_id, play.id))
+        self._scenario_plays[scenario_id] = plays
+
+    def tracked_changed(self, tracking_key: str, tracked: Optional[TrackedScenario]):
+        previous = self._tracked_plays.pop(tracking_key, None)
+        untracked = set()
+        if previous is not None:
+            untracked = self._instruments(previous[1])
+            for instrument in untracked:
+                self._discard(self._tracked, instrument, tracking_key)
+
+        if tracked is not None:
+            self._tracked_plays[tracking_key] = (tracked.scenario.id, tracked.play)
+            for instrument in self._instruments(tracked.play):
+                self._tracked.setdefault(instrument, set()).add(tracking_key)
+                self._add_terms(instrument)
+
+        # Instruments no tracked play references anymore aren't matched in articles
+        for instrument in untracked:
+            if instrument not in self._tracked:
+                self._remove_terms(instrument)
+
+    def tracked_keys(self, instrument: str) -> Set[str]:
+        return set(self._tracked.get(normalize_instrument(instrument), ()))
+
+    def touched(self, articles: Iterable[Dict]) -> Dict[str, Set[str]]:
+        """
+        Tracking keys of the plays each article touches, by instrument
+
+        Only the article's own tokens are walked, so the cost doesn't grow
+        with the number of plays. The feed cache's `tokens` drop stopwords,
+        so articles are tokenized again here.
+        """
+        touched: Dict[str, Set[str]] = {}
+        for article in articles:
+            tokens = set(tokenize(f"{article.get('title', '')} {article.get('summary', '')}", keep_stopwords=True))
+            for token in tokens:
+                for instrument in self._by_first_term.get(token, ()):
+                    if instrument in self._tracked and all(term in tokens for term in self._terms[instrument]):
+                        touched.setdefault(instrument, set()).update(self._tracked[instrument])
+        return touched
+
+    def exposure(self) -> List[Dict]:
+        """
+        Tracked plays per instrument, aggregated, most-tracked first
+        """
+        result = [self._aggregate(instrument, keys) for instrument, keys in self._tracked.items()]
+        result.sort(key=lambda item: (-item["tracked_plays"], item["instrument"]))
+        return result
+
+    def instrument_exposure(self, instrument: str) -> Optional[Dict]:
+        """
+        One instrument's aggregate with its tracked plays listed, or None if no play references it
+        """
+        instrument = normalize_instrument(instrument)
+        keys = self._tracked.get(instrument, set())
+        if not keys and instrument not in self._plays:
+            return None
+
+        result = self._aggregate(instrument, keys)
+        result["tracked"] = [
+            {
+                "scenario_id": scenario_id,
+                "play_id": play.id,
+                "title": play.title,
+                "action": play.action,
+                "asset_class": play.asset_class.value,
+                "confidence_score": play.confidence_score,
+            }
+            for scenario_id, play in sorted(
+                (self._tracked_plays[key] for key in keys), key=lambda item: -item[1].confidence_score
+            )
+        ]
+        return result
+
+    def stats(self) -> Dict:
+        return {
+            "instruments": len(self._plays),
+            "tracked_instruments": len(self._tracked),
+            "plays": sum(len(plays) for plays in self._scenario_plays.values()),
+            "tracked_plays": len(self._tracked_plays),
+        }
+
+    def _aggregate(self, instrument: str, keys: Set[str]) -> Dict:
+        plays = [self._tracked_plays[key][1] for key in keys]
+        directions = [direction(play.action) for play in plays]
+        by_asset_class: Dict[str, int] = {}
+        for play in plays:
+            by_asset_class[play.asset_class.value] = by_asset_class.get(play.asset_class.value, 0) + 1
+
+        return {
+            "instrument": instrument,
+            "tracked_plays": len(plays),
+            "plays": len(self._plays.get(instrument, ())),
+            "long": directions.count(1),
+            "short": directions.count(-1),
+            # Confidence-weighted direction: +1 is every play long at full confidence
+            "net_exposure": round(
+                sum(d * play.confidence_score for d, play in zip(directions, plays)) / len(plays), 4
+            ) if plays else 0.0,
+            "average_confidence": round(sum(play.confidence_score for play in plays) / len(plays), 4) if plays else None,
+            "asset_classes": by_asset_class,
+        }
+
+    @staticmethod
+    def _instruments(play: Play) -> Set[str]:
+        return {normalize_instrument(instrument) for instrument in play.instruments}
+
+    def _add_terms(self, instrument: str):
+        if instrument not in self._terms:
+            terms = tuple(tokenize(instrument, keep_stopwords=True))
+            self._terms[instrument] = terms
+            if terms:
+                self._by_first_term.setdefault(terms[0], set()).add(instrument)
+
+    def _remove_terms(self, instrument: str):
+        terms = self._terms.pop(instrument, ())
+        if terms:
+            self._discard(self._by_first_term, terms[0], instrument)
+
+    @staticmethod
+    def _discard(index: Dict[str, Set], instrument: str, value):
+        members = index.get(instrument)
+        if members is not None:
+            members.discard(value)
+            if not members:
+                del index[instrument]
@@ -0,0 +1,78 @@
+import asyncio
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+# loader(feed_url, etag, modified) -> parsed feed, or None when the feed is unchanged
+FeedLoader = Callable[[str, Optional[str], Optional[str]], Awaitable[Optional[Dict]]]
+
+
+class FeedCache:
+    """
+    Process-wide cache of parsed RSS feeds keyed by feed URL
+
+    Entries are served from memory until they are older than the TTL, then
+    revalidated with a conditional GET (ETag / Last-Modified). Concurrent
+    callers asking for the same feed share one in-progress fetch.
+    """
+
+    def __init__(self, ttl_seconds: float = 300.0):
+        self.ttl_seconds = ttl_seconds
+        self._entries: Dict[str, Dict] = {}
+        self._inflight: Dict[str, asyncio.Future] = {}
+        self.stats = {"hits": 0, "coalesced": 0, "fetches": 0, "not_modified": 0, "errors": 0}
+
+    async def get(self, feed_url: str, loader: FeedLoader) -> Dict:
+        """
+        Get the parsed feed, fetching it only if the cached copy is stale
+        """
+        entry = self._entries.get(feed_url)
+        if entry and time.monotonic() - entry["fetched_at"] < self.ttl_seconds:
+            self.stats["hits"] += 1
+            return entry
+
+        task = self._inflight.get(feed_url)
+        if task is None:
+            task = asyncio.ensure_future(self._refresh(feed_url, loader))
+            self._inflight[feed_url] = task
+            task.add_done_callback(lambda _: self._inflight.pop(feed_url, None))
+        else:
+            self.stats["coalesced"] += 1
+
+        # Shield the shared fetch so one cancelled caller doesn't cancel it for the rest
+        return await asyncio.shield(task)
+
+    async def _refresh(self, feed_url: str, loader: FeedLoader) -> Dict:
+        entry = self._entries.get(feed_url)
+        etag = entry.get("etag") if entry else None
+        modified = entry.get("modified") if entry else None
+
+        try:
+            self.stats["fetches"] += 1
+            parsed = await loader(feed_url, etag, modified)
+        except Exception:
+            self.stats["errors"] += 1
+            if entry:
+                # Serve the stale copy rather than failing every caller
+                return entry
+            raise
+
+        if parsed is None:
+            self.stats["not_modified"] += 1
+            if entry:
+                entry["fetched_at"] = time.monotonic()
+                return entry
+            parsed = {}
+
+        entry = {
+            "title": parsed.get("title", "RSS Feed"),
+            "entries": parsed.get("entries", []),
+            "etag": parsed.get("etag"),
+            "modified": parsed.get("modified"),
+            "fetched_at": time.monotonic(),
+        }
+        self._entries[feed_url] = entry
+
+        return entry
+
+    def clear(self):
+        self._entries.clear()
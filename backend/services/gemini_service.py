@@ -1,184 +1,432 @@
 import os
-import json
-from typing import Dict, List
-import google.generativeai as genai
+import asyncio
+import inspect
+import logging
+import time
+from typing import AsyncIterator, Dict, List, Optional, Tuple, Union
 from dotenv import load_dotenv
+from pydantic import ValidationError
+
+from services.analysis_cache import AnalysisCache, normalize_scenario
+from services.json_stream import IncrementalJSONParser
+from services.llm_scheduler import LLMOverloadedError, LLMScheduler
+from services.metrics import timed
+from services.prompt_builder import PromptBuilder, estimate_tokens
+from services.structured_output import (
+    ALERTS_OUTPUT,
+    PLAY_OUTPUT,
+    PLAY_UPDATE_OUTPUT,
+    REFRESH_OUTPUT,
+    SCENARIO_BATCH_OUTPUT,
+    SCENARIO_OUTPUT,
+    JSONExtractionError,
+    OutputSpec,
+    extract_json,
+)
 
 load_dotenv()
 
+logger = logging.getLogger(__name__)
+
+
+class StructuredOutputError(ValueError):
+    pass
+
+
+def _supports_response_schema() -> bool:
+    """
+    Whether the installed SDK can constrain generation to a JSON schema
+    """
+    import google.generativeai as genai
+    
+    parameters = inspect.signature(genai.types.GenerationConfig).parameters
+    return "response_mime_type" in parameters and "response_schema" in parameters
+
+
+def _is_quota_error(error: Exception) -> bool:
+    from google.api_core import exceptions as google_exceptions
+    
+    return isinstance(error, google_exceptions.ResourceExhausted)
+
 
 class GeminiService:
     def __init__(self):
-        api_key = os.getenv("GEMINI_API_KEY")
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
+        # The SDK is slow to import and the key is only needed for LLM calls,
+        # so the client is created on first use (or by warm_up) instead
+        self.api_key = os.getenv("GEMINI_API_KEY")
+        self._model = None
+        self._json_mode: Optional[bool] = None
+        
+        # Every call is admitted by priority within the concurrency limit and
+        # rate limit; each call is also bounded in time
+        self.scheduler = LLMScheduler()
+        self.timeout_seconds = float(os.getenv("GEMINI_TIMEOUT_SECONDS", "60"))
+        
+        # Refresh plays with one combined prompt instead of two separate calls
+        self.fused_refresh = os.getenv("GEMINI_FUSED_REFRESH", "true").lower() != "false"
+        
+        # Pack several scenarios into one prompt for batch analysis
+        self.batch_size = int(os.getenv("GEMINI_BATCH_SIZE", "4"))
+        self.batch_concurrency = int(os.getenv("GEMINI_BATCH_CONCURRENCY", "4"))
+        
+        # Templates and news packing within a token budget
+        self.prompts = PromptBuilder()
+        self.token_usage: Dict[str, Dict[str, int]] = {}
+        
+        # Constrain responses to each kind's JSON schema where the SDK supports it,
+        # and re-prompt with the parse error when a response still doesn't fit
+        self.max_repair_attempts = int(os.getenv("GEMINI_MAX_REPAIR_ATTEMPTS", "2"))
+        self.repair_backoff_seconds = float(os.getenv("GEMINI_REPAIR_BACKOFF_SECONDS", "0.5"))
+        self.repairs: Dict[str, Dict[str, int]] = {}
+        
+        # Reuse analyses of the same (normalized) scenario text
+        self.analysis_cache = AnalysisCache(
+            max_size=int(os.getenv("ANALYSIS_CACHE_SIZE", "256")),
+            ttl_seconds=float(os.getenv("ANALYSIS_CACHE_TTL_SECONDS", "3600"))
+        )
+    
+    @property
+    def model(self):
+        """
+        The Gemini model client, created on first use
+        """
+        if self._model is None:
+            if not self.api_key:
+                raise ValueError("GEMINI_API_KEY not found in environment variables")
+            import google.generativeai as genai
+            
+            genai.configure(api_key=self.api_key)
+            self._model = genai.GenerativeModel('gemini-pro')
+        return self._model
+    
+    @model.setter
+    def model(self, model):
+        self._model = model
+    
+    @property
+    def loaded(self) -> bool:
+        return self._model is not None
+    
+    @property
+    def json_mode(self) -> bool:
+        if self._json_mode is None:
+            self._json_mode = _supports_response_schema()
+        return self._json_mode
+    
+    async def warm_up(self):
+        """
+        Import the SDK and create the client off the event loop, so the first
+        request doesn't pay for it; a missing API key is left for requests to report
+        """
+        if self.api_key:
+            await self._load_client()
+    
+    async def _load_client(self):
+        """
+        The model client, created in a worker thread if it isn't yet (importing the SDK takes ~0.5 s)
+        """
+        if self._model is None or self._json_mode is None:
+            await asyncio.to_thread(lambda: (self.model, self.json_mode))
+        return self._model
+    
+    def _generation_config(self, spec: Optional[OutputSpec]) -> Dict:
+        if spec is None or not self.json_mode:
+            return {}
+        return {
+            "generation_config": {
+                "response_mime_type": "application/json",
+                "response_schema": spec.response_schema,
+            }
+        }
+    
+    async def _generate(self, prompt: str, kind: str, spec: Optional[OutputSpec] = None) -> str:
+        """
+        Run a single Gemini call without blocking the event loop
+        """
+        model = await self._load_client()
+        started = time.perf_counter()
+        with timed("gemini_wait"):
+            admitted = await self.scheduler.acquire()
+        try:
+            with timed("gemini_call"):
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, **self._generation_config(spec)),
+                    timeout=self.timeout_seconds
+                )
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Gemini call timed out after {self.timeout_seconds:g}s")
+        except Exception as e:
+            if _is_quota_error(e):
+                raise self._quota_exhausted()
+            raise
+        finally:
+            self.scheduler.release(admitted)
+        
+        text = response.text.strip()
+        self._record_usage(kind, prompt, text, started)
+        return text
+    
+    async def _generate_stream(self, prompt: str, kind: str, spec: Optional[OutputSpec] = None) -> AsyncIterator[str]:
+        """
+        Run a streamed Gemini call, yielding text chunks as they arrive
+        """
+        model = await self._load_client()
+        started = time.perf_counter()
+        received = []
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.timeout_seconds
         
-        genai.configure(api_key=api_key)
-        self.model = genai.GenerativeModel('gemini-pro')
+        with timed("gemini_wait"):
+            admitted = await self.scheduler.acquire()
+        try:
+            # Only the wait for the stream to open; chunk time overlaps with the consumer
+            with timed("gemini_call"):
+                response = await asyncio.wait_for(
+                    model.generate_content_async(prompt, stream=True, **self._generation_config(spec)),
+                    timeout=self.timeout_seconds
+                )
+            chunks = response.__aiter__()
+            while True:
+                try:
+                    chunk = await asyncio.wait_for(chunks.__anext__(), timeout=deadline - loop.time())
+                except StopAsyncIteration:
+                    break
+                received.append(chunk.text)
+                yield chunk.text
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"Gemini call timed out after {self.timeout_seconds:g}s")
+        except Exception as e:
+            if _is_quota_error(e):
+                raise self._quota_exhausted()
+            raise
+        finally:
+            self.scheduler.release(admitted)
+        
+        self._record_usage(kind, prompt, "".join(received), started)
+    
+    def _quota_exhausted(self) -> LLMOverloadedError:
+        """
+        Gemini rejected a call for quota: back off every caller, not just this one
+        """
+        self.scheduler.rate_limited()
+        return LLMOverloadedError(
+            "Gemini quota exhausted, try again later", 429, self.scheduler.rate_limit_backoff_seconds
+        )
+    
+    async def _generate_json(self, prompt: str, spec: OutputSpec):
+        """
+        Run a call whose response must be JSON of `spec`'s shape
+
+        A response that doesn't parse or validate is sent back with the error
+        for a fix, up to GEMINI_MAX_REPAIR_ATTEMPTS times with exponential
+        backoff, instead of failing the whole request.
+        """
+        text = await self._generate(prompt, spec.name, spec)
+        
+        for attempt in range(self.max_repair_attempts + 1):
+            try:
+                with timed("json_extract"):
+                    result = spec.validate(extract_json(text, spec.json_type))
+                if attempt:
+                    self._record_repair(spec.name, "repaired")
+                return result
+            except JSONExtractionError as e:
+                error = str(e)
+            except ValidationError as e:
+                error = "; ".join(
+                    f"{'.'.join(str(part) for part in detail['loc']) or 'response'}: {detail['msg']}"
+                    for detail in e.errors()[:5]
+                )
+            
+            if attempt == self.max_repair_attempts:
+                break
+            logger.warning("gemini %s response unusable (%s), asking for a repair", spec.name, error)
+            self._record_repair(spec.name, "attempts")
+            await asyncio.sleep(self.repair_backoff_seconds * 2 ** attempt)
+            text = await self._generate(self.prompts.repair(text, error, spec.schema_text), f"{spec.name}_repair", spec)
+        
+        self._record_repair(spec.name, "failed")
+        raise StructuredOutputError(f"Gemini returned unusable {spec.name} JSON: {error}")
+    
+    def _record_repair(self, kind: str, outcome: str):
+        counts = self.repairs.setdefault(kind, {"attempts": 0, "repaired": 0, "failed": 0})
+        counts[outcome] += 1
+    
+    def _record_usage(self, kind: str, prompt: str, response: str, started: float):
+        """
+        Log estimated prompt/response tokens of a call and add them to the per-kind totals
+        """
+        prompt_tokens = estimate_tokens(prompt)
+        response_tokens = estimate_tokens(response)
+        
+        usage = self.token_usage.setdefault(kind, {"calls": 0, "prompt_tokens": 0, "response_tokens": 0})
+        usage["calls"] += 1
+        usage["prompt_tokens"] += prompt_tokens
+        usage["response_tokens"] += response_tokens
+        
+        logger.info(
+            "gemini %s call: ~%d prompt tokens, ~%d response tokens, %.2fs",
+            kind, prompt_tokens, response_tokens, time.perf_counter() - started
+        )
     
     async def analyze_scenario(self, scenario_description: str) -> Dict:
         """
         Analyze a market scenario and generate investment plays
         """
-        prompt = f"""You are a hedge fund analyst. Analyze the following market scenario and provide detailed investment recommendations.
-
-Scenario: {scenario_description}
-
-Please provide:
-1. A clear interpretation of what this scenario means for the markets
-2. THREE specific investment plays - one each for:
-   - Equities
-   - Commodities  
-   - Fixed Income
-
-For each play, provide:
-- A clear title
-- Detailed description
-- Specific action (Buy/Sell/Short/Long)
-- Specific instruments (ticker symbols, ETFs, or asset names)
-- Detailed rationale explaining why this play makes sense
-- Risk level (Low/Medium/High)
-- Time horizon (Short-term: <3 months, Medium-term: 3-12 months, Long-term: >12 months)
-- Confidence score (0.0 to 1.0)
-
-Return your response as a JSON object with this exact structure:
-{{
-  "interpreted_scenario": "clear interpretation of the scenario",
-  "plays": [
-    {{
-      "asset_class": "equity",
-      "title": "play title",
-      "description": "detailed description",
-      "action": "Buy/Sell/Short/Long",
-      "instruments": ["TICKER1", "TICKER2"],
-      "rationale": "why this play makes sense",
-      "risk_level": "Low/Medium/High",
-      "time_horizon": "Short-term/Medium-term/Long-term",
-      "confidence_score": 0.75
-    }},
-    {{
-      "asset_class": "commodity",
-      ...
-    }},
-    {{
-      "asset_class": "fixed_income",
-      ...
-    }}
-  ]
-}}
-"""
-        
-        response = self.model.generate_content(prompt)
-        text = response.text.strip()
+        return await self.analysis_cache.get_or_compute(
+            scenario_description,
+            lambda: self._analyze_scenario(scenario_description)
+        )
+    
+    async def _analyze_scenario(self, scenario_description: str) -> Dict:
+        return await self._generate_json(self.prompts.scenario(scenario_description), SCENARIO_OUTPUT)
+    
+    async def analyze_scenario_stream(self, scenario_description: str) -> AsyncIterator[Tuple[str, Dict]]:
+        """
+        Analyze a market scenario, yielding ("interpreted_scenario", {...}) and then
+        ("play", {...}) for each play as soon as its JSON object is complete
+        """
+        cached = self.analysis_cache.get(scenario_description)
+        if cached is not None:
+            yield "interpreted_scenario", {"interpreted_scenario": cached["interpreted_scenario"]}
+            for play in cached["plays"]:
+                yield "play", play
+            return
         
-        # Extract JSON from markdown code blocks if present
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
+        analysis: Dict = {"plays": []}
+        parser = IncrementalJSONParser()
         
-        try:
-            result = json.loads(text)
-            return result
-        except json.JSONDecodeError as e:
-            # Fallback: try to parse without code blocks
-            return json.loads(text)
+        async for chunk in self._generate_stream(
+            self.prompts.scenario(scenario_description), "scenario_stream", SCENARIO_OUTPUT
+        ):
+            for kind, key, value in parser.feed(chunk):
+                if kind == "field" and key == "interpreted_scenario":
+                    analysis["interpreted_scenario"] = value
+                    yield "interpreted_scenario", {"interpreted_scenario": value}
+                elif kind == "item" and key == "plays":
+                    try:
+                        play = PLAY_OUTPUT.validate(value)
+                    except ValidationError:
+                        # Skip a malformed play rather than failing the plays already sent
+                        logger.warning("gemini scenario_stream returned an invalid play, skipping it")
+                        continue
+                    analysis["plays"].append(play)
+                    yield "play", play
+        
+        if "interpreted_scenario" not in analysis or not analysis["plays"]:
+            raise ValueError("Gemini returned an incomplete scenario analysis")
+        
+        self.analysis_cache.put(scenario_description, analysis)
     
-    async def update_play_with_news(self, play: Dict, news_articles: List[Dict]) -> Dict:
+    async def analyze_scenarios(self, scenario_descriptions: List[str]) -> AsyncIterator[Tuple[int, Union[Dict, Exception]]]:
         """
-        Update a play based on latest news and market information
+        Analyze many scenarios, yielding (index, analysis or error) as each one finishes
         """
-        news_summary = "\n".join([
-            f"- {article['title']}: {article['summary']}"
-            for article in news_articles[:5]  # Use top 5 most relevant
-        ])
+        pending: Dict[str, List[int]] = {}
+        for index, description in enumerate(scenario_descriptions):
+            cached = self.analysis_cache.get(description)
+            if cached is not None:
+                yield index, cached
+            else:
+                # Identical scenarios in the same batch are only analyzed once
+                pending.setdefault(normalize_scenario(description), []).append(index)
         
-        prompt = f"""You are a hedge fund analyst monitoring an active investment play. Based on recent news, provide updates or modifications to the play if needed.
-
-Current Play:
-- Asset Class: {play['asset_class']}
-- Title: {play['title']}
-- Action: {play['action']}
-- Instruments: {', '.join(play['instruments'])}
-- Rationale: {play['rationale']}
-- Risk Level: {play['risk_level']}
-
-Recent News:
-{news_summary}
-
-Please provide:
-1. Whether the play should be modified (yes/no)
-2. If yes, what specific changes should be made
-3. Updated confidence score (0.0 to 1.0)
-4. Any new alerts or warnings
-
-Return your response as JSON:
-{{
-  "should_modify": true/false,
-  "modifications": "description of changes, or empty string if no changes",
-  "updated_confidence_score": 0.75,
-  "alerts": ["alert message 1", "alert message 2"]
-}}
-"""
-        
-        response = self.model.generate_content(prompt)
-        text = response.text.strip()
+        groups = list(pending.values())
+        chunks = [groups[i:i + self.batch_size] for i in range(0, len(groups), self.batch_size)]
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+        
+        async def run_chunk(chunk: List[List[int]]) -> List[Tuple[List[int], Union[Dict, Exception]]]:
+            descriptions = [scenario_descriptions[indexes[0]] for indexes in chunk]
+            async with semaphore:
+                try:
+                    analyses = await self._analyze_scenario_batch(descriptions)
+                except Exception as e:
+                    analyses = [e] * len(chunk)
+            return list(zip(chunk, analyses))
+        
+        for next_chunk in asyncio.as_completed([run_chunk(chunk) for chunk in chunks]):
+            for indexes, analysis in await next_chunk:
+                for index in indexes:
+                    yield index, analysis
+    
+    async def _analyze_scenario_batch(self, scenario_descriptions: List[str]) -> List[Union[Dict, Exception]]:
+        """
+        Analyze several scenarios with a single prompt
+        """
+        if len(scenario_descriptions) == 1:
+            return [await self.analyze_scenario(scenario_descriptions[0])]
+        
+        result = await self._generate_json(self.prompts.scenario_batch(scenario_descriptions), SCENARIO_BATCH_OUTPUT)
+        
+        analyses: Dict[int, Dict] = {}
+        for item in result:
+            if isinstance(item.get("scenario_index"), int):
+                analyses[item.pop("scenario_index")] = item
         
-        # Extract JSON from markdown code blocks if present
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
+        results = []
+        for index, description in enumerate(scenario_descriptions):
+            analysis = self._valid_analysis(analyses.get(index))
+            if analysis is not None:
+                self.analysis_cache.put(description, analysis)
+                results.append(analysis)
+            else:
+                # The model skipped this one; fall back to a dedicated call
+                results.append(self.analyze_scenario(description))
         
+        fallbacks = [result for result in results if asyncio.iscoroutine(result)]
+        if fallbacks:
+            fallback_results = iter(await asyncio.gather(*fallbacks, return_exceptions=True))
+            results = [next(fallback_results) if asyncio.iscoroutine(result) else result for result in results]
+        
+        return results
+    
+    @staticmethod
+    def _valid_analysis(analysis: Optional[Dict]) -> Optional[Dict]:
+        """
+        One batch item as a complete scenario analysis, or None if it isn't one
+        """
+        if analysis is None:
+            return None
         try:
-            result = json.loads(text)
-            return result
-        except json.JSONDecodeError:
-            return json.loads(text)
+            return SCENARIO_OUTPUT.validate(analysis)
+        except ValidationError:
+            return None
+    
+    async def update_play_with_news(self, play: Dict, news_articles: List[Dict]) -> Dict:
+        """
+        Update a play based on latest news and market information
+        """
+        
+        return await self._generate_json(self.prompts.play_update(play, news_articles), PLAY_UPDATE_OUTPUT)
     
     async def generate_alerts(self, scenario: str, play: Dict, news_articles: List[Dict]) -> List[Dict]:
         """
         Generate alerts based on scenario, play, and news
         """
-        news_summary = "\n".join([
-            f"- {article['title']}"
-            for article in news_articles[:3]
-        ])
         
-        prompt = f"""You are monitoring an investment scenario. Analyze if any alerts should be triggered.
-
-Scenario: {scenario}
-Play: {play['title']} - {play['action']} {', '.join(play['instruments'])}
-
-Recent News:
-{news_summary}
-
-Generate alerts if there are:
-- Significant market movements affecting the play
-- News that contradicts the play thesis
-- Risk level changes
-
-Return as JSON array:
-[
-  {{
-    "message": "alert message",
-    "severity": "info/warning/critical"
-  }}
-]
-
-If no alerts needed, return empty array: []
-"""
+        try:
+            return await self._generate_json(self.prompts.alerts(scenario, play, news_articles), ALERTS_OUTPUT)
+        except StructuredOutputError:
+            return []
+    
+    async def refresh_play(self, scenario: str, play: Dict, news_articles: List[Dict]) -> Dict:
+        """
+        Get play modifications, updated confidence and alerts for the latest news
+        """
+        if self.fused_refresh:
+            return await self._refresh_play_fused(scenario, play, news_articles)
         
-        response = self.model.generate_content(prompt)
-        text = response.text.strip()
+        # Separate prompts, but run them side by side
+        play_update, alerts = await asyncio.gather(
+            self.update_play_with_news(play, news_articles),
+            self.generate_alerts(scenario, play, news_articles)
+        )
         
-        if "```json" in text:
-            text = text.split("```json")[1].split("```")[0].strip()
-        elif "```" in text:
-            text = text.split("```")[1].split("```")[0].strip()
+        return {**play_update, "alerts": alerts}
+    
+    async def _refresh_play_fused(self, scenario: str, play: Dict, news_articles: List[Dict]) -> Dict:
+        """
+        Update a play and generate alerts from the same news in a single call
+        """
         
-        try:
-            result = json.loads(text)
-            return result if isinstance(result, list) else []
-        except json.JSONDecodeError:
-            return []
+        return await self._generate_json(self.prompts.refresh(scenario, play, news_articles), REFRESH_OUTPUT)
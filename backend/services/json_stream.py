@@ -0,0 +1,118 @@
+import json
+from typing import Any, List, Optional, Tuple
+
+
+class IncrementalJSONParser:
+    """
+    Pull values out of a streamed JSON object as soon as each one is complete
+
+    Feed text chunks in as they arrive. Each call returns events for the
+    values that closed in that chunk:
+
+    - ("field", key, value): a top-level field of the object finished
+    - ("item", key, value): an object inside a top-level array field finished
+
+    Anything before the first "{" (e.g. a markdown fence) is ignored.
+    """
+
+    def __init__(self):
+        self._text = ""
+        self._pos = 0
+        self._started = False
+        self._done = False
+        self._stack: List[str] = []
+        self._in_string = False
+        self._escape = False
+        self._string_start = 0
+        self._expect_key = True
+        self._key: Optional[str] = None
+        self._value_start: Optional[int] = None
+        self._item_start: Optional[int] = None
+
+    @property
+    def done(self) -> bool:
+        return self._done
+
+    def feed(self, chunk: str) -> List[Tuple[str, str, Any]]:
+        events: List[Tuple[str, str, Any]] = []
+        self._text += chunk
+
+        while self._pos < len(self._text) and not self._done:
+            i = self._pos
+            ch = self._text[i]
+            self._pos += 1
+
+            if not self._started:
+                if ch == "{":
+                    self._started = True
+                    self._stack.append(ch)
+                continue
+
+            if self._in_string:
+                if self._escape:
+                    self._escape = False
+                elif ch == "\\":
+                    self._escape = True
+                elif ch == '"':
+                    self._in_string = False
+                    self._on_string_end(i, events)
+                continue
+
+            depth = len(self._stack)
+
+            if ch == '"':
+                self._in_string = True
+                self._string_start = i
+                if depth == 1 and not self._expect_key and self._value_start is None:
+                    self._value_start = i
+            elif ch in "{[":
+                if depth == 1:
+                    self._value_start = i
+                elif depth == 2 and self._stack[-1] == "[" and ch == "{":
+                    self._item_start = i
+                self._stack.append(ch)
+            elif ch in "}]":
+                if depth == 1:
+                    # Closing the top-level object; flush a trailing scalar
+                    self._emit_scalar(i, events)
+                    self._done = True
+                self._stack.pop()
+                depth = len(self._stack)
+                if depth == 2 and self._stack[-1] == "[" and self._item_start is not None:
+                    self._emit(events, "item", self._item_start, i + 1)
+                    self._item_start = None
+                elif depth == 1 and self._value_start is not None:
+                    self._emit(events, "field", self._value_start, i + 1)
+                    self._value_start = None
+            elif depth == 1:
+                if ch == ":":
+                    self._expect_key = False
+                elif ch == ",":
+                    self._emit_scalar(i, events)
+                    self._expect_key = True
+                elif not ch.isspace() and not self._expect_key and self._value_start is None:
+                    # Start of a number, true, false or null
+                    self._value_start = i
+
+        return events
+
+    def _on_string_end(self, i: int, events: List[Tuple[str, str, Any]]):
+        if len(self._stack) != 1:
+            return
+        if self._expect_key:
+            self._key = json.loads(self._text[self._string_start:i + 1])
+        elif self._value_start == self._string_start:
+            self._emit(events, "field", self._value_start, i + 1)
+            self._value_start = None
+
+    def _emit_scalar(self, end: int, events: List[Tuple[str, str, Any]]):
+        if self._value_start is not None:
+            self._emit(events, "field", self._value_start, end)
+            self._value_start = None
+
+    def _emit(self, events: List[Tuple[str, str, Any]], kind: str, start: int, end: int):
+        try:
+            value = json.loads(self._text[start:end])
+        except json.JSONDecodeError:
+            return
+        events.append((kind, self._key, value))
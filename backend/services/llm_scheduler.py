@@ -0,0 +1,282 @@
+import asyncio
+import heapq
+import itertools
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from enum import IntEnum
+from typing import Dict, Iterator, List, Optional, Tuple
+
+from services.metrics import LLM_IN_FLIGHT, LLM_QUEUE_DEPTH, LLM_QUEUE_WAIT_SECONDS, LLM_REJECTED
+
+
+class Priority(IntEnum):
+    INTERACTIVE = 0
+    REFRESH = 1
+
+
+# Priority of the LLM calls made by the current task; background work sets REFRESH
+_priority: ContextVar[Priority] = ContextVar("llm_priority", default=Priority.INTERACTIVE)
+
+
+@contextmanager
+def llm_priority(priority: Priority) -> Iterator[None]:
+    token = _priority.set(priority)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class LLMOverloadedError(Exception):
+    """
+    An LLM call was shed instead of queued
+
+    `status_code` is 429 when the rate limit (our quota) is the bottleneck
+    and 503 when the queue itself is full; `retry_after` is in seconds.
+    """
+
+    def __init__(self, message: str, status_code: int, retry_after: float):
+        super().__init__(message)
+        self.status_code = status_code
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """
+    Allows `rate` calls per second on average, in bursts of up to `capacity`
+
+    A rate of 0 disables the limit.
+    """
+
+    def __init__(self, rate: float, capacity: float):
+        self.rate = rate
+        self.capacity = max(1.0, capacity)
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def available(self) -> float:
+        if self.rate <= 0:
+            return float("inf")
+        self._refill()
+        return self.tokens
+
+    def take(self):
+        if self.rate > 0:
+            self._refill()
+            self.tokens -= 1
+
+    def wait_time(self, tokens: float) -> float:
+        """
+        Seconds until `tokens` tokens are available
+        """
+        if self.rate <= 0:
+            return 0.0
+        self._refill()
+        return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def pause(self, seconds: float):
+        """
+        Hold off all calls for `seconds` (e.g. after the provider rate-limited us)
+        """
+        if self.rate > 0:
+            self._refill()
+            self.tokens = min(self.tokens, 0.0) - seconds * self.rate
+
+
+class LLMScheduler:
+    """
+    Admission control for every LLM call
+
+    Calls wait in a priority queue for both a concurrency slot and a
+    rate-limit token, so interactive requests always go ahead of queued
+    refresh work. Refresh calls also leave `LLM_INTERACTIVE_RESERVE` slots
+    and tokens free, so an interactive call arriving during a bulk refresh
+    doesn't wait behind it.
+
+    A call is shed right away with LLMOverloadedError when its priority's
+    queue is full or its estimated wait exceeds that priority's limit,
+    rather than timing out after holding a connection.
+    """
+
+    def __init__(self):
+        self.max_concurrency = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+        # The quota is shared by every worker process, so each one gets its share
+        workers = max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+        rate_per_minute = float(os.getenv("LLM_RATE_LIMIT_PER_MINUTE", "60")) / workers
+        burst = float(os.getenv("LLM_RATE_LIMIT_BURST", "10")) / workers
+        self.bucket = TokenBucket(rate_per_minute / 60, burst)
+        self.rate_limit_backoff_seconds = float(os.getenv("LLM_RATE_LIMIT_BACKOFF_SECONDS", "10"))
+
+        reserve = int(os.getenv("LLM_INTERACTIVE_RESERVE", "1"))
+        self._slot_reserve = {
+            Priority.INTERACTIVE: 0,
+            Priority.REFRESH: min(reserve, self.max_concurrency - 1),
+        }
+        self._token_reserve = {
+            Priority.INTERACTIVE: 0,
+            Priority.REFRESH: min(reserve, int(self.bucket.capacity) - 1),
+        }
+        self.queue_limits = {
+            Priority.INTERACTIVE: int(os.getenv("LLM_QUEUE_LIMIT_INTERACTIVE", "32")),
+            Priority.REFRESH: int(os.getenv("LLM_QUEUE_LIMIT_REFRESH", "256")),
+        }
+        self.max_wait_seconds = {
+            Priority.INTERACTIVE: float(os.getenv("LLM_MAX_WAIT_INTERACTIVE_SECONDS", "20")),
+            Priority.REFRESH: float(os.getenv("LLM_MAX_WAIT_REFRESH_SECONDS", "300")),
+        }
+
+        self._waiters: List[Tuple[int, int, asyncio.Future]] = []
+        self._sequence = itertools.count()
+        self._queued = {priority: 0 for priority in Priority}
+        self._in_flight = 0
+        self._wakeup: Optional[asyncio.Event] = None
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        # Moving average of how long a call holds its slot, to estimate queue waits
+        self._call_seconds: Optional[float] = None
+        self.admitted = {priority.name.lower(): 0 for priority in Priority}
+        self.rejected: Dict[str, int] = {}
+
+    async def acquire(self, priority: Optional[Priority] = None) -> float:
+        """
+        Wait for a concurrency slot and take a rate-limit token; returns the
+        start time to hand back to `release()`
+        """
+        priority = _priority.get() if priority is None else priority
+        queued_at = time.perf_counter()
+        await self._admit(priority)
+
+        started = time.perf_counter()
+        LLM_QUEUE_WAIT_SECONDS.labels(priority.name.lower()).observe(started - queued_at)
+        return started
+
+    def release(self, started: float):
+        elapsed = time.perf_counter() - started
+        self._call_seconds = elapsed if self._call_seconds is None else 0.8 * self._call_seconds + 0.2 * elapsed
+        self._release()
+
+    def rate_limited(self):
+        """
+        The provider rejected a call for quota; stop sending for a while
+        """
+        self.bucket.pause(self.rate_limit_backoff_seconds)
+
+    async def _admit(self, priority: Priority):
+        if not self._waiters and self._can_start(priority):
+            self._start(priority)
+            return
+
+        if self._queued[priority] >= self.queue_limits[priority]:
+            self._reject(priority, "queue_full", 503, self._estimated_wait(priority))
+        wait = self._estimated_wait(priority)
+        if wait > self.max_wait_seconds[priority]:
+            self._reject(priority, "rate_limited", 429, wait)
+
+        future = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._waiters, (priority, next(self._sequence), future))
+        self._set_queued(priority, 1)
+        self._wake()
+        try:
+            await asyncio.wait_for(future, timeout=self.max_wait_seconds[priority])
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            # Granted in the same loop iteration the caller gave up: hand the slot back
+            if future.done() and not future.cancelled():
+                self._release()
+            if isinstance(e, asyncio.TimeoutError):
+                self._reject(priority, "timeout", 503, self._estimated_wait(priority))
+            raise
+        finally:
+            self._set_queued(priority, -1)
+
+    def _can_start(self, priority: Priority) -> bool:
+        return (
+            self._in_flight < self.max_concurrency - self._slot_reserve[priority]
+            and self.bucket.available() >= 1 + self._token_reserve[priority]
+        )
+
+    def _start(self, priority: Priority):
+        self._in_flight += 1
+        self.bucket.take()
+        self.admitted[priority.name.lower()] += 1
+        LLM_IN_FLIGHT.set(self._in_flight)
+
+    def _release(self):
+        self._in_flight -= 1
+        LLM_IN_FLIGHT.set(self._in_flight)
+        if self._waiters:
+            self._wake()
+
+    def _set_queued(self, priority: Priority, change: int):
+        self._queued[priority] += change
+        LLM_QUEUE_DEPTH.labels(priority.name.lower()).set(self._queued[priority])
+
+    def _estimated_wait(self, priority: Priority) -> float:
+        """
+        Rough seconds until a new call of `priority` would start
+        """
+        ahead = sum(count for queued_priority, count in self._queued.items() if queued_priority <= priority)
+        token_wait = self.bucket.wait_time(ahead + 1 + self._token_reserve[priority])
+        slots = self.max_concurrency - self._slot_reserve[priority]
+        slot_wait = max(0, self._in_flight + ahead + 1 - slots) / slots * (self._call_seconds or 0.0)
+        return max(token_wait, slot_wait)
+
+    def _reject(self, priority: Priority, reason: str, status_code: int, retry_after: float):
+        name = priority.name.lower()
+        LLM_REJECTED.labels(name, reason).inc()
+        self.rejected[f"{name}_{reason}"] = self.rejected.get(f"{name}_{reason}", 0) + 1
+        message = "LLM quota exhausted, try again later" if status_code == 429 else "LLM capacity exhausted, try again later"
+        raise LLMOverloadedError(message, status_code, max(1.0, retry_after))
+
+    def _wake(self):
+        if self._dispatcher is None:
+            self._wakeup = asyncio.Event()
+            self._dispatcher = asyncio.create_task(self._dispatch())
+        else:
+            self._wakeup.set()
+
+    async def _dispatch(self):
+        """
+        Grant slots in priority order, sleeping until a slot frees up, a token
+        refills or a new call arrives
+        """
+        try:
+            while self._waiters:
+                priority, _, future = self._waiters[0]
+                if future.done():
+                    heapq.heappop(self._waiters)
+                    continue
+
+                if self._can_start(priority):
+                    heapq.heappop(self._waiters)
+                    self._start(priority)
+                    future.set_result(None)
+                    continue
+
+                timeout = None
+                if self._in_flight < self.max_concurrency - self._slot_reserve[priority]:
+                    timeout = self.bucket.wait_time(1 + self._token_reserve[priority])
+                self._wakeup.clear()
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=timeout)
+                except asyncio.TimeoutError:
+                    pass
+        finally:
+            self._dispatcher = None
+
+    def stats(self) -> Dict:
+        return {
+            "in_flight": self._in_flight,
+            "max_concurrency": self.max_concurrency,
+            "queued": {priority.name.lower(): count for priority, count in self._queued.items()},
+            "rate_limit_per_minute": self.bucket.rate * 60,
+            "tokens_available": round(min(self.bucket.available(), self.bucket.capacity), 2),
+            "admitted": self.admitted,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,185 @@
+import cProfile
+import io
+import os
+import pstats
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs
+
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Gauge, Histogram, generate_latest
+
+# Stages run from ~1ms (JSON extraction) to tens of seconds (Gemini)
+LATENCY_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+STAGE_SECONDS = Histogram(
+    "hedge_fund_stage_duration_seconds",
+    "Time spent in each stage of request handling and background work",
+    ["stage"],
+    buckets=LATENCY_BUCKETS,
+)
+
+REQUEST_SECONDS = Histogram(
+    "hedge_fund_request_duration_seconds",
+    "HTTP request latency until the response headers are sent",
+    ["method", "endpoint", "status"],
+    buckets=LATENCY_BUCKETS,
+)
+
+STAGE_ERRORS = Counter(
+    "hedge_fund_stage_errors_total",
+    "Stages that raised an exception",
+    ["stage"],
+)
+
+LLM_QUEUE_DEPTH = Gauge(
+    "hedge_fund_llm_queue_depth",
+    "LLM calls waiting for a concurrency slot or rate-limit token",
+    ["priority"],
+)
+
+LLM_IN_FLIGHT = Gauge(
+    "hedge_fund_llm_in_flight",
+    "LLM calls currently running",
+)
+
+LLM_QUEUE_WAIT_SECONDS = Histogram(
+    "hedge_fund_llm_queue_wait_seconds",
+    "Time LLM calls waited before being admitted",
+    ["priority"],
+    buckets=LATENCY_BUCKETS,
+)
+
+LLM_REJECTED = Counter(
+    "hedge_fund_llm_rejected_total",
+    "LLM calls shed instead of queued",
+    ["priority", "reason"],
+)
+
+METRICS_CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Stage timings of the current request, shared with any tasks/threads it starts
+_request_timings: ContextVar[Optional[List[Tuple[str, float]]]] = ContextVar("request_timings", default=None)
+
+
+@contextmanager
+def timed(stage: str) -> Iterator[None]:
+    """
+    Time a block as `stage`: observed in the histogram and, inside a request,
+    added to its Server-Timing header
+    """
+    started = time.perf_counter()
+    try:
+        yield
+    except BaseException:
+        STAGE_ERRORS.labels(stage).inc()
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        STAGE_SECONDS.labels(stage).observe(elapsed)
+        timings = _request_timings.get()
+        if timings is not None:
+            timings.append((stage, elapsed))
+
+
+def render_metrics() -> bytes:
+    return generate_latest()
+
+
+def server_timing(timings: List[Tuple[str, float]], total: float) -> str:
+    """
+    Server-Timing header value; repeated stages (e.g. several feeds) are summed
+    """
+    durations: Dict[str, float] = {}
+    counts: Dict[str, int] = {}
+    for stage, elapsed in timings:
+        durations[stage] = durations.get(stage, 0.0) + elapsed
+        counts[stage] = counts.get(stage, 0) + 1
+
+    entries = [
+        f'{stage};dur={elapsed * 1000:.1f}' + (f';desc="x{counts[stage]}"' if counts[stage] > 1 else "")
+        for stage, elapsed in durations.items()
+    ]
+    entries.append(f"total;dur={total * 1000:.1f}")
+    return ", ".join(entries)
+
+
+class ServerTimingMiddleware:
+    """
+    ASGI middleware that records request latency and adds a Server-Timing header
+
+    With PROFILING_ENABLED, a request carrying `?profile=1` also runs under
+    cProfile; the stats are written to PROFILE_DIR and the file name is
+    returned in `X-Profile-File`. The profiler sees everything the event loop
+    runs meanwhile, so profile one request at a time on a quiet server.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self.profiling_enabled = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+        self.profile_dir = os.getenv("PROFILE_DIR", "profiles")
+        self._profiling = False
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        timings: List[Tuple[str, float]] = []
+        token = _request_timings.set(timings)
+        started = time.perf_counter()
+        profiler = self._start_profiler(scope)
+
+        async def send_with_timing(message):
+            if message["type"] == "http.response.start":
+                total = time.perf_counter() - started
+                headers = list(message.get("headers", []))
+                headers.append((b"server-timing", server_timing(timings, total).encode("latin-1")))
+                if profiler:
+                    headers.append((b"x-profile-file", os.path.basename(self._profile_file(scope)).encode("latin-1")))
+                message = {**message, "headers": headers}
+                REQUEST_SECONDS.labels(scope["method"], self._endpoint(scope), str(message["status"])).observe(total)
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _request_timings.reset(token)
+            if profiler:
+                self._stop_profiler(profiler, self._profile_file(scope))
+
+    @staticmethod
+    def _endpoint(scope) -> str:
+        # Set by the router once a route matched; keeps label cardinality bounded
+        endpoint = scope.get("endpoint")
+        return getattr(endpoint, "__name__", "unmatched")
+
+    def _start_profiler(self, scope) -> Optional[cProfile.Profile]:
+        if not self.profiling_enabled or self._profiling:
+            return None
+        if parse_qs(scope.get("query_string", b"").decode("latin-1")).get("profile") != ["1"]:
+            return None
+
+        self._profiling = True
+        profiler = cProfile.Profile()
+        profiler.enable()
+        return profiler
+
+    def _profile_file(self, scope) -> str:
+        # Named once per request, when the headers go out
+        if "profile_file" not in scope.setdefault("state", {}):
+            name = f"{int(time.time() * 1000)}_{self._endpoint(scope)}.prof"
+            scope["state"]["profile_file"] = os.path.join(self.profile_dir, name)
+        return scope["state"]["profile_file"]
+
+    def _stop_profiler(self, profiler: cProfile.Profile, profile_file: str):
+        profiler.disable()
+        self._profiling = False
+
+        os.makedirs(self.profile_dir, exist_ok=True)
+        profiler.dump_stats(profile_file)
+
+        summary = io.StringIO()
+        pstats.Stats(profiler, stream=summary).sort_stats("cumulative").print_stats(20)
+        print(f"Profile saved to {profile_file}\n{summary.getvalue()}")
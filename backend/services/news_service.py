@@ -1,12 +1,82 @@
-import aiohttp
-import feedparser
-from typing import List, Dict
+import asyncio
+from collections import OrderedDict
+from typing import TYPE_CHECKING, List, Dict, Optional, Tuple
 from datetime import datetime, timedelta
 import os
 from dotenv import load_dotenv
 
+from services.dedup import NearDuplicateDetector
+from services.feed_cache import FeedCache
+from services.metrics import timed
+from services.relevance_index import ArticleIndex, tokenize
+from services.sentiment_engine import SentimentEngine
+
+# aiohttp and feedparser are imported on first use to keep startup fast
+if TYPE_CHECKING:
+    import aiohttp
+
 load_dotenv()
 
+# Shared by every NewsService so each feed is downloaded once per TTL, not once per play
+feed_cache = FeedCache(ttl_seconds=float(os.getenv("RSS_CACHE_TTL_SECONDS", "300")))
+
+# Inverted index over the cached feed entries, shared the same way
+article_index = ArticleIndex()
+
+# Stateless apart from the lexicon, so one engine serves everyone
+sentiment_engine = SentimentEngine()
+
+# Memoizes article signatures by URL, so it's shared too
+near_duplicates = NearDuplicateDetector(similarity=float(os.getenv("NEWS_DEDUP_SIMILARITY", "0.5")))
+
+NEWS_API_URL = "https://newsapi.org/v2/everything"
+
+RSS_FEEDS = (
+    "https://feeds.reuters.com/reuters/businessNews",
+    "https://feeds.bloomberg.com/markets/news.rss",
+    "https://www.ft.com/rss/home",
+)
+
+# NewsAPI rejects a `q` longer than this
+NEWS_API_QUERY_MAX_LENGTH = 500
+
+# BM25 score at which an article's relevance reaches 0.5
+RELEVANCE_HALF_SCORE = 5.0
+
+# Newest entries of each feed that are scored, and so can reach a prompt
+RSS_ENTRIES_PER_FEED = 5
+
+# Feed entries remembered as already handed out by new_articles()
+DELIVERED_ARTICLES_LIMIT = 10000
+
+
+def newsapi_query(scenarios: List[str], instruments: List[str], max_length: int = NEWS_API_QUERY_MAX_LENGTH) -> str:
+    """
+    NewsAPI query for a group of scenarios: their shared instruments (or,
+    without any, the scenarios' keywords) OR-ed together, up to `max_length`
+
+    Ranking the results for each scenario is left to BM25.
+    """
+    terms = list(dict.fromkeys(instruments)) or list(dict.fromkeys(
+        term for scenario in scenarios for term in tokenize(scenario)
+    ))
+    query = ""
+    for term in terms:
+        term = f'"{term}"' if " " in term else term
+        candidate = f"{query} OR {term}" if query else term
+        if len(candidate) > max_length:
+            break
+        query = candidate
+    return query
+
+
+def scenario_queries(scenarios: List[str], instruments: List[str]) -> List[List[str]]:
+    """
+    BM25 query terms of each scenario; instrument tokens keep stopwords, since tickers can be stopwords
+    """
+    instrument_terms = [term for i in instruments for term in tokenize(i, keep_stopwords=True)]
+    return [tokenize(scenario) + instrument_terms for scenario in scenarios]
+
 
 class NewsService:
     """
@@ -15,44 +85,131 @@ class NewsService:
     
     def __init__(self):
         self.news_api_key = os.getenv("NEWS_API_KEY", "")
+        self.news_api_url = os.getenv("NEWS_API_URL", NEWS_API_URL)
         # RSS feeds for financial news (fallback if no API key)
-        self.rss_feeds = [
-            "https://feeds.reuters.com/reuters/businessNews",
-            "https://feeds.bloomberg.com/markets/news.rss",
-            "https://www.ft.com/rss/home",
-        ]
+        rss_feeds = os.getenv("NEWS_RSS_FEEDS")
+        self.rss_feeds = [url.strip() for url in rss_feeds.split(",") if url.strip()] if rss_feeds else list(RSS_FEEDS)
+        self.feed_cache = feed_cache
+        self.article_index = article_index
+        self.sentiment_engine = sentiment_engine
+        
+        # Collapse the same story carried by several sources into one article
+        self.dedup_enabled = os.getenv("NEWS_DEDUP_ENABLED", "true").lower() != "false"
+        self.near_duplicates = near_duplicates
+        
+        # One pooled, keep-alive HTTP session shared by every news source
+        self.source_timeout = float(os.getenv("NEWS_SOURCE_TIMEOUT_SECONDS", "10"))
+        self.max_connections = int(os.getenv("NEWS_MAX_CONNECTIONS", "20"))
+        self._session: Optional["aiohttp.ClientSession"] = None
+        
+        # Entries new_articles() already returned, oldest first
+        self._delivered: "OrderedDict[str, None]" = OrderedDict()
     
-    async def fetch_news_for_scenario(self, scenario: str, instruments: List[str]) -> List[Dict]:
+    async def _get_session(self) -> "aiohttp.ClientSession":
+        if self._session is None or self._session.closed:
+            import aiohttp
+            
+            self._session = aiohttp.ClientSession(
+                connector=aiohttp.TCPConnector(limit=self.max_connections, keepalive_timeout=60),
+                timeout=aiohttp.ClientTimeout(total=self.source_timeout),
+            )
+        return self._session
+    
+    async def close(self):
         """
-        Fetch news articles relevant to a scenario and instruments
+        Close the shared HTTP session
+        """
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
+    
+    async def warm_up(self):
+        """
+        Open the HTTP pool and load every RSS feed into the cache ahead of the first request
+        """
+        await self._get_feeds()
+    
+    async def new_articles(self) -> List[Dict]:
+        """
+        RSS entries (with their tokens) that no earlier call returned, for
+        news-driven refreshes; the first call returns every scored entry
         """
         articles = []
+        for feed_url, feed in await self._get_feeds():
+            if isinstance(feed, BaseException):
+                print(f"Error parsing feed {feed_url}: {feed}")
+                continue
+            
+            # Only entries a refresh would actually score; later ones can't change its prompt
+            for entry in feed["entries"][:RSS_ENTRIES_PER_FEED]:
+                key = entry["url"] or entry["title"]
+                if key not in self._delivered:
+                    self._delivered[key] = None
+                    articles.append(entry)
         
-        # Try NewsAPI if key is available
-        if self.news_api_key:
-            articles.extend(await self._fetch_from_newsapi(scenario, instruments))
-        
-        # Fallback to RSS feeds
-        if len(articles) < 5:
-            articles.extend(await self._fetch_from_rss(scenario, instruments))
+        while len(self._delivered) > DELIVERED_ARTICLES_LIMIT:
+            self._delivered.popitem(last=False)
+        return articles
+    
+    async def _get_feeds(self) -> List[Tuple[str, Dict]]:
+        """
+        Every RSS feed through the cache, concurrently; failed feeds come back as their exception
+        """
+        feeds = await asyncio.gather(
+            *[self.feed_cache.get(feed_url, self._load_feed) for feed_url in self.rss_feeds],
+            return_exceptions=True
+        )
+        return list(zip(self.rss_feeds, feeds))
+    
+    async def fetch_news_for_scenario(self, scenario: str, instruments: List[str]) -> List[Dict]:
+        """
+        Fetch news articles relevant to a scenario and instruments
+        """
+        return (await self.fetch_news_for_scenarios([scenario], instruments))[0]
+    
+    async def fetch_news_for_scenarios(self, scenarios: List[str], instruments: List[str]) -> List[List[Dict]]:
+        """
+        Fetch news once for several scenarios that share the same instruments,
+        returning the articles relevant to each scenario in order
+        """
+        # Query NewsAPI (if key is available) and the RSS feeds side by side
+        newsapi_articles, rss_articles = await asyncio.gather(
+            self._fetch_from_newsapi(scenarios, instruments) if self.news_api_key else self._no_articles(scenarios),
+            self._fetch_from_rss(scenarios, instruments)
+        )
         
-        # Sort by relevance and recency
-        articles.sort(key=lambda x: (x['relevance_score'], x['published_at']), reverse=True)
+        results = []
+        for scenario_newsapi_articles, scenario_rss_articles in zip(newsapi_articles, rss_articles):
+            articles = scenario_newsapi_articles
+            
+            # Fallback to RSS feeds
+            if len(articles) < 5:
+                articles.extend(scenario_rss_articles)
+            
+            # Sort by relevance and recency
+            articles.sort(key=lambda x: (x['relevance_score'], x['published_at']), reverse=True)
+            
+            # Keep the best-ranked copy of each story, so the top 10 are distinct
+            if self.dedup_enabled:
+                with timed("dedup"):
+                    articles = self.near_duplicates.dedupe(articles)
+            
+            results.append(articles[:10])  # Return top 10
         
-        return articles[:10]  # Return top 10
+        return results
     
-    async def _fetch_from_newsapi(self, scenario: str, instruments: List[str]) -> List[Dict]:
+    async def _fetch_from_newsapi(self, scenarios: List[str], instruments: List[str]) -> List[List[Dict]]:
         """
-        Fetch from NewsAPI (if API key available)
+        Fetch from NewsAPI (if API key available) once for the group, scoring
+        the results against each scenario with BM25
         """
-        articles = []
+        query = newsapi_query(scenarios, instruments)
+        if not query:
+            return [[] for _ in scenarios]
         
+        articles = []
         try:
-            # Build query from scenario and instruments
-            query_terms = [scenario] + instruments
-            query = " OR ".join(query_terms)
-            
-            url = "https://newsapi.org/v2/everything"
+            url = self.news_api_url
             params = {
                 "q": query,
                 "apiKey": self.news_api_key,
@@ -62,11 +219,12 @@ class NewsService:
                 "from": (datetime.now() - timedelta(days=7)).isoformat(),
             }
             
-            async with aiohttp.ClientSession() as session:
+            with timed("newsapi"):
+                session = await self._get_session()
                 async with session.get(url, params=params) as response:
                     if response.status == 200:
                         data = await response.json()
-                        
+                    
                         for article in data.get("articles", []):
                             articles.append({
                                 "title": article.get("title", ""),
@@ -75,74 +233,140 @@ class NewsService:
                                 "published_at": datetime.fromisoformat(
                                     article.get("publishedAt", "").replace("Z", "+00:00")
                                 ),
-                                "summary": article.get("description", "")[:200],
-                                "relevance_score": 0.8,  # NewsAPI relevancy
+                                "summary": (article.get("description") or "")[:200],
                             })
+                    else:
+                        print(f"NewsAPI returned {response.status}: {(await response.text())[:200]}")
         except Exception as e:
             print(f"Error fetching from NewsAPI: {e}")
         
-        return articles
+        # The group's results are small and change per query, so they get an index of their own
+        index = ArticleIndex()
+        for doc_id, article in enumerate(articles):
+            index.add(str(doc_id), tokenize(f"{article['title']} {article['summary']}"))
+        scores = index.score_many(scenario_queries(scenarios, instruments))
+        
+        results = []
+        for scenario_scores in scores:
+            scenario_articles = []
+            for doc_id, article in enumerate(articles):
+                score = scenario_scores.get(str(doc_id), 0.0)
+                scenario_articles.append({**article, "relevance_score": score / (score + RELEVANCE_HALF_SCORE)})
+            results.append(scenario_articles)
+        return results
     
-    async def _fetch_from_rss(self, scenario: str, instruments: List[str]) -> List[Dict]:
+    async def _fetch_from_rss(self, scenarios: List[str], instruments: List[str]) -> List[List[Dict]]:
         """
-        Fetch from RSS feeds as fallback
+        Fetch from RSS feeds as fallback, scoring the entries against each scenario with BM25
         """
-        articles = []
+        articles = [[] for _ in scenarios]
         
         try:
-            for feed_url in self.rss_feeds:
-                try:
-                    feed = feedparser.parse(feed_url)
-                    
-                    for entry in feed.entries[:5]:  # Top 5 from each feed
-                        # Simple relevance scoring based on keywords
-                        text = (entry.get("title", "") + " " + entry.get("summary", "")).lower()
-                        relevance = sum(
-                            1 for term in (scenario.lower().split() + [i.lower() for i in instruments])
-                            if term in text
-                        )
-                        
-                        if relevance > 0:
-                            published = entry.get("published_parsed")
-                            pub_date = datetime(*published[:6]) if published else datetime.now()
-                            
-                            articles.append({
-                                "title": entry.get("title", ""),
-                                "url": entry.get("link", ""),
-                                "source": feed.feed.get("title", "RSS Feed"),
-                                "published_at": pub_date,
-                                "summary": entry.get("summary", "")[:200],
-                                "relevance_score": min(relevance / 5.0, 1.0),
-                            })
-                except Exception as e:
-                    print(f"Error parsing feed {feed_url}: {e}")
-                    continue
+            # Fetch every feed concurrently; latency is bounded by the slowest one
+            with timed("rss_fetch"):
+                feeds = await self._get_feeds()
+            
+            # Index entries we haven't seen before (tokens were computed at parse time)
+            with timed("relevance"):
+                candidates = {}
+                for feed_url, feed in feeds:
+                    if isinstance(feed, BaseException):
+                        print(f"Error parsing feed {feed_url}: {feed}")
+                        continue
+                
+                    for entry in feed["entries"][:RSS_ENTRIES_PER_FEED]:
+                        doc_id = entry["url"] or entry["title"]
+                        self.article_index.add(doc_id, entry["tokens"])
+                        candidates[doc_id] = (feed["title"], entry)
+            
+                self.article_index.retain(candidates)
+            
+                # Score every scenario against the candidates in one pass
+                scores = self.article_index.score_many(scenario_queries(scenarios, instruments), candidates)
+            
+                for scenario_scores, scenario_articles in zip(scores, articles):
+                    for doc_id, score in scenario_scores.items():
+                        source, entry = candidates[doc_id]
+                        scenario_articles.append({
+                            "title": entry["title"],
+                            "url": entry["url"],
+                            "source": source,
+                            "published_at": entry["published_at"],
+                            "summary": entry["summary"][:200],
+                            "relevance_score": score / (score + RELEVANCE_HALF_SCORE),
+                        })
         except Exception as e:
             print(f"Error fetching RSS feeds: {e}")
         
         return articles
     
-    async def get_market_sentiment(self, instruments: List[str]) -> Dict:
+    async def _load_feed(self, feed_url: str, etag: Optional[str], modified: Optional[str]) -> Optional[Dict]:
         """
-        Get overall market sentiment for given instruments
+        Download and parse a feed, or return None if it hasn't changed
         """
-        articles = await self.fetch_news_for_scenario("market analysis", instruments)
+        headers = {}
+        if etag:
+            headers["If-None-Match"] = etag
+        if modified:
+            headers["If-Modified-Since"] = modified
         
-        # Simple sentiment analysis based on keywords
-        positive_keywords = ["rally", "gain", "up", "bullish", "growth", "surge"]
-        negative_keywords = ["fall", "drop", "down", "bearish", "decline", "crash"]
+        session = await self._get_session()
+        try:
+            with timed("rss_download"):
+                async with session.get(feed_url, headers=headers) as response:
+                    if response.status == 304:
+                        return None
+                    response.raise_for_status()
+                
+                    body = await response.read()
+                    etag = response.headers.get("ETag")
+                    modified = response.headers.get("Last-Modified")
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"timed out after {self.source_timeout:g}s")
         
-        sentiment_score = 0
-        for article in articles:
-            text = (article["title"] + " " + article["summary"]).lower()
-            sentiment_score += sum(1 for kw in positive_keywords if kw in text)
-            sentiment_score -= sum(1 for kw in negative_keywords if kw in text)
+        # Parsing is CPU-bound, keep it off the event loop
+        with timed("rss_parse"):
+            parsed = await asyncio.to_thread(self._parse_feed, body)
+        parsed["etag"] = etag
+        parsed["modified"] = modified
         
-        total_articles = len(articles)
-        normalized_sentiment = sentiment_score / max(total_articles, 1)
+        return parsed
+    
+    @staticmethod
+    def _parse_feed(body: bytes) -> Dict:
+        import feedparser
+        
+        feed = feedparser.parse(body)
+        
+        if feed.get("bozo") and not feed.entries:
+            raise feed.get("bozo_exception") or ValueError("Unable to parse feed")
+        
+        entries = []
+        for entry in feed.entries:
+            published = entry.get("published_parsed")
+            title = entry.get("title", "")
+            summary = entry.get("summary", "")
+            
+            entries.append({
+                "title": title,
+                "url": entry.get("link", ""),
+                "published_at": datetime(*published[:6]) if published else datetime.now(),
+                "summary": summary,
+                "tokens": tokenize(title + " " + summary),
+            })
         
         return {
-            "score": max(-1.0, min(1.0, normalized_sentiment)),
-            "articles_analyzed": total_articles,
-            "sentiment": "positive" if normalized_sentiment > 0.2 else "negative" if normalized_sentiment < -0.2 else "neutral"
+            "title": feed.feed.get("title", "RSS Feed"),
+            "entries": entries,
         }
+    
+    @staticmethod
+    async def _no_articles(scenarios: List[str]) -> List[List[Dict]]:
+        return [[] for _ in scenarios]
+    
+    async def get_market_sentiment(self, instruments: List[str], bucket_minutes: int = 60, window: int = 6) -> Dict:
+        """
+        Get overall and per-instrument market sentiment for given instruments
+        """
+        articles = await self.fetch_news_for_scenario("market analysis", instruments)
+        return self.sentiment_engine.analyze(articles, instruments, bucket_minutes, window)
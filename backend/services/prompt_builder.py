@@ -0,0 +1,305 @@
+import html
+import math
+import os
+import re
+from string import Formatter
+from typing import Dict, List, Optional
+
+# Rough size of a token for English prose; close enough to budget prompts without a tokenizer call
+CHARS_PER_TOKEN = 4
+
+TAG_PATTERN = re.compile(r"<[^>]+>")
+
+
+def estimate_tokens(text: str) -> int:
+    return math.ceil(len(text) / CHARS_PER_TOKEN) if text else 0
+
+
+class PromptTemplate:
+    """
+    A str.format template parsed once into literal text and field names
+    """
+
+    def __init__(self, template: str):
+        self.parts = [
+            (literal, field_name) for literal, field_name, _, _ in Formatter().parse(template)
+        ]
+
+    def render(self, **fields: str) -> str:
+        return "".join(
+            literal + (str(fields[field_name]) if field_name is not None else "")
+            for literal, field_name in self.parts
+        )
+
+
+PLAY_OUTPUT_SPEC = """For each play, provide:
+- A clear title
+- Detailed description
+- Specific action (Buy/Sell/Short/Long)
+- Specific instruments (ticker symbols, ETFs, or asset names)
+- Detailed rationale explaining why this play makes sense
+- Risk level (Low/Medium/High)
+- Time horizon (Short-term: <3 months, Medium-term: 3-12 months, Long-term: >12 months)
+- Confidence score (0.0 to 1.0)"""
+
+PLAYS_JSON = """[
+      {{
+        "asset_class": "equity",
+        "title": "play title",
+        "description": "detailed description",
+        "action": "Buy/Sell/Short/Long",
+        "instruments": ["TICKER1", "TICKER2"],
+        "rationale": "why this play makes sense",
+        "risk_level": "Low/Medium/High",
+        "time_horizon": "Short-term/Medium-term/Long-term",
+        "confidence_score": 0.75
+      }},
+      {{
+        "asset_class": "commodity",
+        ...
+      }},
+      {{
+        "asset_class": "fixed_income",
+        ...
+      }}
+    ]"""
+
+CURRENT_PLAY = """Current Play:
+- Asset Class: {asset_class}
+- Title: {title}
+- Action: {action}
+- Instruments: {instruments}
+- Rationale: {rationale}
+- Risk Level: {risk_level}"""
+
+SCENARIO_TEMPLATE = PromptTemplate("""You are a hedge fund analyst. Analyze the following market scenario and provide detailed investment recommendations.
+
+Scenario: {scenario}
+
+Please provide:
+1. A clear interpretation of what this scenario means for the markets
+2. THREE specific investment plays - one each for:
+   - Equities
+   - Commodities
+   - Fixed Income
+
+""" + PLAY_OUTPUT_SPEC + """
+
+Return your response as a JSON object with this exact structure:
+{{
+  "interpreted_scenario": "clear interpretation of the scenario",
+  "plays": """ + PLAYS_JSON.replace("\n  ", "\n") + """
+}}
+""")
+
+SCENARIO_BATCH_TEMPLATE = PromptTemplate("""You are a hedge fund analyst. Analyze each of the following market scenarios independently and provide detailed investment recommendations for each one.
+
+Scenarios:
+{scenarios}
+
+For EACH scenario, please provide:
+1. A clear interpretation of what this scenario means for the markets
+2. THREE specific investment plays - one each for:
+   - Equities
+   - Commodities
+   - Fixed Income
+
+""" + PLAY_OUTPUT_SPEC + """
+
+Return your response as a JSON array with one object per scenario, using the scenario numbers above as "scenario_index":
+[
+  {{
+    "scenario_index": 0,
+    "interpreted_scenario": "clear interpretation of the scenario",
+    "plays": """ + PLAYS_JSON + """
+  }}
+]
+""")
+
+PLAY_UPDATE_TEMPLATE = PromptTemplate("""You are a hedge fund analyst monitoring an active investment play. Based on recent news, provide updates or modifications to the play if needed.
+
+""" + CURRENT_PLAY + """
+
+Recent News:
+{news}
+
+Please provide:
+1. Whether the play should be modified (yes/no)
+2. If yes, what specific changes should be made
+3. Updated confidence score (0.0 to 1.0)
+4. Any new alerts or warnings
+
+Return your response as JSON:
+{{
+  "should_modify": true/false,
+  "modifications": "description of changes, or empty string if no changes",
+  "updated_confidence_score": 0.75,
+  "alerts": ["alert message 1", "alert message 2"]
+}}
+""")
+
+ALERTS_TEMPLATE = PromptTemplate("""You are monitoring an investment scenario. Analyze if any alerts should be triggered.
+
+Scenario: {scenario}
+Play: {title} - {action} {instruments}
+
+Recent News:
+{news}
+
+Generate alerts if there are:
+- Significant market movements affecting the play
+- News that contradicts the play thesis
+- Risk level changes
+
+Return as JSON array:
+[
+  {{
+    "message": "alert message",
+    "severity": "info/warning/critical"
+  }}
+]
+
+If no alerts needed, return empty array: []
+""")
+
+REFRESH_TEMPLATE = PromptTemplate("""You are a hedge fund analyst monitoring an active investment play. Based on recent news, provide updates or modifications to the play if needed, and raise any alerts.
+
+Scenario: {scenario}
+
+""" + CURRENT_PLAY + """
+
+Recent News:
+{news}
+
+Please provide:
+1. Whether the play should be modified (yes/no)
+2. If yes, what specific changes should be made
+3. Updated confidence score (0.0 to 1.0)
+4. Alerts if there are:
+   - Significant market movements affecting the play
+   - News that contradicts the play thesis
+   - Risk level changes
+
+Return your response as JSON:
+{{
+  "should_modify": true/false,
+  "modifications": "description of changes, or empty string if no changes",
+  "updated_confidence_score": 0.75,
+  "alerts": [
+    {{
+      "message": "alert message",
+      "severity": "info/warning/critical"
+    }}
+  ]
+}}
+
+If no alerts needed, use an empty array for "alerts".
+""")
+
+REPAIR_TEMPLATE = PromptTemplate("""Your previous response could not be used: {error}
+
+Previous response:
+{response}
+
+Return only the corrected JSON, with no other text, matching this JSON schema:
+{schema}
+""")
+
+
+def clean_summary(summary: str, max_chars: int) -> str:
+    """
+    Strip markup and whitespace from a news summary and cut it at a word boundary
+    """
+    text = re.sub(r"\s+", " ", html.unescape(TAG_PATTERN.sub(" ", summary or ""))).strip()
+    if len(text) <= max_chars:
+        return text
+    cut = text[:max_chars].rsplit(" ", 1)[0]
+    return cut.rstrip(" ,;:.") + "…"
+
+
+class PromptBuilder:
+    """
+    Builds every Gemini prompt from templates parsed once at import
+
+    News is packed greedily by relevance into a token budget: duplicate
+    headlines and summaries are dropped, summaries are cleaned and trimmed,
+    and an article that doesn't fit is skipped in favour of a shorter,
+    less relevant one rather than cutting the list at a fixed count.
+    """
+
+    def __init__(self):
+        self.news_token_budget = int(os.getenv("PROMPT_NEWS_TOKEN_BUDGET", "600"))
+        self.summary_max_chars = int(os.getenv("PROMPT_SUMMARY_MAX_CHARS", "280"))
+
+    def pack_news(self, articles: List[Dict], include_summary: bool = True, budget: Optional[int] = None) -> str:
+        budget = self.news_token_budget if budget is None else budget
+        ranked = sorted(articles, key=lambda article: article.get("relevance_score", 0.0), reverse=True)
+
+        lines: List[str] = []
+        seen = set()
+        used = 0
+        for article in ranked:
+            title = re.sub(r"\s+", " ", article.get("title") or "").strip()
+            summary = clean_summary(article.get("summary", ""), self.summary_max_chars) if include_summary else ""
+            if summary.lower() == title.lower():
+                summary = ""
+            keys = {title.lower(), summary.lower()} - {""}
+            if not keys or keys & seen:
+                continue
+
+            sources = article.get("source_count", 1)
+            if sources > 1:
+                title = f"{title} ({sources} sources)"
+            line = f"- {title}: {summary}" if summary else f"- {title}"
+            tokens = estimate_tokens(line) + 1
+            if used + tokens > budget:
+                continue
+
+            lines.append(line)
+            seen |= keys
+            used += tokens
+
+        return "\n".join(lines) if lines else "- No recent news"
+
+    def scenario(self, scenario_description: str) -> str:
+        return SCENARIO_TEMPLATE.render(scenario=scenario_description)
+
+    def scenario_batch(self, scenario_descriptions: List[str]) -> str:
+        scenarios = "\n".join(
+            f"{index}. {description}" for index, description in enumerate(scenario_descriptions)
+        )
+        return SCENARIO_BATCH_TEMPLATE.render(scenarios=scenarios)
+
+    def play_update(self, play: Dict, news_articles: List[Dict]) -> str:
+        return PLAY_UPDATE_TEMPLATE.render(news=self.pack_news(news_articles), **self._play_fields(play))
+
+    def alerts(self, scenario: str, play: Dict, news_articles: List[Dict]) -> str:
+        return ALERTS_TEMPLATE.render(
+            scenario=scenario,
+            news=self.pack_news(news_articles, include_summary=False),
+            **self._play_fields(play)
+        )
+
+    def refresh(self, scenario: str, play: Dict, news_articles: List[Dict]) -> str:
+        return REFRESH_TEMPLATE.render(
+            scenario=scenario,
+            news=self.pack_news(news_articles),
+            **self._play_fields(play)
+        )
+
+    def repair(self, response: str, error: str, schema: str) -> str:
+        """
+        Ask for a corrected version of a response that failed to parse or validate
+        """
+        return REPAIR_TEMPLATE.render(response=response, error=error, schema=schema)
+
+    @staticmethod
+    def _play_fields(play: Dict) -> Dict[str, str]:
+        return {
+            "asset_class": getattr(play["asset_class"], "value", play["asset_class"]),
+            "title": play["title"],
+            "action": play["action"],
+            "instruments": ", ".join(play["instruments"]),
+            "rationale": play["rationale"],
+            "risk_level": play["risk_level"],
+        }
@@ -0,0 +1,138 @@
+import math
+import re
+from collections import Counter
+from typing import Dict, Iterable, List, Optional
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[&.'][a-z0-9]+)*")
+
+# Direction words ("up", "down", "over", "against") are kept: they matter in market scenarios
+STOPWORDS = frozenset("""
+a about after again all am an and any are as at be because been before being between both
+but by can could did do does doing during each few for from further had has have having he
+her here hers him his how i if in into is it its itself just me more most my no nor not now
+of on once only or other our own same she should so some such than that the their them then
+there these they this those through to too until very was we were what when where which
+while who whom why will with would you your
+""".split())
+
+
+def tokenize(text: str, keep_stopwords: bool = False) -> List[str]:
+    """
+    Split text into lowercase word tokens, dropping stopwords unless asked not to
+    """
+    tokens = TOKEN_PATTERN.findall(text.lower())
+    if keep_stopwords:
+        return tokens
+    return [token for token in tokens if token not in STOPWORDS]
+
+
+class ArticleIndex:
+    """
+    Inverted index over news articles with BM25 relevance scoring
+
+    Articles are tokenized once when they are added; scoring a query only
+    walks the postings of its terms.
+    """
+
+    def __init__(self, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self._postings: Dict[str, Dict[str, int]] = {}
+        self._doc_lengths: Dict[str, int] = {}
+        self._doc_terms: Dict[str, List[str]] = {}
+        self._total_length = 0
+        self._idf: Dict[str, float] = {}
+
+    def __contains__(self, doc_id: str) -> bool:
+        return doc_id in self._doc_lengths
+
+    def __len__(self) -> int:
+        return len(self._doc_lengths)
+
+    def add(self, doc_id: str, tokens: List[str]) -> bool:
+        """
+        Index an article's tokens; returns False if it was already indexed
+        """
+        if doc_id in self._doc_lengths:
+            return False
+
+        counts = Counter(tokens)
+        for term, tf in counts.items():
+            self._postings.setdefault(term, {})[doc_id] = tf
+
+        self._doc_lengths[doc_id] = len(tokens)
+        self._doc_terms[doc_id] = list(counts)
+        self._total_length += len(tokens)
+        self._idf.clear()
+
+        return True
+
+    def remove(self, doc_id: str):
+        if doc_id not in self._doc_lengths:
+            return
+
+        for term in self._doc_terms.pop(doc_id):
+            postings = self._postings[term]
+            del postings[doc_id]
+            if not postings:
+                del self._postings[term]
+
+        self._total_length -= self._doc_lengths.pop(doc_id)
+        self._idf.clear()
+
+    def retain(self, doc_ids: Iterable[str]):
+        """
+        Drop every indexed article that is not in `doc_ids`
+        """
+        keep = set(doc_ids)
+        for doc_id in [d for d in self._doc_lengths if d not in keep]:
+            self.remove(doc_id)
+
+    def idf(self, term: str) -> float:
+        if term not in self._idf:
+            doc_freq = len(self._postings.get(term, ()))
+            n_docs = len(self._doc_lengths)
+            self._idf[term] = math.log(1 + (n_docs - doc_freq + 0.5) / (doc_freq + 0.5))
+        return self._idf[term]
+
+    def score(self, query_terms: List[str], doc_ids: Optional[Iterable[str]] = None) -> Dict[str, float]:
+        """
+        BM25 score of every matching article, optionally restricted to `doc_ids`
+        """
+        return self.score_many([query_terms], doc_ids)[0]
+
+    def score_many(self, queries: List[List[str]], doc_ids: Optional[Iterable[str]] = None) -> List[Dict[str, float]]:
+        """
+        Score a batch of queries (e.g. every tracked scenario) in one pass
+
+        Each term's postings are walked once and credited to every query that
+        contains the term.
+        """
+        results: List[Dict[str, float]] = [{} for _ in queries]
+        if not self._doc_lengths:
+            return results
+
+        allowed = set(doc_ids) if doc_ids is not None else None
+        avg_length = self._total_length / len(self._doc_lengths) or 1.0
+
+        term_queries: Dict[str, List[int]] = {}
+        for query_index, query_terms in enumerate(queries):
+            for term in set(query_terms):
+                term_queries.setdefault(term, []).append(query_index)
+
+        for term, query_indexes in term_queries.items():
+            postings = self._postings.get(term)
+            if not postings:
+                continue
+
+            idf = self.idf(term)
+            for doc_id, tf in postings.items():
+                if allowed is not None and doc_id not in allowed:
+                    continue
+                norm = self.k1 * (1 - self.b + self.b * self._doc_lengths[doc_id] / avg_length)
+                weight = idf * tf * (self.k1 + 1) / (tf + norm)
+                for query_index in query_indexes:
+                    scores = results[query_index]
+                    scores[doc_id] = scores.get(doc_id, 0.0) + weight
+
+        return results
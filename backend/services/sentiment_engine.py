@@ -0,0 +1,206 @@
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Sequence, Union
+
+import numpy as np
+
+from services.relevance_index import tokenize
+
+# Weighted market lexicon; whole tokens only, so "up" no longer matches "update"
+LEXICON: Dict[str, float] = {
+    # Positive
+    "rally": 2.0, "rallies": 2.0, "rallied": 2.0, "surge": 2.5, "surges": 2.5, "surged": 2.5,
+    "soar": 2.5, "soars": 2.5, "soared": 2.5, "jump": 1.5, "jumps": 1.5, "jumped": 1.5,
+    "gain": 1.5, "gains": 1.5, "gained": 1.5, "rise": 1.0, "rises": 1.0, "rose": 1.0, "rising": 1.0,
+    "up": 0.5, "higher": 1.0, "climb": 1.0, "climbs": 1.0, "climbed": 1.0, "rebound": 1.5,
+    "rebounds": 1.5, "rebounded": 1.5, "recovery": 1.5, "recovers": 1.5, "bullish": 2.5, "bull": 1.5,
+    "growth": 1.0, "strong": 1.0, "stronger": 1.0, "beat": 1.5, "beats": 1.5, "upgrade": 2.0,
+    "upgraded": 2.0, "outperform": 1.5, "record": 1.0, "optimism": 1.5, "optimistic": 1.5,
+    "boost": 1.5, "boosts": 1.5, "boosted": 1.5, "easing": 0.5, "profit": 1.0, "profits": 1.0,
+    "upbeat": 1.5, "robust": 1.0, "resilient": 1.0, "expansion": 1.0,
+    # Negative
+    "fall": -1.5, "falls": -1.5, "fell": -1.5, "falling": -1.5, "drop": -1.5, "drops": -1.5,
+    "dropped": -1.5, "decline": -1.5, "declines": -1.5, "declined": -1.5, "down": -0.5,
+    "lower": -1.0, "slump": -2.0, "slumps": -2.0, "slumped": -2.0, "plunge": -2.5, "plunges": -2.5,
+    "plunged": -2.5, "tumble": -2.0, "tumbles": -2.0, "tumbled": -2.0, "crash": -3.0, "crashes": -3.0,
+    "crashed": -3.0, "selloff": -2.0, "bearish": -2.5, "bear": -1.5, "weak": -1.0,
+    "weaker": -1.0, "miss": -1.5, "misses": -1.5, "missed": -1.5, "downgrade": -2.0,
+    "downgraded": -2.0, "underperform": -1.5, "recession": -2.5, "inflation": -0.5, "fears": -1.5,
+    "fear": -1.5, "worries": -1.5, "concern": -1.0, "concerns": -1.0, "volatility": -0.5,
+    "loss": -1.5, "losses": -1.5, "default": -2.0, "layoffs": -1.5, "slowdown": -1.5, "risk": -0.5,
+    "uncertainty": -1.0, "contraction": -1.5, "crisis": -2.5,
+}
+
+# Tokens that flip the sign of the next lexicon word ("not bullish")
+NEGATORS = frozenset({"not", "no", "never", "without", "despite", "isn't", "wasn't", "aren't", "won't"})
+
+# Smooths raw sums into (-1, 1): score / sqrt(score^2 + alpha), as in VADER
+NORMALIZATION_ALPHA = 15.0
+
+# Scores beyond +/- this are labelled positive / negative
+LABEL_THRESHOLD = 0.2
+
+Timestamp = Union[datetime, str, None]
+
+
+def sentiment_label(score: float) -> str:
+    if score > LABEL_THRESHOLD:
+        return "positive"
+    if score < -LABEL_THRESHOLD:
+        return "negative"
+    return "neutral"
+
+
+def _epoch_seconds(value: Timestamp) -> float:
+    if value is None:
+        return float("nan")
+    if isinstance(value, str):
+        try:
+            value = datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            return float("nan")
+    return value.timestamp()
+
+
+class SentimentEngine:
+    """
+    Lexicon sentiment scoring over batches of news articles
+
+    Articles are tokenized once; lexicon hits become a sparse (article, term)
+    matrix in coordinate form, and every aggregate (per-article, per-instrument,
+    per-time-bucket) is a weighted `np.bincount` over it.
+    """
+
+    def __init__(self, lexicon: Optional[Dict[str, float]] = None):
+        lexicon = lexicon or LEXICON
+        self.term_index = {term: i for i, term in enumerate(lexicon)}
+        self.weights = np.fromiter(lexicon.values(), dtype=np.float64, count=len(lexicon))
+
+    def term_matrix(self, token_lists: Sequence[List[str]]):
+        """
+        Sparse lexicon matrix of tokenized texts as (rows, cols, signs) coordinate arrays
+        """
+        rows: List[int] = []
+        cols: List[int] = []
+        signs: List[float] = []
+        term_index = self.term_index
+
+        for row, tokens in enumerate(token_lists):
+            negate = False
+            for token in tokens:
+                col = term_index.get(token)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+                    signs.append(-1.0 if negate else 1.0)
+                negate = token in NEGATORS
+
+        return (
+            np.asarray(rows, dtype=np.intp),
+            np.asarray(cols, dtype=np.intp),
+            np.asarray(signs, dtype=np.float64),
+        )
+
+    def score_texts(self, texts: Sequence[str]) -> np.ndarray:
+        """
+        Sentiment of each text in (-1, 1)
+        """
+        return self.score_tokens([tokenize(text, keep_stopwords=True) for text in texts])
+
+    def score_tokens(self, token_lists: Sequence[List[str]]) -> np.ndarray:
+        rows, cols, signs = self.term_matrix(token_lists)
+        raw = np.bincount(rows, weights=self.weights[cols] * signs, minlength=len(token_lists))
+        return raw / np.sqrt(raw * raw + NORMALIZATION_ALPHA)
+
+    def analyze(self, articles: Sequence[Dict], instruments: Sequence[str] = (),
+                bucket_minutes: int = 60, window: int = 6) -> Dict:
+        """
+        Overall, per-instrument and time-bucketed sentiment of a batch of articles
+
+        An article counts towards an instrument when it mentions its symbol;
+        instruments no article mentions fall back to the overall score.
+        `timeseries` has one point per `bucket_minutes` bucket with at least
+        one article, plus a rolling mean over the last `window` buckets.
+        """
+        token_lists = [
+            tokenize(f"{article.get('title') or ''} {article.get('summary') or ''}", keep_stopwords=True)
+            for article in articles
+        ]
+        scores = self.score_tokens(token_lists)
+        overall = float(scores.mean()) if len(scores) else 0.0
+
+        return {
+            "score": round(overall, 4),
+            "sentiment": sentiment_label(overall),
+            "articles_analyzed": len(articles),
+            "instruments": self._by_instrument(token_lists, scores, instruments, overall),
+            "timeseries": self._timeseries(articles, scores, bucket_minutes, window),
+        }
+
+    @staticmethod
+    def _by_instrument(token_lists: List[List[str]], scores: np.ndarray, instruments: Sequence[str], overall: float) -> Dict:
+        if not instruments:
+            return {}
+
+        symbols = [instrument.lower() for instrument in instruments]
+        symbol_index = {symbol: i for i, symbol in enumerate(symbols)}
+        rows: List[int] = []
+        cols: List[int] = []
+        for row, tokens in enumerate(token_lists):
+            for token in set(tokens):
+                col = symbol_index.get(token)
+                if col is not None:
+                    rows.append(row)
+                    cols.append(col)
+
+        rows_arr = np.asarray(rows, dtype=np.intp)
+        cols_arr = np.asarray(cols, dtype=np.intp)
+        mentions = np.bincount(cols_arr, minlength=len(symbols))
+        totals = np.bincount(cols_arr, weights=scores[rows_arr], minlength=len(symbols))
+        means = np.divide(totals, mentions, out=np.full(len(symbols), overall), where=mentions > 0)
+
+        return {
+            instrument: {
+                "score": round(float(means[i]), 4),
+                "sentiment": sentiment_label(float(means[i])),
+                "mentions": int(mentions[i]),
+            }
+            for i, instrument in enumerate(instruments)
+        }
+
+    @staticmethod
+    def _timeseries(articles: Sequence[Dict], scores: np.ndarray, bucket_minutes: int, window: int) -> List[Dict]:
+        times = np.fromiter(
+            (_epoch_seconds(article.get("published_at")) for article in articles),
+            dtype=np.float64,
+            count=len(articles),
+        )
+        dated = ~np.isnan(times)
+        if not dated.any():
+            return []
+
+        bucket_seconds = bucket_minutes * 60
+        buckets = (times[dated] // bucket_seconds).astype(np.int64)
+        # Only the buckets that have articles, so memory follows the article count, not the date span
+        present, slots = np.unique(buckets, return_inverse=True)
+
+        counts = np.bincount(slots, minlength=len(present))
+        totals = np.bincount(slots, weights=scores[dated], minlength=len(present))
+
+        # Rolling mean over the last `window` non-empty buckets, weighted by article count
+        cumulative_totals = np.concatenate(([0.0], np.cumsum(totals)))
+        cumulative_counts = np.concatenate(([0], np.cumsum(counts)))
+        ends = np.arange(1, len(present) + 1)
+        starts = np.maximum(ends - window, 0)
+        rolling = (cumulative_totals[ends] - cumulative_totals[starts]) / (
+            cumulative_counts[ends] - cumulative_counts[starts]
+        )
+
+        return [
+            {
+                "timestamp": datetime.fromtimestamp(int(bucket) * bucket_seconds, tz=timezone.utc).isoformat(),
+                "score": round(float(totals[i] / counts[i]), 4),
+                "articles": int(counts[i]),
+                "rolling_score": round(float(rolling[i]), 4),
+            }
+            for i, bucket in enumerate(present)
+        ]
@@ -0,0 +1,116 @@
+import hashlib
+import itertools
+import os
+import uuid
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+from pydantic import BaseModel
+
+# Versions are numbered per process, so ETags built from them also name the process
+PROCESS_TAG = uuid.uuid4().hex
+
+
+def make_etag(body: bytes) -> str:
+    """
+    Strong ETag of a response body; content-derived, so every worker agrees on it
+    """
+    return '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """
+    Whether an If-None-Match header covers `etag` (weak comparison, as RFC 9110 asks for it)
+    """
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == etag:
+            return True
+    return False
+
+
+class Snapshot:
+    """
+    One version of a record serialized to JSON, with its ETag
+    """
+
+    __slots__ = ("version", "body", "etag")
+
+    def __init__(self, version: Hashable, body: bytes):
+        self.version = version
+        self.body = body
+        self.etag = make_etag(body)
+
+
+class SnapshotCache:
+    """
+    Serialized JSON of a table's records, reused until the record changes
+
+    Tables bump a key's version on every write, delete and reload. A
+    snapshot is built for the version the caller asks for (which can combine
+    the versions of embedded records), so a stale one is never served.
+    Serialization uses pydantic-core's JSON encoder directly, skipping the
+    intermediate dict. Least recently used snapshots are dropped past
+    `max_size`. Versions are kept per stored key but drawn from one counter,
+    so a key that is deleted and created again never repeats a version.
+    """
+
+    def __init__(self, max_size: Optional[int] = None):
+        self.max_size = int(os.getenv("SNAPSHOT_CACHE_SIZE", "2048")) if max_size is None else max_size
+        self._versions: Dict[str, int] = {}
+        self._snapshots: "OrderedDict[str, Snapshot]" = OrderedDict()
+        self._counter = itertools.count(1)
+        self.stats = {"hits": 0, "misses": 0}
+
+    def version(self, key: str) -> int:
+        return self._versions.get(key, 0)
+
+    def bump(self, key: str):
+        self._versions[key] = next(self._counter)
+
+    def discard(self, key: str):
+        self._versions.pop(key, None)
+        self._snapshots.pop(key, None)
+
+    def get(self, key: str, record: BaseModel, version: Optional[Hashable] = None) -> Snapshot:
+        """
+        The snapshot of `record` at `version` (the key's own version by default)
+        """
+        version = self.version(key) if version is None else version
+        snapshot = self._snapshots.get(key)
+        if snapshot is not None and snapshot.version == version:
+            self.stats["hits"] += 1
+            self._snapshots.move_to_end(key)
+            return snapshot
+
+        self.stats["misses"] += 1
+        snapshot = Snapshot(version, record.model_dump_json().encode())
+        self._snapshots[key] = snapshot
+        self._snapshots.move_to_end(key)
+        if len(self._snapshots) > self.max_size:
+            self._snapshots.popitem(last=False)
+        return snapshot
+
+    def info(self) -> Dict[str, Any]:
+        return {**self.stats, "size": len(self._snapshots), "max_size": self.max_size}
+
+
+def list_etag(etags: Iterable[str], *extra: Any) -> str:
+    """
+    ETag of a list response, from its records' ETags and anything else that shapes it
+    """
+    parts = list(etags) + [repr(value) for value in extra]
+    return make_etag("\n".join(parts).encode())
+
+
+def version_etag(versions: Iterable[Hashable], *extra: Any) -> str:
+    """
+    ETag of a list response from its records' versions, without serializing them
+
+    Only this process numbers versions this way, so its tag is part of the ETag.
+    """
+    return list_etag((repr(version) for version in versions), PROCESS_TAG, *extra)
@@ -0,0 +1,741 @@
+import asyncio
+import base64
+import json
+import os
+import sqlite3
+import time
+import uuid
+from datetime import datetime
+from typing import Any, Callable, Dict, Generic, Iterator, List, MutableMapping, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel
+
+from models.schemas import Scenario, TrackedScenario
+from services.snapshots import SnapshotCache
+
+ModelT = TypeVar("ModelT", bound=BaseModel)
+
+# Indexed columns per table: column name -> function extracting its value from a record.
+# List values are multi-valued columns; a filter matches if any element equals it.
+SCENARIO_COLUMNS: Dict[str, Callable[[Scenario], Any]] = {
+    "created_at": lambda scenario: scenario.created_at.isoformat(),
+    "is_tracking": lambda scenario: int(scenario.is_tracking),
+    "asset_classes": lambda scenario: sorted({play.asset_class.value for play in scenario.plays}),
+}
+
+TRACKED_COLUMNS: Dict[str, Callable[[TrackedScenario], Any]] = {
+    "scenario_id": lambda tracked: tracked.scenario.id,
+    "play_id": lambda tracked: tracked.play.id,
+    "last_updated": lambda tracked: tracked.last_updated.isoformat(),
+    "asset_class": lambda tracked: tracked.play.asset_class.value,
+    "severities": lambda tracked: sorted({alert.severity for alert in tracked.alerts}),
+}
+
+Cursor = Tuple[str, str]
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    return base64.urlsafe_b64encode(json.dumps(list(cursor)).encode()).decode()
+
+
+def decode_cursor(token: str) -> Cursor:
+    try:
+        order_value, key = json.loads(base64.urlsafe_b64decode(token.encode()))
+    except Exception:
+        raise ValueError("Invalid cursor")
+    return str(order_value), str(key)
+
+
+def _column_value(value: Any) -> Any:
+    # Multi-valued columns are stored as ",a,b," so membership is a substring test
+    if isinstance(value, list):
+        return "," + ",".join(str(v) for v in value) + ","
+    return value
+
+
+def _matches(value: Any, expected: Any) -> bool:
+    if isinstance(value, list):
+        return expected in value
+    return value == expected
+
+
+class MemoryTable(dict):
+    """
+    Plain in-process table; nothing survives a restart
+    """
+
+    def __init__(self, columns: Dict[str, Callable[[Any], Any]]):
+        super().__init__()
+        self.columns = columns
+        self.snapshots = SnapshotCache()
+        # Called with (key, record) on every insert/replace and (key, None) on delete
+        self.listeners: List[Callable[[str, Optional[Any]], None]] = []
+
+    def __setitem__(self, key: str, value: Any):
+        super().__setitem__(key, value)
+        self.snapshots.bump(key)
+        for listener in self.listeners:
+            listener(key, value)
+
+    def __delitem__(self, key: str):
+        super().__delitem__(key)
+        self.snapshots.discard(key)
+        for listener in self.listeners:
+            listener(key, None)
+
+    def save(self, key: str):
+        """
+        Persist in-place changes to a record (only its snapshot needs replacing in memory)
+        """
+        self.snapshots.bump(key)
+
+    def page(
+        self,
+        order_by: str,
+        limit: int,
+        cursor: Optional[Cursor] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[Any], Optional[Cursor]]:
+        """
+        Records newest-first by `order_by`, starting after `cursor`
+        """
+        rows = []
+        for key, value in self.items():
+            if filters and not all(_matches(self.columns[c](value), v) for c, v in filters.items()):
+                continue
+            position = (self.columns[order_by](value), key)
+            if cursor is None or position < cursor:
+                rows.append((position, value))
+
+        rows.sort(key=lambda row: row[0], reverse=True)
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+
+        return [value for _, value in rows[:limit]], next_cursor
+
+
+class SQLiteTable(MutableMapping[str, ModelT], Generic[ModelT]):
+    """
+    Table of Pydantic records stored in SQLite with a write-through hot cache
+
+    Every record is loaded into memory on startup, so reads are dict lookups.
+    Writes update the cache and the database together. Records are stored as
+    JSON alongside indexed columns used for querying. `private_fields` are
+    excluded from the model's JSON, so they're stored in a JSON column of
+    their own.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        name: str,
+        model: Type[ModelT],
+        columns: Dict[str, Callable[[ModelT], Any]],
+        sync: Optional["StorageSync"] = None,
+        on_load: Optional[Callable[[ModelT], None]] = None,
+        private_fields: Tuple[str, ...] = (),
+    ):
+        self.conn = conn
+        self.name = name
+        self.model = model
+        self.columns = columns
+        self.sync = sync
+        self.on_load = on_load
+        self.private_fields = private_fields
+        self.snapshots = SnapshotCache()
+        # Called with (key, record) when a record is set or reloaded and (key, None) when it's deleted
+        self.listeners: List[Callable[[str, Optional[ModelT]], None]] = []
+
+        column_defs = "".join(f", {column}" for column in columns)
+        conn.execute(
+            f"CREATE TABLE IF NOT EXISTS {name} (key TEXT PRIMARY KEY, data TEXT NOT NULL, private_data TEXT{column_defs})"
+        )
+
+        # Add columns introduced after the table was created
+        existing = {row[1] for row in conn.execute(f"PRAGMA table_info({name})")}
+        if "private_data" not in existing:
+            conn.execute(f"ALTER TABLE {name} ADD COLUMN private_data TEXT")
+        missing = [column for column in columns if column not in existing]
+        for column in missing:
+            conn.execute(f"ALTER TABLE {name} ADD COLUMN {column}")
+
+        for column in columns:
+            conn.execute(f"CREATE INDEX IF NOT EXISTS idx_{name}_{column} ON {name} ({column})")
+        conn.commit()
+
+        self._cache: Dict[str, ModelT] = {
+            key: self._load(data, private_data)
+            for key, data, private_data in conn.execute(f"SELECT key, data, private_data FROM {name}")
+        }
+
+        if missing:
+            # Backfill the new columns
+            for key, value in self._cache.items():
+                self._write(key, value, commit=False)
+            conn.commit()
+
+        if sync is not None:
+            sync.register(self)
+
+    # Membership, iteration and paging first pick up other processes' writes;
+    # plain lookups don't, so a record checked with `in` can't vanish before it's read
+
+    def __getitem__(self, key: str) -> ModelT:
+        return self._cache[key]
+
+    def __setitem__(self, key: str, value: ModelT):
+        self._cache[key] = value
+        self._write(key, value)
+        self._notify(key, value)
+
+    def __delitem__(self, key: str):
+        del self._cache[key]
+        self.snapshots.discard(key)
+        self.conn.execute(f"DELETE FROM {self.name} WHERE key = ?", (key,))
+        if self.sync is not None:
+            self.sync.record(self.name, key)
+        self.conn.commit()
+        self._notify(key, None)
+
+    def __contains__(self, key: object) -> bool:
+        self._sync()
+        return key in self._cache
+
+    def __iter__(self) -> Iterator[str]:
+        self._sync()
+        return iter(list(self._cache))
+
+    def __len__(self) -> int:
+        self._sync()
+        return len(self._cache)
+
+    def _sync(self):
+        if self.sync is not None:
+            self.sync.sync()
+
+    def _notify(self, key: str, value: Optional[ModelT]):
+        for listener in self.listeners:
+            listener(key, value)
+
+    def reload(self, keys: Optional[List[str]] = None):
+        """
+        Re-read records changed by another process (all of them if `keys` is None)
+        """
+        if keys is None:
+            rows = {
+                key: (data, private_data)
+                for key, data, private_data in self.conn.execute(f"SELECT key, data, private_data FROM {self.name}")
+            }
+            keys = list(set(self._cache) | set(rows))
+        else:
+            rows = {}
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows.update(
+                    (key, (data, private_data))
+                    for key, data, private_data in self.conn.execute(
+                        f"SELECT key, data, private_data FROM {self.name} "
+                        f"WHERE key IN ({', '.join('?' * len(chunk))})",
+                        chunk,
+                    )
+                )
+
+        for key in keys:
+            if key not in rows:
+                if self._cache.pop(key, None) is not None:
+                    self._notify(key, None)
+                self.snapshots.discard(key)
+                continue
+            value = self._load(*rows[key])
+            if self.on_load is not None:
+                self.on_load(value)
+            self._cache[key] = value
+            self.snapshots.bump(key)
+            self._notify(key, value)
+
+    def save(self, key: str):
+        """
+        Persist in-place changes to a record
+        """
+        self._write(key, self._cache[key])
+
+    def page(
+        self,
+        order_by: str,
+        limit: int,
+        cursor: Optional[Cursor] = None,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> Tuple[List[ModelT], Optional[Cursor]]:
+        """
+        Records newest-first by `order_by`, starting after `cursor`
+
+        The indexed columns pick the page; the records themselves come from
+        the hot cache, so the cost scales with the page size.
+        """
+        if order_by not in self.columns:
+            raise ValueError(f"Unknown column: {order_by}")
+
+        conditions = []
+        params: List[Any] = []
+        for column, value in (filters or {}).items():
+            if column not in self.columns:
+                raise ValueError(f"Unknown column: {column}")
+            conditions.append(f"({column} = ? OR instr({column}, ?) > 0)")
+            params.extend([value, f",{value},"])
+
+        if cursor is not None:
+            conditions.append(f"({order_by} < ? OR ({order_by} = ? AND key < ?))")
+            params.extend([cursor[0], cursor[0], cursor[1]])
+
+        self._sync()
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        rows = self.conn.execute(
+            f"SELECT key, {order_by} FROM {self.name} {where} ORDER BY {order_by} DESC, key DESC LIMIT ?",
+            (*params, limit + 1),
+        ).fetchall()
+
+        next_cursor = (rows[limit - 1][1], rows[limit - 1][0]) if len(rows) > limit else None
+
+        return [self._cache[key] for key, _ in rows[:limit] if key in self._cache], next_cursor
+
+    def _load(self, data: str, private_data: Optional[str]) -> ModelT:
+        value = self.model.model_validate_json(data)
+        # Rows written before a field went private still carry it in `data`
+        if private_data is not None:
+            for field, field_value in json.loads(private_data).items():
+                setattr(value, field, field_value)
+        return value
+
+    def _write(self, key: str, value: ModelT, commit: bool = True):
+        column_names = "".join(f", {column}" for column in self.columns)
+        placeholders = ", ?" * len(self.columns)
+        private_data = (
+            json.dumps({field: getattr(value, field) for field in self.private_fields}) if self.private_fields else None
+        )
+        self.conn.execute(
+            f"INSERT OR REPLACE INTO {self.name} (key, data, private_data{column_names}) VALUES (?, ?, ?{placeholders})",
+            (
+                key, value.model_dump_json(), private_data,
+                *(_column_value(extract(value)) for extract in self.columns.values()),
+            ),
+        )
+        self.snapshots.bump(key)
+        if self.sync is not None:
+            self.sync.record(self.name, key)
+        if commit:
+            self.conn.commit()
+
+
+class StorageSync:
+    """
+    Keeps this process's hot caches coherent with other processes (uvicorn
+    workers) writing the same SQLite database
+
+    Every write also appends (table, key, writer) to a change log in the same
+    transaction. `PRAGMA data_version` changes only when another connection
+    commits, so checking for foreign writes costs one pragma; when it moves,
+    the changed keys are re-read (a missing row is a deletion). A process
+    that fell behind the pruned log reloads its tables fully.
+
+    Tracking events go through a log as well, so server-sent events reach
+    subscribers on every worker, not just the one that did the refresh.
+    """
+
+    def __init__(self, conn: sqlite3.Connection, log_size: int = 10000):
+        self.conn = conn
+        self.log_size = log_size
+        self.writer = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self.tables: Dict[str, SQLiteTable] = {}
+        self.on_event: Optional[Callable[[str, Dict], None]] = None
+
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS storage_changes "
+            "(seq INTEGER PRIMARY KEY AUTOINCREMENT, table_name TEXT NOT NULL, key TEXT NOT NULL, writer TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS storage_events "
+            "(seq INTEGER PRIMARY KEY AUTOINCREMENT, tracking_key TEXT NOT NULL, data TEXT NOT NULL, writer TEXT NOT NULL)"
+        )
+        conn.commit()
+
+        self._change_seq = self._max_seq("storage_changes")
+        self._event_seq = self._max_seq("storage_events")
+        self._data_version = self._current_data_version()
+        self._writes = 0
+        self._task: Optional[asyncio.Task] = None
+        self.syncs = 0
+        self.reloaded = 0
+        self.full_reloads = 0
+        self.events_received = 0
+
+    def register(self, table: SQLiteTable):
+        self.tables[table.name] = table
+
+    def record(self, table_name: str, key: str):
+        """
+        Log a write; the caller commits it together with the write itself
+        """
+        self.conn.execute(
+            "INSERT INTO storage_changes (table_name, key, writer) VALUES (?, ?, ?)",
+            (table_name, key, self.writer),
+        )
+        self._count_write()
+
+    def publish_event(self, tracking_key: str, event: Dict):
+        self.conn.execute(
+            "INSERT INTO storage_events (tracking_key, data, writer) VALUES (?, ?, ?)",
+            (tracking_key, json.dumps(event), self.writer),
+        )
+        self._count_write()
+        self.conn.commit()
+
+    def sync(self):
+        """
+        Apply other processes' changes and deliver their events, if they wrote anything
+        """
+        data_version = self._current_data_version()
+        if data_version == self._data_version:
+            return
+        self._data_version = data_version
+        self.syncs += 1
+
+        oldest = self.conn.execute("SELECT MIN(seq) FROM storage_changes").fetchone()[0]
+        rows = self.conn.execute(
+            "SELECT seq, table_name, key, writer FROM storage_changes WHERE seq > ? ORDER BY seq",
+            (self._change_seq,),
+        ).fetchall()
+
+        if oldest is not None and oldest > self._change_seq + 1:
+            # Changes we never saw were pruned; start over from the tables
+            for table in self.tables.values():
+                table.reload()
+            self.full_reloads += 1
+        else:
+            changed: Dict[str, List[str]] = {}
+            for _, table_name, key, writer in rows:
+                if writer != self.writer and key not in changed.setdefault(table_name, []):
+                    changed[table_name].append(key)
+            # Registration order: scenarios before the tracked plays that link to them
+            for name, table in self.tables.items():
+                if changed.get(name):
+                    table.reload(changed[name])
+                    self.reloaded += len(changed[name])
+        if rows:
+            self._change_seq = rows[-1][0]
+
+        events = self.conn.execute(
+            "SELECT seq, tracking_key, data, writer FROM storage_events WHERE seq > ? ORDER BY seq",
+            (self._event_seq,),
+        ).fetchall()
+        for _, tracking_key, data, writer in events:
+            if writer != self.writer and self.on_event is not None:
+                self.on_event(tracking_key, json.loads(data))
+                self.events_received += 1
+        if events:
+            self._event_seq = events[-1][0]
+
+    def start(self, interval_seconds: float):
+        """
+        Poll for other processes' writes so events and caches stay fresh between requests
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run(interval_seconds))
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self, interval_seconds: float):
+        while True:
+            await asyncio.sleep(interval_seconds)
+            try:
+                self.sync()
+            except sqlite3.Error as e:
+                print(f"Error syncing storage: {e}")
+
+    def _current_data_version(self) -> int:
+        return self.conn.execute("PRAGMA data_version").fetchone()[0]
+
+    def _max_seq(self, table: str) -> int:
+        return self.conn.execute(f"SELECT COALESCE(MAX(seq), 0) FROM {table}").fetchone()[0]
+
+    def _count_write(self):
+        self._writes += 1
+        if self._writes % 1000 == 0:
+            self._prune()
+
+    def _prune(self):
+        for table in ("storage_changes", "storage_events"):
+            self.conn.execute(
+                f"DELETE FROM {table} WHERE seq <= (SELECT MAX(seq) FROM {table}) - ?", (self.log_size,)
+            )
+
+    def stats(self) -> Dict:
+        return {
+            "writer": self.writer,
+            "syncs": self.syncs,
+            "records_reloaded": self.reloaded,
+            "full_reloads": self.full_reloads,
+            "events_received": self.events_received,
+        }
+
+
+class MemoryLeases:
+    """
+    Named leases within this process
+    """
+
+    def __init__(self):
+        self._leases: Dict[str, Tuple[str, float]] = {}
+
+    def acquire(self, name: str, ttl_seconds: float) -> Optional[str]:
+        """
+        Take the lease if it's free or expired; returns a token for `release()`, or None
+        """
+        now = time.time()
+        holder = self._leases.get(name)
+        if holder is not None and holder[1] > now:
+            return None
+        token = uuid.uuid4().hex
+        self._leases[name] = (token, now + ttl_seconds)
+        return token
+
+    def release(self, name: str, token: str):
+        if self._leases.get(name, (None,))[0] == token:
+            del self._leases[name]
+
+    def held(self, name: str) -> bool:
+        holder = self._leases.get(name)
+        return holder is not None and holder[1] > time.time()
+
+
+class SQLiteLeases:
+    """
+    Named leases shared by every process using the database
+
+    A lease is a row with an owner token and an expiry; taking it is one
+    upsert that only overwrites an expired row, so exactly one process wins.
+    Expiry frees leases of processes that died while holding them.
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS leases (name TEXT PRIMARY KEY, owner TEXT NOT NULL, expires_at REAL NOT NULL)"
+        )
+        conn.commit()
+
+    def acquire(self, name: str, ttl_seconds: float) -> Optional[str]:
+        """
+        Take the lease if it's free or expired; returns a token for `release()`, or None
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        cursor = self.conn.execute(
+            "INSERT INTO leases (name, owner, expires_at) VALUES (?, ?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET owner = excluded.owner, expires_at = excluded.expires_at "
+            "WHERE leases.expires_at <= ?",
+            (name, token, now + ttl_seconds, now),
+        )
+        self.conn.commit()
+        return token if cursor.rowcount == 1 else None
+
+    def release(self, name: str, token: str):
+        self.conn.execute("DELETE FROM leases WHERE name = ? AND owner = ?", (name, token))
+        self.conn.commit()
+
+    def held(self, name: str) -> bool:
+        row = self.conn.execute("SELECT expires_at FROM leases WHERE name = ?", (name,)).fetchone()
+        return row is not None and row[0] > time.time()
+
+
+class MemoryHistoryArchive:
+    """
+    In-process archive of history entries (alerts, play updates) per tracked play
+    """
+
+    def __init__(self):
+        self._entries: Dict[Tuple[str, str], List[Tuple[str, str]]] = {}
+
+    def add(self, tracking_key: str, kind: str, created_at: datetime, data: str):
+        self._entries.setdefault((tracking_key, kind), []).append((created_at.isoformat(), data))
+
+    def query(self, tracking_key: str, kind: str, since: Optional[datetime] = None,
+              until: Optional[datetime] = None, limit: Optional[int] = 100) -> List[str]:
+        """
+        Archived entries newest first, optionally within [since, until]
+        """
+        entries = sorted(self._entries.get((tracking_key, kind), []), reverse=True)
+        return [
+            data for created_at, data in entries
+            if (since is None or created_at >= since.isoformat())
+            and (until is None or created_at <= until.isoformat())
+        ][:limit]
+
+    def delete(self, tracking_key: str):
+        for key in [key for key in self._entries if key[0] == tracking_key]:
+            del self._entries[key]
+
+
+class SQLiteHistoryArchive:
+    """
+    Archive of history entries (alerts, play updates) per tracked play, in SQLite
+    """
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+        conn.execute(
+            "CREATE TABLE IF NOT EXISTS history_archive "
+            "(tracking_key TEXT NOT NULL, kind TEXT NOT NULL, created_at TEXT NOT NULL, data TEXT NOT NULL)"
+        )
+        conn.execute(
+            "CREATE INDEX IF NOT EXISTS idx_history_archive_key_time "
+            "ON history_archive (tracking_key, kind, created_at)"
+        )
+        conn.commit()
+
+    def add(self, tracking_key: str, kind: str, created_at: datetime, data: str):
+        self.conn.execute(
+            "INSERT INTO history_archive (tracking_key, kind, created_at, data) VALUES (?, ?, ?, ?)",
+            (tracking_key, kind, created_at.isoformat(), data),
+        )
+        self.conn.commit()
+
+    def query(self, tracking_key: str, kind: str, since: Optional[datetime] = None,
+              until: Optional[datetime] = None, limit: Optional[int] = 100) -> List[str]:
+        """
+        Archived entries newest first, optionally within [since, until]
+        """
+        conditions = ["tracking_key = ?", "kind = ?"]
+        params: List[Any] = [tracking_key, kind]
+        if since is not None:
+            conditions.append("created_at >= ?")
+            params.append(since.isoformat())
+        if until is not None:
+            conditions.append("created_at <= ?")
+            params.append(until.isoformat())
+
+        rows = self.conn.execute(
+            f"SELECT data FROM history_archive WHERE {' AND '.join(conditions)} ORDER BY created_at DESC LIMIT ?",
+            (*params, -1 if limit is None else limit),
+        )
+        return [data for (data,) in rows]
+
+    def delete(self, tracking_key: str):
+        self.conn.execute("DELETE FROM history_archive WHERE tracking_key = ?", (tracking_key,))
+        self.conn.commit()
+
+
+def connect_sqlite(path: str) -> sqlite3.Connection:
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+
+    # The app runs on one event loop, but it isn't always the thread that opened the connection
+    conn = sqlite3.connect(path, check_same_thread=False)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+
+def open_storage():
+    """
+    Open the scenario and tracked-scenario tables, the history archive,
+    leases and (when shared between processes) the cache sync for the
+    configured backend
+
+    STORAGE_BACKEND is "sqlite" (default) or "memory"; STORAGE_PATH sets the
+    SQLite database file. With more than one worker (WEB_CONCURRENCY), or
+    STORAGE_SHARED=true, caches are kept coherent across processes and
+    leases live in the database.
+    """
+    backend = os.getenv("STORAGE_BACKEND", "sqlite").lower()
+    shared = os.getenv("STORAGE_SHARED", str(worker_count() > 1)).lower() == "true"
+
+    if backend == "memory":
+        if shared:
+            raise ValueError("STORAGE_BACKEND=memory can't be shared between workers; use sqlite")
+        return MemoryTable(SCENARIO_COLUMNS), MemoryTable(TRACKED_COLUMNS), MemoryHistoryArchive(), MemoryLeases(), None
+    if backend != "sqlite":
+        raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
+
+    conn = connect_sqlite(os.getenv("STORAGE_PATH", "hedge_fund_agent.db"))
+    sync = StorageSync(conn) if shared else None
+    scenarios = SQLiteTable(conn, "scenarios", Scenario, SCENARIO_COLUMNS, sync)
+    tracked = SQLiteTable(
+        conn, "tracked_scenarios", TrackedScenario, TRACKED_COLUMNS, sync,
+        on_load=lambda tracked_scenario: link_tracked(tracked_scenario, scenarios),
+        private_fields=("seen_article_fingerprints",),
+    )
+
+    for tracked_scenario in tracked.values():
+        link_tracked(tracked_scenario, scenarios)
+    # A scenario reloaded from another worker is a new object; move its tracked plays over to it
+    scenarios.listeners.append(lambda scenario_id, scenario: relink_scenario(tracked, scenario))
+
+    leases = SQLiteLeases(conn) if shared else MemoryLeases()
+    return scenarios, tracked, SQLiteHistoryArchive(conn), leases, sync
+
+
+def worker_count() -> int:
+    """
+    Number of server processes, as uvicorn reads it from WEB_CONCURRENCY
+    """
+    return max(1, int(os.getenv("WEB_CONCURRENCY", "1")))
+
+
+def link_tracked(tracked_scenario: TrackedScenario, scenarios: MutableMapping[str, Scenario]):
+    """
+    Point a loaded tracked scenario at the stored Scenario and Play objects
+
+    At runtime a tracked play shares its Scenario and Play with scenarios_db,
+    so play updates show up in both; records loaded from disk are separate
+    copies until they are linked again.
+    """
+    scenario = scenarios.get(tracked_scenario.scenario.id)
+    if scenario is None:
+        return
+
+    for play in scenario.plays:
+        if play.id == tracked_scenario.play.id:
+            # The tracked copy was saved last, so it has the latest play state
+            if play.confidence_score != tracked_scenario.play.confidence_score:
+                play.confidence_score = tracked_scenario.play.confidence_score
+                scenarios.snapshots.bump(scenario.id)
+            tracked_scenario.play = play
+            break
+    tracked_scenario.scenario = scenario
+
+
+def relink_scenario(tracked: SQLiteTable, scenario: Optional[Scenario]):
+    """
+    Point the tracked plays of a scenario at its current Scenario and Play objects
+
+    Unlike link_tracked, the scenario is the newer copy here, so its play
+    state wins. Without this, a reloaded scenario and its tracked plays
+    drift apart, and saving the scenario after a refresh drops the update.
+    """
+    if scenario is None:
+        return
+
+    plays = {play.id: play for play in scenario.plays}
+    for key, tracked_scenario in list(tracked._cache.items()):
+        if tracked_scenario.scenario.id != scenario.id or tracked_scenario.scenario is scenario:
+            continue
+        tracked_scenario.scenario = scenario
+        tracked_scenario.play = plays.get(tracked_scenario.play.id, tracked_scenario.play)
+        tracked._notify(key, tracked_scenario)
+
+
+def storage_info(table) -> Dict:
+    if isinstance(table, SQLiteTable):
+        path = table.conn.execute("PRAGMA database_list").fetchone()[2]
+        info = {"backend": "sqlite", "path": path, "workers": worker_count()}
+        if table.sync is not None:
+            info["sync"] = table.sync.stats()
+        return info
+    return {"backend": "memory"}
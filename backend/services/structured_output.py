@@ -0,0 +1,163 @@
+import json
+import re
+from typing import Any, Dict, List, Literal, Optional
+
+from pydantic import BaseModel, Field, TypeAdapter, create_model, field_validator
+
+from models.schemas import Play
+
+# Where the JSON starts: after an opening markdown fence if there is one
+FENCE_PATTERN = re.compile(r"```[a-zA-Z]*[ \t]*\n?")
+JSON_START_PATTERN = re.compile(r"[\[{]")
+
+# Opening brackets tried before giving up, so stray prose brackets can't make extraction quadratic
+MAX_JSON_CANDIDATES = 8
+JSON_TYPE_NAMES = {dict: "object", list: "array"}
+
+_decoder = json.JSONDecoder()
+
+
+class JSONExtractionError(ValueError):
+    pass
+
+
+def extract_json(text: str, expected_type: Optional[type] = None) -> Any:
+    """
+    Decode the outermost JSON object/array in `text` in one pass
+
+    Fences, prose before the JSON and anything after it are ignored. Brackets
+    up to where a failed decode stopped belong to that value, so a truncated
+    response fails with its own decode error instead of yielding one of its
+    nested fragments. With `expected_type` (dict or list), values of the other
+    type are skipped as well.
+    """
+    fence = FENCE_PATTERN.search(text)
+    start = fence.end() if fence else 0
+
+    first_error: Optional[json.JSONDecodeError] = None
+    wrong_type: Optional[type] = None
+    candidates = 0
+    for match in JSON_START_PATTERN.finditer(text, start):
+        if match.start() < start:
+            continue
+        if candidates == MAX_JSON_CANDIDATES:
+            break
+        candidates += 1
+        try:
+            value, start = _decoder.raw_decode(text, match.start())
+        except json.JSONDecodeError as e:
+            first_error = first_error or e
+            # An unterminated string runs to the end of the text, brackets in it included
+            start = len(text) if e.msg.startswith("Unterminated string") else max(e.pos, match.start() + 1)
+            continue
+        if expected_type is None or isinstance(value, expected_type):
+            return value
+        wrong_type = wrong_type or type(value)
+
+    if first_error is None and wrong_type is not None:
+        raise JSONExtractionError(f"expected a JSON {JSON_TYPE_NAMES[expected_type]}, got a JSON {JSON_TYPE_NAMES[wrong_type]}")
+    if first_error is None:
+        raise JSONExtractionError("response contains no JSON object or array")
+    raise JSONExtractionError(
+        f"invalid JSON: {first_error.msg}: line {first_error.lineno} column {first_error.colno} (char {first_error.pos})"
+    )
+
+
+# Response shapes, derived from the API models the results end up in
+
+PlayOutput = create_model(
+    "PlayOutput",
+    **{name: (field.annotation, field) for name, field in Play.model_fields.items() if name != "id"}
+)
+
+
+# The part of an Alert the model fills in
+class AlertOutput(BaseModel):
+    message: str = Field(..., min_length=1)
+    severity: Literal["info", "warning", "critical"] = "info"
+
+    @field_validator("severity", mode="before")
+    @classmethod
+    def _normalize_severity(cls, value):
+        return value.strip().lower() if isinstance(value, str) else value
+
+
+class ScenarioAnalysisOutput(BaseModel):
+    interpreted_scenario: str
+    plays: List[PlayOutput] = Field(..., min_length=1)
+
+
+class ScenarioBatchItemOutput(ScenarioAnalysisOutput):
+    scenario_index: int
+
+
+class PlayUpdateOutput(BaseModel):
+    should_modify: bool
+    modifications: str = ""
+    updated_confidence_score: float = Field(..., ge=0.0, le=1.0)
+    alerts: List[str] = []
+
+
+class RefreshOutput(PlayUpdateOutput):
+    alerts: List[AlertOutput] = []
+
+
+# JSON Schema keywords Gemini's response_schema (an OpenAPI subset) understands
+GEMINI_SCHEMA_KEYS = {"type", "properties", "required", "items", "enum", "description", "format", "nullable"}
+
+
+def gemini_schema(schema: Dict, defs: Optional[Dict] = None) -> Dict:
+    """
+    Inline $refs and drop the keywords Gemini rejects (titles, defaults, bounds)
+    """
+    defs = schema.get("$defs", {}) if defs is None else defs
+    if "$ref" in schema:
+        return gemini_schema(defs[schema["$ref"].rsplit("/", 1)[1]], defs)
+    if "anyOf" in schema:
+        options = [option for option in schema["anyOf"] if option.get("type") != "null"]
+        return {**gemini_schema(options[0], defs), "nullable": True}
+    if "const" in schema:
+        schema = {**schema, "enum": [schema["const"]]}
+
+    result = {}
+    for key, value in schema.items():
+        if key not in GEMINI_SCHEMA_KEYS:
+            continue
+        if key == "properties":
+            value = {name: gemini_schema(prop, defs) for name, prop in value.items()}
+        elif key == "items":
+            value = gemini_schema(value, defs)
+        result[key] = value
+    return result
+
+
+class OutputSpec:
+    """
+    The expected shape of one kind of response: its JSON schema for
+    generation and repair prompts, and the validator for what comes back
+
+    `validate_as` loosens validation where the caller checks parts of the
+    result itself (batch items that fail fall back to their own call).
+    """
+
+    def __init__(self, name: str, output_type: Any, validate_as: Any = None):
+        self.name = name
+        self.json_schema = TypeAdapter(output_type).json_schema()
+        self.json_type = list if self.json_schema.get("type") == "array" else dict
+        self.response_schema = gemini_schema(self.json_schema)
+        self.schema_text = json.dumps(self.response_schema, separators=(",", ":"))
+        self._adapter = TypeAdapter(validate_as if validate_as is not None else output_type)
+
+    def validate(self, value: Any) -> Any:
+        """
+        Validate and coerce a decoded response into plain JSON values
+        """
+        return self._adapter.dump_python(self._adapter.validate_python(value), mode="json")
+
+
+PLAY_OUTPUT = OutputSpec("play", PlayOutput)
+SCENARIO_OUTPUT = OutputSpec("scenario", ScenarioAnalysisOutput)
+SCENARIO_BATCH_OUTPUT = OutputSpec("scenario_batch", List[ScenarioBatchItemOutput], validate_as=List[Dict[str, Any]])
+PLAY_UPDATE_OUTPUT = OutputSpec("play_update", PlayUpdateOutput)
+ALERTS_OUTPUT = OutputSpec("alerts", List[AlertOutput])
+REFRESH_OUTPUT = OutputSpec("refresh", RefreshOutput)
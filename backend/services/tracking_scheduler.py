@@ -0,0 +1,153 @@
+import asyncio
+import os
+import random
+import time
+from datetime import datetime
+from typing import Awaitable, Callable, Dict, List, Optional
+
+from models.schemas import TrackedScenario
+
+
+class TrackingScheduler:
+    """
+    Background scheduler that periodically refreshes every tracked play
+
+    Plays that track the same instruments are refreshed as one group so a
+    single news pull serves all of them. `select_tracked`, if given, picks
+    which of the tracked plays a pass refreshes (e.g. only those touched by
+    new articles); the rest count as skipped.
+    """
+
+    def __init__(
+        self,
+        list_tracked: Callable[[], Dict[str, TrackedScenario]],
+        refresh_group: Callable[[List[str]], Awaitable[None]],
+        select_tracked: Optional[
+            Callable[[Dict[str, TrackedScenario]], Awaitable[Dict[str, TrackedScenario]]]
+        ] = None,
+    ):
+        self.list_tracked = list_tracked
+        self.refresh_group = refresh_group
+        self.select_tracked = select_tracked
+
+        self.enabled = os.getenv("TRACKING_SCHEDULER_ENABLED", "true").lower() != "false"
+        self.interval_seconds = float(os.getenv("TRACKING_REFRESH_INTERVAL_SECONDS", "900"))
+        self.jitter = float(os.getenv("TRACKING_REFRESH_JITTER", "0.1"))
+        self.max_concurrency = int(os.getenv("TRACKING_REFRESH_CONCURRENCY", "4"))
+
+        self._task: Optional[asyncio.Task] = None
+        self.runs = 0
+        self.queue_depth = 0
+        self.lag_seconds = 0.0
+        self.next_run_at: Optional[datetime] = None
+        self.last_run_started_at: Optional[datetime] = None
+        self.last_run_finished_at: Optional[datetime] = None
+        self.last_run_duration_seconds: Optional[float] = None
+        self.last_run_plays = 0
+        self.last_run_groups = 0
+        self.last_run_skipped = 0
+        self.last_run_errors = 0
+
+    def start(self):
+        if self.enabled and self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        while True:
+            # Jitter each interval so refreshes don't hit the news sources in lockstep
+            delay = self.interval_seconds * (1 + random.uniform(-self.jitter, self.jitter))
+            scheduled_at = time.time() + delay
+            self.next_run_at = datetime.fromtimestamp(scheduled_at)
+
+            await asyncio.sleep(delay)
+            self.lag_seconds = max(0.0, time.time() - scheduled_at)
+
+            try:
+                await self.run_once()
+            except Exception as e:
+                print(f"Error in tracking scheduler: {e}")
+
+    async def run_once(self):
+        """
+        Refresh the tracked plays (those `select_tracked` picks), at most
+        `max_concurrency` groups at a time
+        """
+        self.last_run_started_at = datetime.now()
+        tracked = self.list_tracked()
+        selected = tracked if self.select_tracked is None else await self.select_tracked(tracked)
+        groups = self.group_by_instruments(selected)
+
+        self.last_run_skipped = len(tracked) - len(selected)
+        self.last_run_groups = len(groups)
+        self.last_run_plays = sum(len(keys) for keys in groups)
+        self.last_run_errors = 0
+        self.queue_depth = self.last_run_plays
+        started = time.perf_counter()
+
+        semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        async def run_group(tracking_keys: List[str]):
+            async with semaphore:
+                try:
+                    await self.refresh_group(tracking_keys)
+                except Exception as e:
+                    self.last_run_errors += 1
+                    print(f"Error refreshing tracked plays {tracking_keys}: {e}")
+                finally:
+                    self.queue_depth -= len(tracking_keys)
+
+        await asyncio.gather(*[run_group(keys) for keys in groups])
+
+        self.runs += 1
+        self.last_run_finished_at = datetime.now()
+        self.last_run_duration_seconds = time.perf_counter() - started
+
+    @staticmethod
+    def group_by_instruments(tracked: Dict[str, TrackedScenario]) -> List[List[str]]:
+        """
+        Group tracking keys by the set of instruments their plays reference
+        """
+        groups: Dict[tuple, List[str]] = {}
+        for tracking_key, tracked_scenario in tracked.items():
+            instruments = tuple(sorted({i.upper() for i in tracked_scenario.play.instruments}))
+            groups.setdefault(instruments, []).append(tracking_key)
+
+        return list(groups.values())
+
+    def status(self) -> Dict:
+        tracked = self.list_tracked()
+        oldest_update = min((t.last_updated for t in tracked.values()), default=None)
+
+        return {
+            "enabled": self.enabled,
+            "running": self._task is not None and not self._task.done(),
+            "interval_seconds": self.interval_seconds,
+            "jitter": self.jitter,
+            "max_concurrency": self.max_concurrency,
+            "runs": self.runs,
+            "queue_depth": self.queue_depth,
+            "lag_seconds": round(self.lag_seconds, 3),
+            "max_staleness_seconds": (
+                round((datetime.now() - oldest_update).total_seconds(), 3) if oldest_update else None
+            ),
+            "tracked_plays": len(tracked),
+            "next_run_at": self.next_run_at.isoformat() if self.next_run_at else None,
+            "last_run": {
+                "started_at": self.last_run_started_at.isoformat() if self.last_run_started_at else None,
+                "finished_at": self.last_run_finished_at.isoformat() if self.last_run_finished_at else None,
+                "duration_seconds": self.last_run_duration_seconds,
+                "groups": self.last_run_groups,
+                "plays": self.last_run_plays,
+                "skipped": self.last_run_skipped,
+                "errors": self.last_run_errors,
+            },
+        }
@@ -0,0 +1,57 @@
+from datetime import datetime
+from typing import List, Optional
+
+import pytest
+
+from models.schemas import AssetClass, Play, Scenario, TrackedScenario
+
+
+def _make_play(play_id: str = "p1", instruments: Optional[List[str]] = None, confidence: float = 0.5,
+               action: str = "Buy") -> Play:
+    return Play(
+        id=play_id,
+        asset_class=AssetClass.EQUITY,
+        title="Long SPY",
+        description="Buy the dip",
+        action=action,
+        instruments=["SPY"] if instruments is None else instruments,
+        rationale="Oversold",
+        risk_level="Medium",
+        time_horizon="Short-term",
+        confidence_score=confidence,
+    )
+
+
+def _make_scenario(scenario_id: str = "s", plays: Optional[List[Play]] = None) -> Scenario:
+    return Scenario(
+        id=scenario_id,
+        description="S&P 500 down 5%",
+        interpreted_scenario="Equities sell off",
+        plays=[_make_play("p1"), _make_play("p2")] if plays is None else plays,
+        created_at=datetime(2024, 1, 1),
+    )
+
+
+def _make_tracked(scenario: Scenario, play_id: str) -> TrackedScenario:
+    play = next(play for play in scenario.plays if play.id == play_id)
+    return TrackedScenario(
+        scenario=scenario, play=play, news_articles=[], alerts=[], last_updated=datetime.now(), play_updates=[]
+    )
+
+
+@pytest.fixture
+def make_play():
+    return _make_play
+
+
+@pytest.fixture
+def make_scenario():
+    return _make_scenario
+
+
+@pytest.fixture
+def make_tracked():
+    """
+    A tracked scenario for one of the scenario's plays, sharing the scenario's objects
+    """
+    return _make_tracked
@@ -0,0 +1,73 @@
+from datetime import datetime, timedelta
+from typing import Optional
+
+import pytest
+
+from models.schemas import Alert
+from services.alert_history import AlertHistory
+from services.storage import MemoryHistoryArchive
+
+START = datetime(2024, 1, 1, 9, 0)
+
+
+def make_alert(n: int, message: Optional[str] = None, severity: str = "info") -> Alert:
+    return Alert(
+        id=f"a{n}", scenario_id="s", play_id="p1", message=message or f"Alert {n}",
+        severity=severity, created_at=START + timedelta(minutes=n)
+    )
+
+
+@pytest.fixture
+def history(monkeypatch):
+    monkeypatch.setenv("ALERT_HISTORY_SIZE", "3")
+    monkeypatch.setenv("PLAY_UPDATE_HISTORY_SIZE", "2")
+    return AlertHistory(MemoryHistoryArchive())
+
+
+@pytest.fixture
+def tracked(make_scenario, make_tracked):
+    return make_tracked(make_scenario(), "p1")
+
+
+def test_repeated_alert_bumps_the_existing_one(history, tracked):
+    history.add_alerts("s_p1", tracked, [make_alert(1, "Yields spike")])
+
+    new, repeated = history.add_alerts("s_p1", tracked, [
+        make_alert(2, "  yields SPIKE!"), make_alert(3, "Yields spike", severity="critical")
+    ])
+    assert [alert.id for alert in new] == ["a3"]
+    assert [alert.id for alert in repeated] == ["a1"]
+    assert tracked.alerts[0].occurrences == 2
+    assert tracked.alerts[0].last_seen_at == START + timedelta(minutes=2)
+    assert history.stats()["deduplicated"] == 1
+
+
+def test_oldest_alerts_move_to_the_archive_and_stay_queryable(history, tracked):
+    history.add_alerts("s_p1", tracked, [make_alert(n) for n in range(5)])
+
+    assert [alert.id for alert in tracked.alerts] == ["a2", "a3", "a4"]
+    assert history.stats()["archived"] == 2
+    assert [alert.id for alert in history.alerts("s_p1", tracked)] == ["a4", "a3", "a2", "a1", "a0"]
+    assert [alert.id for alert in history.alerts("s_p1", tracked, since=START + timedelta(minutes=1), limit=3)] == [
+        "a4", "a3", "a2"
+    ]
+    assert [alert.id for alert in history.alerts("s_p1", tracked, until=START + timedelta(minutes=1))] == ["a1", "a0"]
+
+
+def test_severity_filter_covers_archived_alerts(history, tracked):
+    alerts = [make_alert(0, severity="critical")] + [make_alert(n) for n in range(1, 5)]
+    history.add_alerts("s_p1", tracked, alerts)
+
+    assert [alert.id for alert in history.alerts("s_p1", tracked, severity="critical")] == ["a0"]
+
+
+def test_play_updates_are_bounded_and_archived(history, tracked):
+    for n in range(4):
+        history.add_play_update("s_p1", tracked, f"Update {n}")
+
+    assert len(tracked.play_updates) == 2
+    updates = history.play_updates("s_p1", tracked)
+    assert [entry.split("] ")[1] for entry in updates] == ["Update 3", "Update 2", "Update 1", "Update 0"]
+
+    history.delete("s_p1")
+    assert len(history.play_updates("s_p1", tracked)) == 2
@@ -0,0 +1,74 @@
+import asyncio
+
+import pytest
+
+from services.analysis_cache import AnalysisCache, normalize_scenario
+
+
+@pytest.mark.parametrize("description", ["S&P 500 down 5%", "s&p down 5 %", "  SPX  down 5 percent!", "S and P-500 down 5%"])
+def test_phrasings_share_a_key(description):
+    assert normalize_scenario(description) == "s&p down 5%"
+
+
+def test_cached_values_are_copies():
+    cache = AnalysisCache()
+    cache.put("Oil spikes", {"plays": [1]})
+
+    cache.get("oil spikes")["plays"].append(2)
+    assert cache.get("Oil spikes.") == {"plays": [1]}
+    assert cache.stats()["hits"] == 2
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnalysisCache(max_size=2)
+    cache.put("a", {"n": 1})
+    cache.put("b", {"n": 2})
+    cache.get("a")
+    cache.put("c", {"n": 3})
+
+    assert cache.get("b") is None
+    assert cache.get("a") == {"n": 1} and cache.get("c") == {"n": 3}
+    assert cache.stats()["evictions"] == 1
+
+
+def test_expired_entry_is_dropped():
+    cache = AnalysisCache(ttl_seconds=0)
+    cache.put("a", {"n": 1})
+
+    assert cache.get("a") is None
+    assert cache.stats()["size"] == 0
+
+
+def test_concurrent_callers_share_one_computation():
+    calls = []
+
+    async def compute():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"plays": []}
+
+    async def run():
+        cache = AnalysisCache()
+        results = await asyncio.gather(*[cache.get_or_compute("Fed cuts rates", compute) for _ in range(5)])
+        again = await cache.get_or_compute("fed cuts rates.", compute)
+        return cache, results, again
+
+    cache, results, again = asyncio.run(run())
+    assert len(calls) == 1
+    assert results == [{"plays": []}] * 5 and again == {"plays": []}
+    assert cache.stats()["misses"] == 1 and cache.stats()["coalesced"] == 4 and cache.stats()["hits"] == 1
+
+
+def test_failed_computation_is_not_cached():
+    async def fail():
+        raise RuntimeError("LLM down")
+
+    async def run():
+        cache = AnalysisCache()
+        with pytest.raises(RuntimeError):
+            await cache.get_or_compute("Fed cuts rates", fail)
+        return cache
+
+    cache = asyncio.run(run())
+    assert cache.get("Fed cuts rates") is None
+    assert cache.stats()["in_flight"] == 0
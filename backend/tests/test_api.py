@@ -0,0 +1,81 @@
+import importlib
+
+import pytest
+from fastapi.testclient import TestClient
+
+
+@pytest.fixture(scope="module")
+def main():
+    """
+    The app on in-memory storage; the client doesn't run the lifespan, so no background work starts
+    """
+    with pytest.MonkeyPatch.context() as patch:
+        patch.setenv("STORAGE_BACKEND", "memory")
+        patch.setenv("STORAGE_SHARED", "false")
+        patch.setenv("GEMINI_API_KEY", "")
+        yield importlib.import_module("main")
+
+
+@pytest.fixture
+def client(main):
+    yield TestClient(main.app)
+    for scenario_id in list(main.scenarios_db):
+        del main.scenarios_db[scenario_id]
+
+
+def test_unchanged_scenario_answers_304(main, client, make_scenario):
+    main.scenarios_db["s"] = make_scenario("s")
+
+    first = client.get("/scenarios/s")
+    assert first.status_code == 200
+    assert first.headers["Cache-Control"] == "no-cache"
+
+    cached = client.get("/scenarios/s", headers={"If-None-Match": first.headers["ETag"]})
+    assert cached.status_code == 304
+    assert cached.content == b""
+
+    main.scenarios_db["s"].description = "S&P 500 down 10%"
+    main.scenarios_db.save("s")
+    changed = client.get("/scenarios/s", headers={"If-None-Match": first.headers["ETag"]})
+    assert changed.status_code == 200
+    assert changed.headers["ETag"] != first.headers["ETag"]
+    assert changed.json()["description"] == "S&P 500 down 10%"
+
+
+def test_page_etag_follows_its_records(main, client, make_scenario):
+    main.scenarios_db["a"] = make_scenario("a")
+    main.scenarios_db["b"] = make_scenario("b")
+
+    page = client.get("/scenarios")
+    assert [scenario["id"] for scenario in page.json()] == ["b", "a"]
+    assert client.get("/scenarios", headers={"If-None-Match": page.headers["ETag"]}).status_code == 304
+
+    main.scenarios_db["a"].is_tracking = True
+    main.scenarios_db.save("a")
+    assert client.get("/scenarios", headers={"If-None-Match": page.headers["ETag"]}).status_code == 200
+
+
+def test_projected_page_skips_full_snapshots(main, client, make_scenario):
+    main.scenarios_db["s"] = make_scenario("s")
+    misses = main.scenarios_db.snapshots.stats["misses"]
+
+    page = client.get("/scenarios", params={"fields": "id,description"})
+    assert page.json() == [{"id": "s", "description": "S&P 500 down 5%"}]
+    assert main.scenarios_db.snapshots.stats["misses"] == misses
+    assert page.headers["ETag"] != client.get("/scenarios").headers["ETag"]
+
+    headers = {"If-None-Match": page.headers["ETag"]}
+    assert client.get("/scenarios", params={"fields": "id,description"}, headers=headers).status_code == 304
+    assert client.get("/scenarios", params={"fields": "id"}, headers=headers).status_code == 200
+
+    main.scenarios_db.save("s")
+    assert client.get("/scenarios", params={"fields": "id,description"}, headers=headers).status_code == 200
+
+
+def test_recreated_record_gets_a_new_etag(main, client, make_scenario):
+    main.scenarios_db["s"] = make_scenario("s")
+    page = client.get("/scenarios", params={"fields": "id"})
+
+    del main.scenarios_db["s"]
+    main.scenarios_db["s"] = make_scenario("s")
+    assert client.get("/scenarios", params={"fields": "id"}, headers={"If-None-Match": page.headers["ETag"]}).status_code == 200
@@ -0,0 +1,55 @@
+import pytest
+
+from services.change_detection import ChangeDetector, article_fingerprint
+
+
+def article(title: str, relevance: float = 0.5, url: str = "https://news.example/a") -> dict:
+    return {"title": title, "url": url, "relevance_score": relevance}
+
+
+@pytest.fixture
+def detector(monkeypatch):
+    monkeypatch.setenv("TRACKING_MIN_NEW_ARTICLE_RELEVANCE", "0.2")
+    monkeypatch.setenv("TRACKING_SEEN_ARTICLES_SIZE", "3")
+    return ChangeDetector()
+
+
+@pytest.fixture
+def tracked(make_scenario, make_tracked):
+    return make_tracked(make_scenario(), "p1")
+
+
+def test_fingerprint_ignores_case_and_whitespace_but_not_new_headlines():
+    assert article_fingerprint(article("Fed  cuts rates")) == article_fingerprint(article("fed cuts rates "))
+    assert article_fingerprint(article("Fed cuts rates")) != article_fingerprint(article("Fed holds rates"))
+
+
+def test_only_unseen_relevant_articles_are_material(detector, tracked):
+    seen = article("Fed cuts rates", url="https://news.example/1")
+    detector.mark_seen(tracked, [seen])
+
+    material = detector.material_changes(tracked, [
+        seen,
+        article("Oil jumps", relevance=0.19, url="https://news.example/2"),
+        article("Yields spike", relevance=0.2, url="https://news.example/3"),
+    ])
+    assert [a["title"] for a in material] == ["Yields spike"]
+
+
+def test_seen_fingerprints_are_bounded_oldest_first(detector, tracked):
+    articles = [article(f"Story {n}", url=f"https://news.example/{n}") for n in range(5)]
+    detector.mark_seen(tracked, articles)
+    detector.mark_seen(tracked, articles[4:])
+
+    assert tracked.seen_article_fingerprints == [article_fingerprint(a) for a in articles[2:]]
+    assert detector.material_changes(tracked, articles[:1]) == articles[:1]
+
+
+def test_skips_are_counted(detector, tracked):
+    detector.material_changes(tracked, [])
+    detector.material_changes(tracked, [])
+    detector.record_skip(llm_calls=1)
+
+    stats = detector.stats()
+    assert stats["checked"] == 2 and stats["skipped"] == 1 and stats["skip_rate"] == 0.5
+    assert stats["min_relevance"] == 0.2
@@ -0,0 +1,48 @@
+import numpy as np
+
+from services.dedup import NearDuplicateDetector
+from services.relevance_index import tokenize
+
+
+def test_signature_agreement_estimates_token_overlap():
+    detector = NearDuplicateDetector()
+    base = [f"word{n}" for n in range(40)]
+    same = detector.signature(list(reversed(base)))
+    half = detector.signature(base[:20] + [f"other{n}" for n in range(20)])
+    unrelated = detector.signature([f"other{n}" for n in range(40)])
+
+    signature = detector.signature(base)
+    assert np.array_equal(signature, same)
+    # Jaccard of `half` with `base` is 1/3
+    assert 0.1 <= np.mean(signature == half) <= 0.6
+    assert np.mean(signature == unrelated) <= 0.1
+    assert detector.signature([]) is None
+
+
+def test_rewritten_headlines_collapse_into_the_best_ranked_copy():
+    articles = [
+        {"title": "Fed cuts interest rates by half a point as inflation cools", "url": "a", "source": "Reuters"},
+        {"title": "Oil prices jump after OPEC announces supply cuts", "url": "b", "source": "Reuters"},
+        {"title": "Fed cuts interest rates by half a point, inflation cools", "url": "c", "source": "Bloomberg"},
+        {"title": "Fed cuts interest rates by half a point as inflation cools", "url": "d", "source": "Reuters"},
+    ]
+    deduped = NearDuplicateDetector().dedupe(articles)
+
+    assert [(article["url"], article["source_count"]) for article in deduped] == [("a", 2), ("b", 1)]
+
+
+def test_clusters_keep_articles_without_tokens_apart():
+    detector = NearDuplicateDetector()
+    signature = detector.signature(tokenize("Stocks rally on earnings"))
+
+    assert detector.clusters([None, signature, None, signature]) == [[0], [1, 3], [2]]
+
+
+def test_signatures_are_memoized_by_url_and_bounded():
+    detector = NearDuplicateDetector(cache_size=2)
+    first = detector.article_signature({"title": "Stocks rally", "url": "a"})
+
+    assert detector.article_signature({"title": "Different title", "url": "a"}) is first
+    detector.article_signature({"title": "Bonds slip", "url": "b"})
+    detector.article_signature({"title": "Gold climbs", "url": "c"})
+    assert list(detector._signatures) == ["b", "c"]
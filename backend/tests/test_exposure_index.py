@@ -0,0 +1,43 @@
+import pytest
+
+from services.exposure_index import ExposureIndex
+
+
+@pytest.fixture
+def track(make_play, make_scenario, make_tracked):
+    def track(index: ExposureIndex, play_id: str, instruments):
+        scenario = make_scenario(plays=[make_play(play_id, instruments)])
+        index.tracked_changed(f"s_{play_id}", make_tracked(scenario, play_id))
+    return track
+
+
+def test_tickers_that_are_stopwords_are_matched(track):
+    index = ExposureIndex()
+    track(index, "allstate", ["ALL"])
+    track(index, "servicenow", ["NOW"])
+    track(index, "treasuries", ["TLT"])
+
+    touched = index.touched([{"title": "Allstate (ALL) beats estimates", "summary": "Shares rose on Friday."}])
+
+    assert touched == {"ALL": {"s_allstate"}}
+
+
+def test_names_need_every_word(track):
+    index = ExposureIndex()
+    track(index, "index", ["S&P 500"])
+
+    assert index.touched([{"title": "Company cuts 500 jobs", "summary": ""}]) == {}
+    assert index.touched([{"title": "The S&P 500 closes at a record", "summary": ""}]) == {"S&P 500": {"s_index"}}
+
+
+def test_untracked_instruments_are_forgotten(track):
+    index = ExposureIndex()
+    track(index, "first", ["TLT", "GLD"])
+    track(index, "second", ["TLT"])
+
+    index.tracked_changed("s_first", None)
+    assert index.touched([{"title": "GLD and TLT rally", "summary": ""}]) == {"TLT": {"s_second"}}
+    assert set(index._terms) == {"TLT"}
+
+    index.tracked_changed("s_second", None)
+    assert index._terms == {} and index._by_first_term == {}
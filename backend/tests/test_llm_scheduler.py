@@ -0,0 +1,115 @@
+import asyncio
+
+import pytest
+
+from services.llm_scheduler import LLMOverloadedError, LLMScheduler, Priority
+
+
+@pytest.fixture
+def scheduler(monkeypatch):
+    """
+    A scheduler with one slot and no rate limit, unless a test overrides them
+    """
+    monkeypatch.setenv("GEMINI_MAX_CONCURRENCY", "1")
+    monkeypatch.setenv("LLM_RATE_LIMIT_PER_MINUTE", "0")
+    monkeypatch.setenv("LLM_INTERACTIVE_RESERVE", "0")
+    monkeypatch.delenv("WEB_CONCURRENCY", raising=False)
+    return LLMScheduler
+
+
+async def call(scheduler: LLMScheduler, priority: Priority, order: list, name: str):
+    started = await scheduler.acquire(priority)
+    order.append(name)
+    await asyncio.sleep(0)
+    scheduler.release(started)
+
+
+def test_interactive_calls_go_ahead_of_queued_refreshes(scheduler):
+    async def run():
+        llm = scheduler()
+        order = []
+        holding = await llm.acquire(Priority.REFRESH)
+        calls = [
+            asyncio.create_task(call(llm, Priority.REFRESH, order, "refresh 1")),
+            asyncio.create_task(call(llm, Priority.REFRESH, order, "refresh 2")),
+        ]
+        await asyncio.sleep(0)
+        calls.append(asyncio.create_task(call(llm, Priority.INTERACTIVE, order, "interactive")))
+        await asyncio.sleep(0)
+        assert llm.stats()["queued"] == {"interactive": 1, "refresh": 2}
+
+        llm.release(holding)
+        await asyncio.gather(*calls)
+        return order, llm.stats()
+
+    order, stats = asyncio.run(run())
+    assert order == ["interactive", "refresh 1", "refresh 2"]
+    assert stats["in_flight"] == 0
+    assert stats["admitted"] == {"interactive": 1, "refresh": 3}
+
+
+def test_full_queue_is_shed_with_503(scheduler, monkeypatch):
+    monkeypatch.setenv("LLM_QUEUE_LIMIT_REFRESH", "1")
+
+    async def run():
+        llm = scheduler()
+        holding = await llm.acquire(Priority.REFRESH)
+        queued = asyncio.create_task(call(llm, Priority.REFRESH, [], "refresh 1"))
+        await asyncio.sleep(0)
+
+        with pytest.raises(LLMOverloadedError) as shed:
+            await llm.acquire(Priority.REFRESH)
+        # Interactive calls have a queue of their own
+        interactive = asyncio.create_task(call(llm, Priority.INTERACTIVE, [], "interactive"))
+        await asyncio.sleep(0)
+
+        llm.release(holding)
+        await asyncio.gather(queued, interactive)
+        return shed.value, llm.stats()
+
+    error, stats = asyncio.run(run())
+    assert error.status_code == 503
+    assert error.retry_after >= 1
+    assert stats["rejected"] == {"refresh_queue_full": 1}
+
+
+def test_call_that_would_wait_too_long_for_quota_is_shed_with_429(scheduler, monkeypatch):
+    monkeypatch.setenv("LLM_RATE_LIMIT_PER_MINUTE", "6")
+    monkeypatch.setenv("LLM_RATE_LIMIT_BURST", "1")
+    monkeypatch.setenv("LLM_MAX_WAIT_INTERACTIVE_SECONDS", "1")
+    monkeypatch.setenv("GEMINI_MAX_CONCURRENCY", "4")
+
+    async def run():
+        llm = scheduler()
+        llm.release(await llm.acquire(Priority.INTERACTIVE))
+        with pytest.raises(LLMOverloadedError) as shed:
+            await llm.acquire(Priority.INTERACTIVE)
+        return shed.value, llm.stats()
+
+    error, stats = asyncio.run(run())
+    assert error.status_code == 429
+    assert error.retry_after > 5
+    assert stats["rejected"] == {"interactive_rate_limited": 1}
+
+
+def test_refreshes_leave_the_reserved_slot_to_interactive_calls(scheduler, monkeypatch):
+    monkeypatch.setenv("GEMINI_MAX_CONCURRENCY", "2")
+    monkeypatch.setenv("LLM_INTERACTIVE_RESERVE", "1")
+
+    async def run():
+        llm = scheduler()
+        holding = await llm.acquire(Priority.REFRESH)
+        waiting = asyncio.create_task(llm.acquire(Priority.REFRESH))
+        await asyncio.sleep(0)
+        assert not waiting.done()
+
+        # The second slot is free for an interactive call straight away
+        interactive = await asyncio.wait_for(llm.acquire(Priority.INTERACTIVE), timeout=1)
+        llm.release(interactive)
+        llm.release(holding)
+        llm.release(await waiting)
+        return llm.stats()
+
+    stats = asyncio.run(run())
+    assert stats["admitted"] == {"interactive": 1, "refresh": 2}
+    assert stats["in_flight"] == 0
@@ -0,0 +1,17 @@
+from services.news_service import NEWS_API_QUERY_MAX_LENGTH, newsapi_query
+
+
+def test_query_uses_shared_instruments_not_descriptions():
+    scenarios = ["Fed cuts rates by 50bp", "Inflation surprises to the upside"]
+    assert newsapi_query(scenarios, ["TLT", "S&P 500", "TLT"]) == 'TLT OR "S&P 500"'
+
+
+def test_query_is_capped():
+    instruments = [f"TICKER{i}" for i in range(200)]
+    query = newsapi_query(["Rates fall"], instruments)
+    assert query.startswith("TICKER0 OR TICKER1")
+    assert len(query) <= NEWS_API_QUERY_MAX_LENGTH
+
+
+def test_query_without_instruments_uses_scenario_keywords():
+    assert newsapi_query(["Oil spikes on supply cuts"], []) == "oil OR spikes OR supply OR cuts"
@@ -0,0 +1,53 @@
+import pytest
+
+from services.prompt_builder import PromptBuilder, clean_summary, estimate_tokens
+
+
+@pytest.fixture
+def builder(monkeypatch):
+    monkeypatch.setenv("PROMPT_NEWS_TOKEN_BUDGET", "600")
+    monkeypatch.setenv("PROMPT_SUMMARY_MAX_CHARS", "40")
+    return PromptBuilder()
+
+
+def test_summary_is_cleaned_and_cut_at_a_word():
+    assert clean_summary("<p>Fed&nbsp;cuts   <b>rates</b></p>", 100) == "Fed cuts rates"
+    assert clean_summary("Oil jumps after supply cuts, traders say", 24) == "Oil jumps after supply…"
+
+
+def test_news_is_ranked_and_deduplicated(builder):
+    news = builder.pack_news([
+        {"title": "Oil jumps", "summary": "Supply cuts", "relevance_score": 0.2},
+        {"title": "Fed cuts rates", "summary": "Fed cuts rates", "relevance_score": 0.9, "source_count": 3},
+        {"title": "fed cuts  rates", "summary": "Again", "relevance_score": 0.5},
+        {"title": "", "summary": "", "relevance_score": 1.0},
+    ])
+    assert news.splitlines() == ["- Fed cuts rates (3 sources)", "- Oil jumps: Supply cuts"]
+
+
+def test_articles_that_overflow_the_budget_are_skipped_for_shorter_ones(builder):
+    long_line = {"title": "A" * 80, "relevance_score": 0.9}
+    short_line = {"title": "Short one", "relevance_score": 0.1}
+    budget = estimate_tokens("- Short one") + 1
+
+    assert builder.pack_news([long_line, short_line], budget=budget) == "- Short one"
+    assert builder.pack_news([long_line], budget=budget) == "- No recent news"
+
+
+def test_packed_news_stays_within_the_budget(builder):
+    articles = [{"title": f"Headline number {n}", "summary": "x" * 30, "relevance_score": n / 100} for n in range(100)]
+    news = builder.pack_news(articles, budget=50)
+
+    assert sum(estimate_tokens(line) + 1 for line in news.splitlines()) <= 50
+    assert news.splitlines()[0].startswith("- Headline number 99")
+
+
+def test_alerts_prompt_leaves_summaries_out(builder):
+    play = {
+        "asset_class": "equity", "title": "Long SPY", "action": "Buy", "instruments": ["SPY", "QQQ"],
+        "rationale": "Oversold", "risk_level": "Medium",
+    }
+    prompt = builder.alerts("S&P 500 down 5%", play, [{"title": "Stocks rebound", "summary": "Buyers return"}])
+
+    assert "Play: Long SPY - Buy SPY, QQQ" in prompt
+    assert "- Stocks rebound\n" in prompt and "Buyers return" not in prompt
@@ -0,0 +1,52 @@
+from services.relevance_index import ArticleIndex, tokenize
+
+
+def make_index() -> ArticleIndex:
+    index = ArticleIndex()
+    index.add("fed", tokenize("Fed cuts rates as inflation cools"))
+    index.add("oil", tokenize("Oil prices jump after supply cuts"))
+    index.add("tech", tokenize("Tech stocks rally on earnings"))
+    return index
+
+
+def test_tokenize_drops_stopwords_unless_kept():
+    assert tokenize("The S&P 500 is up") == ["s&p", "500", "up"]
+    assert tokenize("ALL and NOW", keep_stopwords=True) == ["all", "and", "now"]
+
+
+def test_scores_only_matching_articles_and_favors_rare_terms():
+    scores = make_index().score(tokenize("Fed rate cuts"))
+
+    assert set(scores) == {"fed", "oil"}
+    # "fed" is in one article, "cuts" in two: the article with both ranks first
+    assert scores["fed"] > scores["oil"] > 0
+
+
+def test_score_many_matches_single_queries():
+    index = make_index()
+    queries = [tokenize("oil supply"), tokenize("tech earnings rally"), tokenize("gold")]
+
+    batch = index.score_many(queries)
+    assert batch == [index.score(query) for query in queries]
+    assert batch[2] == {}
+
+
+def test_scores_can_be_restricted_to_some_articles():
+    assert set(make_index().score(tokenize("cuts"), doc_ids=["oil"])) == {"oil"}
+
+
+def test_add_is_idempotent():
+    index = make_index()
+    assert not index.add("fed", tokenize("Something else entirely"))
+    assert len(index) == 3
+
+
+def test_retain_drops_other_articles_and_their_postings():
+    index = make_index()
+    idf_before = index.idf("jump")
+
+    index.retain(["oil", "tech"])
+    assert "fed" not in index and len(index) == 2
+    assert set(index.score(tokenize("fed cuts"))) == {"oil"}
+    # Document frequencies are recomputed: one article in two is less rare than one in three
+    assert index.idf("jump") < idf_before
@@ -0,0 +1,27 @@
+from datetime import datetime
+
+import pytest
+from pydantic import ValidationError
+
+from models.schemas import SentimentRequest
+from services.sentiment_engine import SentimentEngine
+
+
+def test_timeseries_only_allocates_buckets_with_articles():
+    articles = [
+        {"title": "Stocks rally on strong earnings", "published_at": datetime(1, 1, 2)},
+        {"title": "Stocks plunge as losses mount", "published_at": datetime(2020, 1, 1)},
+        {"title": "Stocks plunge again", "published_at": datetime(2020, 1, 1, 0, 0, 30)},
+    ]
+    timeseries = SentimentEngine().analyze(articles, [], bucket_minutes=1, window=6)["timeseries"]
+
+    assert [bucket["articles"] for bucket in timeseries] == [1, 2]
+    assert timeseries[0]["score"] > 0 > timeseries[1]["score"]
+    assert timeseries[1]["timestamp"].startswith("2020-01-01T00:00:00")
+
+
+def test_request_rejects_implausible_dates():
+    with pytest.raises(ValidationError, match="published_at"):
+        SentimentRequest(articles=[{"title": "Old news", "published_at": "0001-01-02T00:00:00"}])
+    request = SentimentRequest(articles=[{"title": "News", "published_at": "2020-01-01T00:00:00Z"}])
+    assert request.articles[0].published_at.year == 2020
@@ -0,0 +1,59 @@
+from services.snapshots import SnapshotCache, etag_matches, list_etag
+
+
+def test_if_none_match_forms():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"x", W/"abc"', etag)
+    assert etag_matches("*", etag)
+    assert not etag_matches('"abcd"', etag)
+    assert not etag_matches(None, etag)
+
+
+def test_snapshot_is_reused_until_the_version_moves(make_scenario):
+    cache = SnapshotCache(max_size=10)
+    scenario = make_scenario()
+    cache.bump("s")
+
+    first = cache.get("s", scenario)
+    assert cache.get("s", scenario) is first
+    assert first.body == scenario.model_dump_json().encode()
+
+    scenario.description = "S&P 500 down 10%"
+    cache.bump("s")
+    second = cache.get("s", scenario)
+    assert second.etag != first.etag
+    assert cache.info()["hits"] == 1 and cache.info()["misses"] == 2
+
+
+def test_etag_depends_on_content_only(make_scenario):
+    a, b = SnapshotCache(), SnapshotCache()
+    b.bump("s")
+    b.bump("s")
+    assert a.get("s", make_scenario()).etag == b.get("s", make_scenario()).etag
+
+
+def test_least_recently_used_snapshot_is_dropped(make_scenario):
+    cache = SnapshotCache(max_size=2)
+    for key in ("a", "b"):
+        cache.get(key, make_scenario(key))
+    cache.get("a", make_scenario("a"))
+    cache.get("c", make_scenario("c"))
+
+    assert cache.info()["size"] == 2
+    cache.get("a", make_scenario("a"))
+    assert cache.info()["hits"] == 2
+
+
+def test_versions_are_not_reused_after_a_delete():
+    cache = SnapshotCache()
+    cache.bump("s")
+    before = cache.version("s")
+    cache.discard("s")
+    cache.bump("s")
+    assert cache.version("s") != before
+
+
+def test_list_etag_changes_with_order_and_extras():
+    assert list_etag(['"a"', '"b"']) != list_etag(['"b"', '"a"'])
+    assert list_etag(['"a"'], None, None) != list_etag(['"a"'], ["id"], None)
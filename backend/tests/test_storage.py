@@ -0,0 +1,124 @@
+import pytest
+
+from models.schemas import TrackedScenario
+from services.storage import open_storage
+
+
+def track(storage, tracked: TrackedScenario) -> str:
+    scenarios, tracked_table = storage[0], storage[1]
+    key = f"{tracked.scenario.id}_{tracked.play.id}"
+    tracked_table[key] = tracked
+    tracked.scenario.is_tracking = True
+    scenarios.save(tracked.scenario.id)
+    return key
+
+
+@pytest.fixture
+def open_worker(tmp_path, monkeypatch):
+    """
+    Opens the storage of one more worker process sharing the same database
+    """
+    monkeypatch.setenv("STORAGE_BACKEND", "sqlite")
+    monkeypatch.setenv("STORAGE_PATH", str(tmp_path / "shared.db"))
+    monkeypatch.setenv("STORAGE_SHARED", "true")
+    return open_storage
+
+
+def test_reloaded_scenario_keeps_tracked_play_linked(open_worker, make_scenario, make_tracked):
+    worker_a = open_worker()
+    scenario = make_scenario()
+    worker_a[0]["s"] = scenario
+    track(worker_a, make_tracked(scenario, "p1"))
+
+    # Worker B saves the scenario, so A reloads it as a new object
+    worker_b = open_worker()
+    worker_b[0]["s"].description = "S&P 500 down 10%"
+    worker_b[0].save("s")
+    assert "s" in worker_a[0]
+
+    scenarios_a, tracked_a = worker_a[0], worker_a[1]
+    assert tracked_a["s_p1"].scenario is scenarios_a["s"]
+    assert tracked_a["s_p1"].play is scenarios_a["s"].plays[0]
+    assert tracked_a["s_p1"].scenario.description == "S&P 500 down 10%"
+
+    # A refresh on A updates the tracked play and saves the scenario; the update must stick
+    tracked_a["s_p1"].play.confidence_score = 0.9
+    tracked_a.save("s_p1")
+    scenarios_a.save("s")
+
+    fresh = open_worker()
+    assert fresh[0]["s"].plays[0].confidence_score == 0.9
+    assert fresh[1]["s_p1"].play.confidence_score == 0.9
+
+
+def test_seen_fingerprints_are_stored_but_not_serialized(open_worker, make_scenario, make_tracked):
+    worker_a = open_worker()
+    scenario = make_scenario()
+    worker_a[0]["s"] = scenario
+    key = track(worker_a, make_tracked(scenario, "p1"))
+    worker_a[1][key].seen_article_fingerprints.append("abc123")
+    worker_a[1].save(key)
+
+    assert "seen_article_fingerprints" not in worker_a[1][key].model_dump_json()
+    assert b"seen_article_fingerprints" not in worker_a[1].snapshots.get(key, worker_a[1][key]).body
+
+    # Other workers, fresh or reloading, still get them from storage
+    worker_b = open_worker()
+    assert worker_b[1][key].seen_article_fingerprints == ["abc123"]
+    worker_a[1][key].seen_article_fingerprints.append("def456")
+    worker_a[1].save(key)
+    assert key in worker_b[1]
+    assert worker_b[1][key].seen_article_fingerprints == ["abc123", "def456"]
+
+
+def test_writes_and_deletes_reach_other_workers(open_worker, make_scenario, make_tracked):
+    worker_a, worker_b = open_worker(), open_worker()
+    changes = []
+    worker_b[1].listeners.append(lambda key, record: changes.append((key, record is not None)))
+
+    scenario = make_scenario()
+    worker_a[0]["s"] = scenario
+    key = track(worker_a, make_tracked(scenario, "p2"))
+    assert key in worker_b[1]
+    assert worker_b[1][key].play is worker_b[0]["s"].plays[1]
+    version = worker_b[1].snapshots.version(key)
+
+    worker_a[1][key].alerts.clear()
+    worker_a[1].save(key)
+    assert list(worker_b[1]) == [key]
+    assert worker_b[1].snapshots.version(key) > version
+
+    del worker_a[1][key]
+    assert key not in worker_b[1]
+    assert changes == [(key, True), (key, True), (key, False)]
+
+
+def test_events_are_delivered_to_other_workers_only(open_worker):
+    worker_a, worker_b = open_worker(), open_worker()
+    received_a, received_b = [], []
+    worker_a[4].on_event = lambda key, event: received_a.append((key, event))
+    worker_b[4].on_event = lambda key, event: received_b.append((key, event))
+
+    worker_a[4].publish_event("s_p1", {"type": "delta"})
+    worker_a[4].sync()
+    worker_b[4].sync()
+    assert received_a == []
+    assert received_b == [("s_p1", {"type": "delta"})]
+
+
+def test_lease_is_held_by_one_worker_at_a_time(open_worker):
+    leases_a, leases_b = open_worker()[3], open_worker()[3]
+
+    token = leases_a.acquire("refresh:s_p1", ttl_seconds=60)
+    assert token is not None
+    assert leases_b.acquire("refresh:s_p1", ttl_seconds=60) is None
+    assert leases_b.held("refresh:s_p1")
+
+    leases_a.release("refresh:s_p1", token)
+    assert leases_b.acquire("refresh:s_p1", ttl_seconds=60) is not None
+
+
+def test_expired_lease_can_be_taken_over(open_worker):
+    leases_a, leases_b = open_worker()[3], open_worker()[3]
+    assert leases_a.acquire("refresh:s_p1", ttl_seconds=0) is not None
+    assert leases_b.acquire("refresh:s_p1", ttl_seconds=60) is not None
@@ -0,0 +1,27 @@
+import pytest
+
+from services.structured_output import SCENARIO_BATCH_OUTPUT, JSONExtractionError, extract_json
+
+
+def test_prose_and_fences_around_json_are_skipped():
+    assert extract_json('Plays [see below]:\n```json\n{"plays": [1, 2]}\n```') == {"plays": [1, 2]}
+    assert extract_json('Note [1]: {"plays": []}', dict) == {"plays": []}
+
+
+def test_truncated_batch_does_not_yield_a_nested_fragment():
+    truncated = (
+        '[{"scenario_index": 0, "interpreted_scenario": "Rates fall", "plays": [{"title": "Long TLT"}]}, '
+        '{"scenario_index": 1, "interpreted_scenario": "Oil spi'
+    )
+    with pytest.raises(JSONExtractionError, match="Unterminated string"):
+        extract_json(truncated, SCENARIO_BATCH_OUTPUT.json_type)
+
+
+def test_value_of_the_wrong_type_is_rejected():
+    with pytest.raises(JSONExtractionError, match="expected a JSON array, got a JSON object"):
+        extract_json('{"plays": [{"title": "Long TLT"}]}', list)
+
+
+def test_brackets_inside_an_unterminated_string_are_not_candidates():
+    with pytest.raises(JSONExtractionError, match="Unterminated string"):
+        extract_json('{"plays": [{"title": "Long TLT", "rationale": "Yields [1] fall', list)
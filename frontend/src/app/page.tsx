@@ -1,10 +1,10 @@
 'use client';
 
-import { useState } from 'react';
+import { useEffect, useState } from 'react';
 import ScenarioInput from '@/components/ScenarioInput';
 import PlayCard from '@/components/PlayCard';
 import TrackingDashboard from '@/components/TrackingDashboard';
-import { Scenario, TrackedScenario, trackingAPI } from '@/lib/api';
+import { Scenario, TrackedScenario, applyTrackingDelta, trackingAPI } from '@/lib/api';
 import { Activity } from 'lucide-react';
 
 export default function Home() {
@@ -12,12 +12,39 @@ export default function Home() {
   const [trackedScenario, setTrackedScenario] = useState<TrackedScenario | null>(null);
   const [view, setView] = useState<'create' | 'plays' | 'tracking'>('create');
   const [trackingLoading, setTrackingLoading] = useState(false);
+  const [scenarioStreaming, setScenarioStreaming] = useState(false);
 
-  const handleScenarioCreated = (scenario: Scenario) => {
+  const trackedScenarioId = trackedScenario?.scenario.id;
+  const trackedPlayId = trackedScenario?.play.id;
+
+  // Apply pushed updates instead of polling the full tracked scenario
+  useEffect(() => {
+    if (!trackedScenarioId || !trackedPlayId) return;
+
+    return trackingAPI.subscribe(
+      (event) => {
+        if (event.type === 'delta') {
+          setTrackedScenario((current) => (current ? applyTrackingDelta(current, event) : current));
+        }
+      },
+      trackedScenarioId,
+      trackedPlayId
+    );
+  }, [trackedScenarioId, trackedPlayId]);
+
+  const handleScenarioCreated = (scenario: Scenario, complete: boolean) => {
     setCurrentScenario(scenario);
+    setScenarioStreaming(!complete);
     setView('plays');
   };
 
+  const handleScenarioFailed = (message: string) => {
+    setCurrentScenario(null);
+    setScenarioStreaming(false);
+    setView('create');
+    alert(`Failed to create scenario: ${message}`);
+  };
+
   const handleTrackPlay = async (playId: string) => {
     if (!currentScenario) return;
 
@@ -108,7 +135,10 @@ export default function Home() {
                 across equities, commodities, and fixed income.
               </p>
             </div>
-            <ScenarioInput onScenarioCreated={handleScenarioCreated} />
+            <ScenarioInput
+              onScenarioCreated={handleScenarioCreated}
+              onScenarioFailed={handleScenarioFailed}
+            />
           </div>
         )}
 
@@ -139,6 +169,7 @@ export default function Home() {
                   scenarioId={currentScenario.id}
                   onTrack={handleTrackPlay}
                   isTracking={trackingLoading}
+                  disabled={scenarioStreaming}
                 />
               ))}
             </div>
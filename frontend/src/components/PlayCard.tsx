@@ -8,9 +8,10 @@ interface PlayCardProps {
   scenarioId: string;
   onTrack: (playId: string) => void;
   isTracking?: boolean;
+  disabled?: boolean;
 }
 
-export default function PlayCard({ play, onTrack, isTracking }: PlayCardProps) {
+export default function PlayCard({ play, onTrack, isTracking, disabled }: PlayCardProps) {
   const getAssetIcon = (assetClass: string) => {
     switch (assetClass) {
       case 'equity':
@@ -107,7 +108,7 @@ export default function PlayCard({ play, onTrack, isTracking }: PlayCardProps) {
 
         <button
           onClick={() => onTrack(play.id)}
-          disabled={isTracking}
+          disabled={isTracking || disabled}
           className="bg-primary-600 text-white px-4 py-2 rounded-lg text-sm font-medium hover:bg-primary-700 disabled:bg-gray-400 disabled:cursor-not-allowed transition-colors"
         >
           {isTracking ? 'Tracking...' : 'Track This Play'}
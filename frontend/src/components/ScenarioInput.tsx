@@ -3,13 +3,16 @@
 import { useState } from 'react';
 import { Loader2 } from 'lucide-react';
 
-import { Scenario } from '@/lib/api';
+import { Scenario, scenarioAPI } from '@/lib/api';
 
 interface ScenarioInputProps {
-  onScenarioCreated: (scenario: Scenario) => void;
+  // Called as the analysis streams in; `complete` is true once the scenario is saved
+  onScenarioCreated: (scenario: Scenario, complete: boolean) => void;
+  // Called if the analysis fails after a partial scenario was already shown
+  onScenarioFailed: (message: string) => void;
 }
 
-export default function ScenarioInput({ onScenarioCreated }: ScenarioInputProps) {
+export default function ScenarioInput({ onScenarioCreated, onScenarioFailed }: ScenarioInputProps) {
   const [description, setDescription] = useState('');
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState('');
@@ -25,24 +28,46 @@ export default function ScenarioInput({ onScenarioCreated }: ScenarioInputProps)
     setLoading(true);
     setError('');
 
+    let scenario: Scenario | null = null;
+    let complete = false;
+
     try {
-      const response = await fetch(`${process.env.NEXT_PUBLIC_API_URL || 'http://localhost:8000'}/scenarios`, {
-        method: 'POST',
-        headers: {
-          'Content-Type': 'application/json',
-        },
-        body: JSON.stringify({ description }),
+      let failure = '';
+
+      await scenarioAPI.createStream(description, (event) => {
+        if (event.type === 'interpreted_scenario') {
+          scenario = {
+            id: event.scenario_id,
+            description,
+            interpreted_scenario: event.interpreted_scenario,
+            plays: [],
+            created_at: new Date().toISOString(),
+            is_tracking: false,
+          };
+          onScenarioCreated(scenario, false);
+        } else if (event.type === 'play' && scenario) {
+          scenario = { ...scenario, plays: [...scenario.plays, event.play] };
+          onScenarioCreated(scenario, false);
+        } else if (event.type === 'scenario') {
+          scenario = event.scenario;
+          complete = true;
+          onScenarioCreated(scenario, true);
+        } else if (event.type === 'error') {
+          failure = event.detail;
+        }
       });
 
-      if (!response.ok) {
-        throw new Error('Failed to create scenario');
+      if (failure || !complete) {
+        throw new Error(failure || 'Scenario analysis was interrupted');
       }
-
-      const scenario = await response.json();
-      onScenarioCreated(scenario);
       setDescription('');
     } catch (err) {
-      setError(err instanceof Error ? err.message : 'An error occurred');
+      const message = err instanceof Error ? err.message : 'An error occurred';
+      if (scenario) {
+        onScenarioFailed(message);
+      } else {
+        setError(message);
+      }
     } finally {
       setLoading(false);
     }
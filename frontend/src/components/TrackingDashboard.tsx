@@ -99,6 +99,9 @@ export default function TrackingDashboard({ trackedScenario, onRefresh, onStop }
                   <p className="text-gray-900">{alert.message}</p>
                   <p className="text-xs text-gray-500 mt-1">
                     {new Date(alert.created_at).toLocaleString()}
+                    {alert.occurrences > 1 && (
+                      <> · seen {alert.occurrences} times, last {new Date(alert.last_seen_at ?? alert.created_at).toLocaleString()}</>
+                    )}
                   </p>
                 </div>
               </div>
@@ -141,7 +144,10 @@ export default function TrackingDashboard({ trackedScenario, onRefresh, onStop }
                     </a>
                     <p className="text-sm text-gray-600 mt-1">{article.summary}</p>
                     <div className="flex items-center gap-4 mt-2 text-xs text-gray-500">
-                      <span>{article.source}</span>
+                      <span>
+                        {article.source}
+                        {article.source_count > 1 && ` + ${article.source_count - 1} more`}
+                      </span>
                       <span>•</span>
                       <span>{new Date(article.published_at).toLocaleDateString()}</span>
                       <span>•</span>
@@ -38,6 +38,7 @@ export interface NewsArticle {
   published_at: string;
   summary: string;
   relevance_score: number;
+  source_count: number;
 }
 
 export interface Alert {
@@ -47,6 +48,8 @@ export interface Alert {
   message: string;
   severity: 'info' | 'warning' | 'critical';
   created_at: string;
+  occurrences: number;
+  last_seen_at?: string | null;
 }
 
 export interface TrackedScenario {
@@ -58,15 +61,127 @@ export interface TrackedScenario {
   play_updates: string[];
 }
 
+export interface TrackingDelta {
+  type: 'delta';
+  scenario_id: string;
+  play_id: string;
+  last_updated: string;
+  new_alerts: Alert[];
+  repeated_alerts: { id: string; occurrences: number; last_seen_at: string }[];
+  max_alerts: number;
+  new_articles: NewsArticle[];
+  news_article_urls: string[];
+  play_updates: string[];
+  max_play_updates: number;
+  confidence_score?: number;
+}
+
+export type TrackingEvent =
+  | TrackingDelta
+  | { type: 'started'; scenario_id: string; play_id: string; tracked_scenario: TrackedScenario }
+  | { type: 'stopped'; scenario_id: string; play_id: string };
+
+// Merge a pushed delta into the tracked scenario the client already has
+export function applyTrackingDelta(tracked: TrackedScenario, delta: TrackingDelta): TrackedScenario {
+  const articles = new Map(tracked.news_articles.map((article) => [article.url, article]));
+  delta.new_articles.forEach((article) => articles.set(article.url, article));
+
+  return {
+    ...tracked,
+    play: delta.confidence_score !== undefined
+      ? { ...tracked.play, confidence_score: delta.confidence_score }
+      : tracked.play,
+    news_articles: delta.news_article_urls
+      .map((url) => articles.get(url))
+      .filter((article): article is NewsArticle => article !== undefined),
+    // A delta can arrive after a manual refresh already returned the same changes;
+    // older entries than the server keeps inline live in the alert history
+    alerts: [
+      ...tracked.alerts.map((alert) => {
+        const repeated = delta.repeated_alerts.find((update) => update.id === alert.id);
+        return repeated ? { ...alert, ...repeated } : alert;
+      }),
+      ...delta.new_alerts.filter((alert) => !tracked.alerts.some((existing) => existing.id === alert.id)),
+    ].slice(-delta.max_alerts),
+    play_updates: [
+      ...tracked.play_updates,
+      ...delta.play_updates.filter((update) => !tracked.play_updates.includes(update)),
+    ].slice(-delta.max_play_updates),
+    last_updated: delta.last_updated,
+  };
+}
+
+export type ScenarioStreamEvent =
+  | { type: 'interpreted_scenario'; scenario_id: string; interpreted_scenario: string }
+  | { type: 'play'; play: Play }
+  | { type: 'scenario'; scenario: Scenario }
+  | { type: 'error'; detail: string };
+
+// Read an NDJSON response body line by line
+async function readNDJSON<T>(response: Response, onLine: (line: T) => void): Promise<void> {
+  if (!response.body) {
+    throw new Error('Streaming is not supported by this browser');
+  }
+
+  const reader = response.body.getReader();
+  const decoder = new TextDecoder();
+  let buffer = '';
+
+  while (true) {
+    const { done, value } = await reader.read();
+    if (done) break;
+
+    buffer += decoder.decode(value, { stream: true });
+    const lines = buffer.split('\n');
+    buffer = lines.pop() ?? '';
+    lines.filter((line) => line.trim()).forEach((line) => onLine(JSON.parse(line)));
+  }
+
+  if (buffer.trim()) {
+    onLine(JSON.parse(buffer));
+  }
+}
+
+export interface ListParams {
+  limit?: number;
+  cursor?: string;
+  asset_class?: Play['asset_class'];
+  fields?: string; // comma-separated top-level fields
+}
+
+export interface ListPage<T> {
+  items: T[];
+  nextCursor?: string;
+}
+
 export const scenarioAPI = {
   create: async (description: string): Promise<Scenario> => {
     const response = await api.post('/scenarios', { description });
     return response.data;
   },
 
-  list: async (): Promise<Scenario[]> => {
-    const response = await api.get('/scenarios');
-    return response.data;
+  createStream: async (
+    description: string,
+    onEvent: (event: ScenarioStreamEvent) => void
+  ): Promise<void> => {
+    const response = await fetch(`${API_BASE_URL}/scenarios/stream`, {
+      method: 'POST',
+      headers: {
+        'Content-Type': 'application/json',
+      },
+      body: JSON.stringify({ description }),
+    });
+
+    if (!response.ok) {
+      throw new Error('Failed to create scenario');
+    }
+
+    await readNDJSON<ScenarioStreamEvent>(response, onEvent);
+  },
+
+  list: async (params: ListParams & { is_tracking?: boolean } = {}): Promise<ListPage<Scenario>> => {
+    const response = await api.get('/scenarios', { params });
+    return { items: response.data, nextCursor: response.headers['x-next-cursor'] };
   },
 
   get: async (id: string): Promise<Scenario> => {
@@ -81,9 +196,11 @@ export const trackingAPI = {
     return response.data;
   },
 
-  list: async (): Promise<TrackedScenario[]> => {
-    const response = await api.get('/tracking');
-    return response.data;
+  list: async (
+    params: ListParams & { severity?: Alert['severity'] } = {}
+  ): Promise<ListPage<TrackedScenario>> => {
+    const response = await api.get('/tracking', { params });
+    return { items: response.data, nextCursor: response.headers['x-next-cursor'] };
   },
 
   get: async (scenario_id: string, play_id: string): Promise<TrackedScenario> => {
@@ -96,9 +213,56 @@ export const trackingAPI = {
     return response.data;
   },
 
+  alerts: async (
+    scenario_id: string,
+    play_id: string,
+    params: { since?: string; until?: string; severity?: Alert['severity']; limit?: number } = {}
+  ): Promise<Alert[]> => {
+    const response = await api.get(`/tracking/${scenario_id}/${play_id}/alerts`, { params });
+    return response.data;
+  },
+
   stop: async (scenario_id: string, play_id: string): Promise<void> => {
     await api.delete(`/tracking/${scenario_id}/${play_id}`);
   },
+
+  // Subscribe to pushed updates for one tracked play, or all of them; returns an unsubscribe function
+  subscribe: (
+    onEvent: (event: TrackingEvent) => void,
+    scenario_id?: string,
+    play_id?: string
+  ): (() => void) => {
+    const path = scenario_id && play_id
+      ? `/tracking/${scenario_id}/${play_id}/events`
+      : '/tracking/events';
+    const source = new EventSource(`${API_BASE_URL}${path}`);
+
+    const handler = (message: MessageEvent) => onEvent(JSON.parse(message.data));
+    ['delta', 'started', 'stopped'].forEach((type) => source.addEventListener(type, handler));
+
+    return () => source.close();
+  },
+};
+
+export interface SentimentScore {
+  score: number;
+  sentiment: 'positive' | 'neutral' | 'negative';
+}
+
+export interface MarketSentiment extends SentimentScore {
+  articles_analyzed: number;
+  instruments: Record<string, SentimentScore & { mentions: number }>;
+  timeseries: { timestamp: string; score: number; articles: number; rolling_score: number }[];
+}
+
+export const sentimentAPI = {
+  get: async (
+    instruments: string[],
+    params: { bucket_minutes?: number; window?: number } = {}
+  ): Promise<MarketSentiment> => {
+    const response = await api.get('/sentiment', { params: { instruments: instruments.join(','), ...params } });
+    return response.data;
+  },
 };
 
 export default api;